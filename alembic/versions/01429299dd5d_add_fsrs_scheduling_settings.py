@@ -0,0 +1,30 @@
+"""add fsrs scheduling settings to users and courses
+
+Revision ID: 01429299dd5d
+Revises: 4ac16a40c42e
+Create Date: 2026-10-17 11:48:20.774521
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '01429299dd5d'
+down_revision = '4ac16a40c42e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('fsrs_parameters', sa.JSON(), nullable=True))
+    op.add_column('users', sa.Column('desired_retention', sa.Float(), nullable=True))
+    op.add_column('courses', sa.Column('fsrs_parameters', sa.JSON(), nullable=True))
+    op.add_column('courses', sa.Column('desired_retention', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('courses', 'desired_retention')
+    op.drop_column('courses', 'fsrs_parameters')
+    op.drop_column('users', 'desired_retention')
+    op.drop_column('users', 'fsrs_parameters')
@@ -36,21 +36,6 @@ def upgrade() -> None:
     sa.PrimaryKeyConstraint('id')
     )
     op.create_index(op.f('ix_lesson_progress_id'), 'lesson_progress', ['id'], unique=False)
-    op.create_table('words',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('lesson_id', sa.Integer(), nullable=False),
-    sa.Column('text', sa.String(), nullable=False),
-    sa.Column('translation', sa.String(), nullable=False),
-    sa.Column('pronunciation', sa.String(), nullable=True),
-    sa.Column('example_sentence', sa.Text(), nullable=True),
-    sa.Column('difficulty_level', sa.Integer(), nullable=True),
-    sa.Column('order_index', sa.Integer(), nullable=False),
-    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
-    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
-    sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_index(op.f('ix_words_id'), 'words', ['id'], unique=False)
     op.create_table('user_words',
     sa.Column('id', sa.Integer(), nullable=False),
     sa.Column('user_id', sa.Integer(), nullable=False),
@@ -92,8 +77,6 @@ def downgrade() -> None:
     op.drop_table('reviews')
     op.drop_index(op.f('ix_user_words_id'), table_name='user_words')
     op.drop_table('user_words')
-    op.drop_index(op.f('ix_words_id'), table_name='words')
-    op.drop_table('words')
     op.drop_index(op.f('ix_lesson_progress_id'), table_name='lesson_progress')
     op.drop_table('lesson_progress')
     # ### end Alembic commands ###
@@ -0,0 +1,64 @@
+"""unique user-word and lesson-progress per user
+
+Revision ID: 4ac16a40c42e
+Revises: 7b6a713bc72a
+Create Date: 2026-10-17 11:03:52.906144
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4ac16a40c42e'
+down_revision = '7b6a713bc72a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Merge duplicate user words into the most recently reviewed row, whose card
+    # state is current, moving the review history of the others onto it
+    op.execute(
+        """
+        CREATE TEMPORARY TABLE user_word_keep AS
+        SELECT id, FIRST_VALUE(id) OVER (
+            PARTITION BY user_id, word_id
+            ORDER BY (fsrs_card_data ->> 'last_review')::timestamptz DESC NULLS LAST,
+                     COALESCE(updated_at, created_at) DESC NULLS LAST, id DESC
+        ) AS keep_id
+        FROM user_words
+        """
+    )
+    op.execute(
+        """
+        UPDATE reviews
+        SET user_word_id = keep.keep_id
+        FROM user_word_keep keep
+        WHERE reviews.user_word_id = keep.id AND keep.id <> keep.keep_id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM user_words
+        USING user_word_keep keep
+        WHERE user_words.id = keep.id AND keep.id <> keep.keep_id
+        """
+    )
+    op.execute("DROP TABLE user_word_keep")
+    # Keep the latest progress row per lesson
+    op.execute(
+        """
+        DELETE FROM lesson_progress a
+        USING lesson_progress b
+        WHERE a.user_id = b.user_id AND a.lesson_id = b.lesson_id AND a.id < b.id
+        """
+    )
+
+    op.create_unique_constraint('uq_user_words_user_id_word_id', 'user_words', ['user_id', 'word_id'])
+    op.create_unique_constraint('uq_lesson_progress_user_id_lesson_id', 'lesson_progress', ['user_id', 'lesson_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_lesson_progress_user_id_lesson_id', 'lesson_progress', type_='unique')
+    op.drop_constraint('uq_user_words_user_id_word_id', 'user_words', type_='unique')
@@ -0,0 +1,40 @@
+"""add user-word due and state columns
+
+Revision ID: 7b6a713bc72a
+Revises: 43db20b1b997
+Create Date: 2026-10-17 10:12:41.318904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b6a713bc72a'
+down_revision = '43db20b1b997'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user_words', sa.Column('due', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('user_words', sa.Column('state', sa.Integer(), nullable=True))
+
+    # Backfill from the FSRS card blob
+    op.execute(
+        """
+        UPDATE user_words
+        SET due = (fsrs_card_data ->> 'due')::timestamptz,
+            state = (fsrs_card_data ->> 'state')::integer
+        """
+    )
+
+    op.alter_column('user_words', 'due', nullable=False)
+    op.alter_column('user_words', 'state', nullable=False)
+    op.create_index('ix_user_words_user_id_due', 'user_words', ['user_id', 'due'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_words_user_id_due', table_name='user_words')
+    op.drop_column('user_words', 'state')
+    op.drop_column('user_words', 'due')
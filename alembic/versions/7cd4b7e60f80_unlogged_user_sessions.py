@@ -0,0 +1,33 @@
+"""unlogged user sessions table
+
+Revision ID: 7cd4b7e60f80
+Revises: a785ae12a70b
+Create Date: 2026-10-17 18:40:12.530671
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7cd4b7e60f80'
+down_revision = 'a785ae12a70b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_sessions',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('expires_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        prefixes=['UNLOGGED']
+    )
+    op.create_index('ix_user_sessions_expires_at', 'user_sessions', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_sessions_expires_at', table_name='user_sessions')
+    op.drop_table('user_sessions')
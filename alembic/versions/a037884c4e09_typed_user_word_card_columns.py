@@ -0,0 +1,76 @@
+"""typed user-word card columns instead of fsrs_card_data
+
+Revision ID: a037884c4e09
+Revises: ede790b55cf5
+Create Date: 2026-10-17 14:05:37.610283
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a037884c4e09'
+down_revision = 'ede790b55cf5'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+
+def _batched(statement: str) -> None:
+    """Run an UPDATE over user_words in id ranges, committing after each batch"""
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM user_words")).scalar()
+    with op.get_context().autocommit_block():
+        for start in range(0, max_id + 1, BATCH_SIZE):
+            bind.execute(
+                sa.text(statement + " WHERE id >= :start AND id < :end"),
+                {"start": start, "end": start + BATCH_SIZE}
+            )
+
+
+def upgrade() -> None:
+    op.add_column('user_words', sa.Column('step', sa.Integer(), nullable=True))
+    op.add_column('user_words', sa.Column('stability', sa.Float(), nullable=True))
+    op.add_column('user_words', sa.Column('difficulty', sa.Float(), nullable=True))
+    op.add_column('user_words', sa.Column('last_review', sa.DateTime(timezone=True), nullable=True))
+
+    _batched(
+        """
+        UPDATE user_words
+        SET state = (fsrs_card_data ->> 'state')::integer,
+            step = (fsrs_card_data ->> 'step')::integer,
+            stability = (fsrs_card_data ->> 'stability')::double precision,
+            difficulty = (fsrs_card_data ->> 'difficulty')::double precision,
+            due = (fsrs_card_data ->> 'due')::timestamptz,
+            last_review = (fsrs_card_data ->> 'last_review')::timestamptz
+        """
+    )
+
+    op.drop_column('user_words', 'fsrs_card_data')
+
+
+def downgrade() -> None:
+    op.add_column('user_words', sa.Column('fsrs_card_data', sa.JSON(), nullable=True))
+
+    _batched(
+        """
+        UPDATE user_words
+        SET fsrs_card_data = json_build_object(
+            'card_id', id,
+            'state', state,
+            'step', step,
+            'stability', stability,
+            'difficulty', difficulty,
+            'due', due,
+            'last_review', last_review
+        )
+        """
+    )
+
+    op.alter_column('user_words', 'fsrs_card_data', nullable=False)
+    op.drop_column('user_words', 'last_review')
+    op.drop_column('user_words', 'difficulty')
+    op.drop_column('user_words', 'stability')
+    op.drop_column('user_words', 'step')
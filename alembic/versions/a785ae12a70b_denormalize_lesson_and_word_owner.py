@@ -0,0 +1,77 @@
+"""denormalize owning user onto lessons and words
+
+Revision ID: a785ae12a70b
+Revises: aac2f65e166a
+Create Date: 2026-10-17 17:02:44.918305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a785ae12a70b'
+down_revision = 'aac2f65e166a'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+
+def _batched(table: str, statement: str) -> None:
+    """Run an UPDATE over a table in id ranges, committing after each batch"""
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text(f"SELECT COALESCE(MAX(id), 0) FROM {table}")).scalar()
+    with op.get_context().autocommit_block():
+        for start in range(0, max_id + 1, BATCH_SIZE):
+            bind.execute(
+                sa.text(statement + f" AND {table}.id >= :start AND {table}.id < :end"),
+                {"start": start, "end": start + BATCH_SIZE}
+            )
+
+
+def upgrade() -> None:
+    op.add_column('lessons', sa.Column('user_id', sa.Integer(), nullable=True))
+    op.add_column('words', sa.Column('user_id', sa.Integer(), nullable=True))
+
+    # Lessons first, words are backfilled from their lesson
+    _batched(
+        'lessons',
+        """
+        UPDATE lessons
+        SET user_id = courses.user_id
+        FROM courses
+        WHERE courses.id = lessons.course_id
+        """
+    )
+    _batched(
+        'words',
+        """
+        UPDATE words
+        SET user_id = lessons.user_id
+        FROM lessons
+        WHERE lessons.id = words.lesson_id
+        """
+    )
+
+    op.alter_column('lessons', 'user_id', nullable=False)
+    op.alter_column('words', 'user_id', nullable=False)
+    op.create_foreign_key('lessons_user_id_fkey', 'lessons', 'users', ['user_id'], ['id'])
+    op.create_foreign_key('words_user_id_fkey', 'words', 'users', ['user_id'], ['id'])
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_lessons_user_id_course_id', 'lessons', ['user_id', 'course_id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_words_user_id_lesson_id', 'words', ['user_id', 'lesson_id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_words_user_id_lesson_id', table_name='words', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_lessons_user_id_course_id', table_name='lessons', postgresql_concurrently=True,
+                      if_exists=True)
+    op.drop_constraint('words_user_id_fkey', 'words', type_='foreignkey')
+    op.drop_constraint('lessons_user_id_fkey', 'lessons', type_='foreignkey')
+    op.drop_column('words', 'user_id')
+    op.drop_column('lessons', 'user_id')
@@ -0,0 +1,40 @@
+"""foreign key and lookup indexes
+
+Revision ID: aac2f65e166a
+Revises: a037884c4e09
+Create Date: 2026-10-17 16:21:08.447192
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'aac2f65e166a'
+down_revision = 'a037884c4e09'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns). The (user_id, word_id) and (user_id, lesson_id) pairs are
+# covered by the unique constraints of 4ac16a40c42e.
+INDEXES = [
+    ('ix_courses_user_id_created_at', 'courses', ['user_id', 'created_at']),
+    ('ix_lessons_course_id_order_index', 'lessons', ['course_id', 'order_index']),
+    ('ix_words_lesson_id', 'words', ['lesson_id']),
+    ('ix_user_words_word_id', 'user_words', ['word_id']),
+    ('ix_reviews_user_word_id_review_datetime', 'reviews', ['user_word_id', 'review_datetime']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction and does not block writes
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,26 @@
+"""add user fsrs parameter fit tracking
+
+Revision ID: ede790b55cf5
+Revises: 01429299dd5d
+Create Date: 2026-10-17 12:31:09.204417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ede790b55cf5'
+down_revision = '01429299dd5d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('fsrs_parameters_review_count', sa.Integer(), nullable=True))
+    op.add_column('users', sa.Column('fsrs_parameters_fitted_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'fsrs_parameters_fitted_at')
+    op.drop_column('users', 'fsrs_parameters_review_count')
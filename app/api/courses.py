@@ -1,95 +1,130 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.models import User
 from app.schemas import (
     CourseSchema, CourseCreateSchema, CourseUpdateSchema, CourseWithLessonsAndWordsSchema,
-    SuccessResponseSchema
+    SuccessResponseSchema, CurrentUserSchema
 )
 from app.crud import CourseCRUD
 # from app.api.dependencies import get_current_user
-from app.utils.session_store import get_current_user
+from app.utils.session_store import get_current_user_record
+from app.utils.responses import schema_response, copy_headers
+from app.utils.streaming import ndjson_response
+from app.course_export import CourseExporter, EXPORT_FORMATS, gzip_stream
+from app.database import AsyncSessionLocal
 
 router = APIRouter(prefix="/courses", tags=["courses"])
 
 @router.get("/", response_model=List[CourseSchema])
 async def get_user_courses(
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        response: Response,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000),
+        stream: bool = False,
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
-    """Get all courses for the current user"""
-    return CourseCRUD.get_user_courses(db, current_user.id)
+    """Get the courses of the current user, newest first.
+
+    Pass the id of the last course seen as `after_id` to get the next page, or
+    `stream=true` to receive the courses as NDJSON.
+    """
+    if stream:
+        return ndjson_response(CourseSchema, CourseCRUD.user_courses_query(current_user.id, after_id, limit), response)
+    courses = await CourseCRUD.get_user_courses(db, current_user.id, after_id, limit)
+    return schema_response(List[CourseSchema], courses, response)
 
 
 @router.post("/", response_model=CourseSchema)
 async def create_course(
+        response: Response,
         course_data: CourseCreateSchema,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Create a new course"""
-    return CourseCRUD.create_course(db, course_data, current_user.id)
+    course = await CourseCRUD.create_course(db, course_data, current_user.id)
+    return schema_response(CourseSchema, course, response)
 
 
 @router.get("/{course_id}", response_model=CourseWithLessonsAndWordsSchema)
 async def get_course(
+        response: Response,
         course_id: int,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Get a specific course with lessons and words"""
-    course = CourseCRUD.get_course(db, course_id, current_user.id)
+    course = await CourseCRUD.get_course_tree(db, course_id, current_user.id)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Course not found"
         )
+    return schema_response(CourseWithLessonsAndWordsSchema, course, response)
+
+@router.get("/{course_id}/export")
+async def export_course(
+        course_id: int,
+        format: str = Query("ndjson", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+        gzip: bool = True,
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
+):
+    """Stream a course's words with card states and review history as NDJSON or CSV.
 
-    # Load lessons with words
-    from app.crud import LessonCRUD, WordCRUD
-    from app.schemas import LessonWithWordsSchema
-
-    lessons = LessonCRUD.get_course_lessons(db, course_id, current_user.id)
-    lessons_with_words = []
-    for lesson in lessons:
-        words = WordCRUD.get_lesson_words(db, lesson.id, current_user.id)
-        lesson_with_words = LessonWithWordsSchema(
-            **lesson.__dict__,
-            words=words
+    The file can be imported back through POST /api/v1/words/import.
+    """
+    if not await CourseExporter(db, current_user.id, course_id).exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found"
         )
-        lessons_with_words.append(lesson_with_words)
 
-    return CourseWithLessonsAndWordsSchema(
-        **course.__dict__,
-        lessons=lessons_with_words
-    )
+    user_id = current_user.id
+
+    async def lines():
+        # The request's session is closed before the body is sent
+        async with AsyncSessionLocal() as export_db:
+            async for line in CourseExporter(export_db, user_id, course_id).iter_lines(format):
+                yield line
+
+    headers = {"Content-Disposition": f'attachment; filename="course-{course_id}.{format}"'}
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+        return copy_headers(StreamingResponse(gzip_stream(lines()), media_type=media_type, headers=headers), response)
+    return copy_headers(StreamingResponse(lines(), media_type=media_type, headers=headers), response)
+
 
 @router.put("/{course_id}", response_model=CourseSchema)
 async def update_course(
+        response: Response,
         course_id: int,
         course_data: CourseUpdateSchema,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Update a course"""
-    course = CourseCRUD.update_course(db, course_id, current_user.id, course_data)
+    course = await CourseCRUD.update_course(db, course_id, current_user.id, course_data)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Course not found"
         )
-    return course
+    return schema_response(CourseSchema, course, response)
 
 
 @router.delete("/{course_id}", response_model=SuccessResponseSchema)
 async def delete_course(
         course_id: int,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Delete a course"""
-    success = CourseCRUD.delete_course(db, course_id, current_user.id)
+    success = await CourseCRUD.delete_course(db, course_id, current_user.id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
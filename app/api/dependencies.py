@@ -1,7 +1,7 @@
 from typing import Optional
 from fastapi import Depends, HTTPException, status, Header
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas
 from app.crud import UserCRUD
@@ -13,10 +13,10 @@ from app.utils.telegram import extract_telegram_init_data, verify_telegram_webap
 security = HTTPBearer()
 
 
-def get_current_user(
+async def get_current_user(
         authorization: Optional[str] = Header(None),
         # init_data: str = Depends(security),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ) -> UserSchema:
     """
     Get current user from Telegram WebApp init data
@@ -44,14 +44,15 @@ def get_current_user(
             )
 
         # Check if user already exists
-        existing_user = UserCRUD.get_user_by_telegram_id(db, telegram_id)
+        existing_user = await UserCRUD.get_user_by_telegram_id(db, telegram_id)
 
         if existing_user:
             # Update user info if needed
             if username != existing_user.username:
                 existing_user.username = username
-                db.commit()
-                db.refresh(existing_user)
+                await UserCRUD.invalidate_user(db, telegram_id)
+                await db.commit()
+                await db.refresh(existing_user)
 
             return existing_user
         else:
@@ -64,7 +65,7 @@ def get_current_user(
                 language_code=user_data.get("language_code", "en")
             )
 
-            new_user = UserCRUD.create_user(db, user_create)
+            new_user = await UserCRUD.create_user(db, user_create)
             return new_user
 
     except HTTPException:
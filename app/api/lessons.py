@@ -1,96 +1,109 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.models import User
 from app.schemas import (
     LessonSchema, LessonCreateSchema, LessonUpdateSchema, LessonWithWordsSchema,
-    SuccessResponseSchema
+    SuccessResponseSchema, CurrentUserSchema
 )
-from app.crud import LessonCRUD, WordCRUD
+from app.crud import LessonCRUD
 # from app.api.dependencies import get_current_user
-from app.utils.session_store import get_current_user
+from app.utils.session_store import get_current_user_record
+from app.utils.responses import schema_response
+from app.utils.streaming import ndjson_response
 
 router = APIRouter(prefix="/lessons", tags=["lessons"])
 
 
 @router.get("/course/{course_id}", response_model=List[LessonSchema])
 async def get_course_lessons(
+        response: Response,
         course_id: int,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        after_order_index: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000),
+        stream: bool = False,
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
-    """Get all lessons for a specific course"""
-    return LessonCRUD.get_course_lessons(db, course_id, current_user.id)
+    """Get the lessons of a course in order.
+
+    Pass `after_order_index` and `after_id` of the last lesson seen to get the next
+    page, or `stream=true` to receive the lessons as NDJSON.
+    """
+    if stream:
+        return ndjson_response(LessonSchema, LessonCRUD.course_lessons_query(
+            course_id, current_user.id, after_order_index, after_id, limit
+        ), response)
+    lessons = await LessonCRUD.get_course_lessons(db, course_id, current_user.id, after_order_index, after_id, limit)
+    return schema_response(List[LessonSchema], lessons, response)
 
 
 @router.post("/course/{course_id}", response_model=LessonSchema)
 async def create_lesson(
+        response: Response,
         lesson_data: LessonCreateSchema,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Create a new lesson in a course"""
     # Verify course belongs to user
     # TODO: should remove in future?
     from app.crud import CourseCRUD
-    course = CourseCRUD.get_course(db, lesson_data.course_id, current_user.id)
+    course = await CourseCRUD.get_course(db, lesson_data.course_id, current_user.id)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Course not found"
         )
 
-    return LessonCRUD.create_lesson(db, lesson_data)
+    lesson = await LessonCRUD.create_lesson(db, lesson_data, current_user.id)
+    return schema_response(LessonSchema, lesson, response)
 
 
 @router.get("/{lesson_id}", response_model=LessonWithWordsSchema)
 async def get_lesson(
+        response: Response,
         lesson_id: int,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Get a specific lesson with words"""
-    lesson = LessonCRUD.get_lesson(db, lesson_id, current_user.id)
+    lesson = await LessonCRUD.get_lesson_tree(db, lesson_id, current_user.id)
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Lesson not found"
         )
-
-    words = WordCRUD.get_lesson_words(db, lesson_id, current_user.id)
-
-    return LessonWithWordsSchema(
-        **lesson.__dict__,
-        words=words
-    )
+    return schema_response(LessonWithWordsSchema, lesson, response)
 
 
 @router.put("/{lesson_id}", response_model=LessonSchema)
 async def update_lesson(
+        response: Response,
         lesson_id: int,
         lesson_data: LessonUpdateSchema,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Update a lesson"""
-    lesson = LessonCRUD.update_lesson(db, lesson_id, current_user.id, lesson_data)
+    lesson = await LessonCRUD.update_lesson(db, lesson_id, current_user.id, lesson_data)
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Lesson not found"
         )
-    return lesson
+    return schema_response(LessonSchema, lesson, response)
 
 
 @router.delete("/{lesson_id}", response_model=SuccessResponseSchema)
 async def delete_lesson(
         lesson_id: int,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Delete a lesson"""
-    success = LessonCRUD.delete_lesson(db, lesson_id, current_user.id)
+    success = await LessonCRUD.delete_lesson(db, lesson_id, current_user.id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,59 +1,28 @@
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models import User
 from app.schemas import (
     RatingEnum, ReviewSessionSchema, WordWithProgressSchema,
-    LessonProgressUpdateSchema, LessonProgressCreateSchema,
-    LessonProgressSchema, WordRatingSchema, WordSchema
+    LessonProgressCreateSchema,
+    LessonProgressSchema, WordRatingSchema, WordSchema, WordRatingBatchSchema, ReviewResultSchema,
+    DueOrderEnum, DueWordsSchema, LessonRetentionSchema, CurrentUserSchema
 )
-from app.crud import UserWordCRUD, LessonProgressCRUD, WordCRUD
+from app.crud import LessonProgressCRUD, WordCRUD, UserCRUD
 from app.fsrs_service import WordLearningService
-from app.utils.session_store import get_current_user
+from app.retention_service import RetentionService
+from app.utils.responses import schema_response
+from app.utils.session_store import get_current_user, get_current_user_record
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
 
 
-def update_lesson_progress(db: Session, user_id: int, rating_data: dict, new_review: int, learning_service):
-    lesson_words = WordCRUD.get_lesson_words(db, rating_data["lesson_id"], user_id)
-    total_words = len(lesson_words)
-
-    if total_words == 0:
-        return
-
-    words_learned = 0
-    if rating_data["rating"] >= 2:
-        words_learned = 1
-
-    lesson_progress = LessonProgressCRUD.get_lesson_progress(db, user_id, rating_data["lesson_id"])
-
-    if not lesson_progress:
-        progress_data = LessonProgressCreateSchema(
-            lesson_id=rating_data["lesson_id"],
-            total_words=total_words,
-            words_learned=words_learned,
-            words_to_review=new_review - words_learned,
-            is_started=True,
-            is_completed=False
-        )
-        LessonProgressCRUD.create_lesson_progress(db, progress_data, user_id)
-    else:
-        is_completed = words_learned >= total_words
-        progress_update = LessonProgressUpdateSchema(
-            words_learned=(lesson_progress.words_learned + words_learned),
-            # TODO: remove words_to_review field or update its calculation, logic is wrong
-            words_to_review=(lesson_progress.words_to_review - (1 - words_learned)),
-            total_words=total_words,
-            is_completed=is_completed
-        )
-        LessonProgressCRUD.update_lesson_progress(db, user_id, rating_data["lesson_id"], progress_update)
-
-
 @router.post("/streak", response_model=dict)
-def update_user_streak_on_success(
+async def update_user_streak_on_success(
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
     ):
     today = datetime.now(timezone.utc).date()
 
@@ -76,8 +45,9 @@ def update_user_streak_on_success(
 
     current_user.current_streak = current_streak
     current_user.longest_streak = longest_streak
-    db.commit()
-    db.refresh(current_user)
+    await UserCRUD.invalidate_user(db, current_user.telegram_id)
+    await db.commit()
+    await db.refresh(current_user)
     return {
         "current_streak": current_streak,
     }
@@ -85,37 +55,25 @@ def update_user_streak_on_success(
 
 @router.get("/session/lesson/{lesson_id}", response_model=ReviewSessionSchema)
 async def get_review_session(
+        response: Response,
         lesson_id: int,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Get a review session for a lesson"""
     try:
-        lesson_words = WordCRUD.get_lesson_words(db, lesson_id, current_user.id)
+        lesson_words = await WordCRUD.get_lesson_words(db, lesson_id, current_user.id)
 
-        words = []
         # TODO: think about words learning, should it be like, display first started words and when the new ones, or
         # display all (mixed - in random order), or display them as list (as they added to the lesson)
         # probably the last one is the most correct
 
-        for word in lesson_words:
-            word_dict = {
-                "id": word.id,
-                "text": word.text,
-                "translation": word.translation,
-                "pronunciation": word.pronunciation,
-                "example_sentence": word.example_sentence,
-                "lesson_id": word.lesson_id,
-                "created_at": word.created_at,
-                "updated_at": word.updated_at
-            }
-            words.append(word_dict)
-
-        return ReviewSessionSchema(
-            lesson_id=lesson_id,
-            words=words,
-            total_words=len(lesson_words)
-        )
+        # Words validate straight from the ORM rows into the response
+        return schema_response(ReviewSessionSchema, {
+            "lesson_id": lesson_id,
+            "words": lesson_words,
+            "total_words": len(lesson_words)
+        }, response)
 
     except Exception as e:
         raise HTTPException(
@@ -124,55 +82,80 @@ async def get_review_session(
         )
 
 
-@router.post("/rate")
+@router.post("/rate", response_model=ReviewResultSchema)
 async def rate_word_simple(
         rating_data: WordRatingSchema,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Rate a word and update lesson progress"""
     try:
-        print(rating_data)
-        learning_service = WordLearningService(db)
-        new_review = 0
-
-        user_word = UserWordCRUD.get_user_word(db, current_user.id, rating_data.word_id)
-        if not user_word:
-            user_word = learning_service.create_user_word(current_user.id, rating_data.word_id)
-            new_review = 1
-
-        updated_user_word, review = learning_service.review_word(
-            user_word,
+        learning_service = WordLearningService(db, current_user)
+        result = await learning_service.rate_word(
+            current_user.id,
+            rating_data.word_id,
             RatingEnum(rating_data.rating),
-            response_time_seconds=None,
-            lesson_context=rating_data.lesson_id
+            lesson_id=rating_data.lesson_id
+        )
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error rating word: {str(e)}"
         )
 
-        if rating_data.lesson_id:
-            update_lesson_progress(
-                db,
-                current_user.id,
-                rating_data.dict(),
-                new_review,
-                learning_service
-            )
-        return
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Word not found"
+        )
+    return result
+
 
+@router.post("/rate/batch", response_model=List[ReviewResultSchema])
+async def rate_words_batch(
+        batch_data: WordRatingBatchSchema,
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """Rate an ordered session of words and update lesson progress in one transaction"""
+    try:
+        learning_service = WordLearningService(db, current_user)
+        results = await learning_service.review_words_batch(current_user.id, batch_data.ratings)
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
-        print(e)
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error rating word: {str(e)}"
+            detail=f"Error rating words: {str(e)}"
         )
 
+    if results is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Word not found"
+        )
+    return results
+
 
 @router.get("/progress/lesson/{lesson_id}", response_model=LessonProgressSchema)
 async def get_lesson_progress(
         lesson_id: int,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
-    lesson_progress = LessonProgressCRUD.get_lesson_progress(db, current_user.id, lesson_id)
+    lesson_progress = await LessonProgressCRUD.get_lesson_progress(db, current_user.id, lesson_id)
     if not lesson_progress:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -192,16 +175,16 @@ async def get_lesson_progress(
 @router.post("/lesson/{lesson_id}/start", response_model=dict)
 async def start_lesson(
         lesson_id: int,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Mark a lesson as started"""
     # Get or create lesson progress
-    lesson_progress = LessonProgressCRUD.get_lesson_progress(db, current_user.id, lesson_id)
+    lesson_progress = await LessonProgressCRUD.get_lesson_progress(db, current_user.id, lesson_id)
 
     if not lesson_progress:
         # Get total words
-        lesson_words = WordCRUD.get_lesson_words(db, lesson_id, current_user.id)
+        lesson_words = await WordCRUD.get_lesson_words(db, lesson_id, current_user.id)
         total_words = len(lesson_words)
 
         # Create lesson progress
@@ -213,7 +196,7 @@ async def start_lesson(
             is_started=True,
             is_completed=False
         )
-        lesson_progress = LessonProgressCRUD.create_lesson_progress(db, progress_data, current_user.id)
+        lesson_progress = await LessonProgressCRUD.create_lesson_progress(db, progress_data, current_user.id)
 
     return {
         "lesson_id": lesson_id,
@@ -222,20 +205,38 @@ async def start_lesson(
     }
 
 
-@router.get("/due", response_model=dict)
+@router.get("/due", response_model=DueWordsSchema)
 async def get_words_due_for_review(
-        limit: int = 20,
+        limit: int = Query(20, ge=1, le=200),
+        order: DueOrderEnum = DueOrderEnum.DUE,
+        cursor: Optional[str] = None,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    """Get all words due for review across all lessons"""
-    learning_service = WordLearningService(db)
+    """Get a page of words due for review across all lessons, with their card state"""
+    learning_service = WordLearningService(db, current_user)
+    try:
+        due_words, next_cursor = await learning_service.get_words_due_for_review(
+            current_user.id, limit, order, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
-    due_user_words = learning_service.get_words_due_for_review(current_user.id, limit)
+    return DueWordsSchema(words=due_words, next_cursor=next_cursor)
 
-    result = []
-    for user_word in due_user_words:
-        word = WordCRUD.get_word(db, user_word.word_id, current_user.id)
-        if word:
-            result.append(word.to_dict())
-    return {"words": result}
+
+@router.get("/retention/lessons", response_model=List[LessonRetentionSchema])
+async def get_lesson_retention(
+        course_id: Optional[int] = None,
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """Get the average current retention of reviewed words per lesson"""
+    deck = await RetentionService(db, current_user).load(course_id)
+    return [
+        LessonRetentionSchema(lesson_id=lesson_id, average_retention=average_retention)
+        for lesson_id, average_retention in deck.lesson_average_retention().items()
+    ]
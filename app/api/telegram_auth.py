@@ -1,28 +1,30 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Header, Response
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Response, Cookie
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas
 from app.crud import UserCRUD
 from app.database import get_db
 from app.config import settings
 from app.utils.telegram import extract_telegram_init_data, verify_telegram_webapp_data
-from app.utils.session_store import create_session
+from app.utils.session_store import create_session, delete_session, set_session_cookie, SESSION_COOKIE
 
 router = APIRouter(prefix="/telegram/mini-app", tags=["telegram"])
 
 
 @router.post("/auth")
-def telegram_mini_app_auth(
+async def telegram_mini_app_auth(
         response: Response,
         authorization: Optional[str] = Header(None),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     # Get the init data from Authorization header or request body
     init_data = extract_telegram_init_data(authorization)
     try:
         # Verify the Telegram WebApp data
-        user_data = verify_telegram_webapp_data(init_data, settings.telegram_bot_token)
+        user_data = verify_telegram_webapp_data(
+            init_data, settings.telegram_bot_token, single_use=settings.telegram_init_data_single_use
+        )
 
         if not user_data:
             raise HTTPException(
@@ -34,31 +36,22 @@ def telegram_mini_app_auth(
         telegram_id = user_data.get("id")
         username = user_data.get("username")
 
-        session_id = create_session(telegram_id)
-
-        response.set_cookie(
-            key="session_id",
-            value=session_id,
-            httponly=True,
-            secure=True,
-            samesite="strict",
-            max_age=15 * 60
-        )
-
         if not telegram_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Missing user ID in Telegram data"
             )
         # Check if user already exists
-        existing_user = UserCRUD.get_user_by_telegram_id(db, telegram_id)
+        existing_user = await UserCRUD.get_user_by_telegram_id(db, telegram_id)
         if existing_user:
             # Update user info if needed
             if username != existing_user.username:
                 existing_user.username = username
-                db.commit()
-                db.refresh(existing_user)
+                await UserCRUD.invalidate_user(db, telegram_id)
+                await db.commit()
+                await db.refresh(existing_user)
 
+            set_session_cookie(response, await create_session(telegram_id, existing_user.id))
             return {
                 "success": True,
                 "data": existing_user,
@@ -66,7 +59,7 @@ def telegram_mini_app_auth(
             }
         else:
             # Create new user
-            user_create = schemas.UserCreate(
+            user_create = schemas.UserCreateSchema(
                 telegram_id=telegram_id,
                 username=username,
                 first_name=user_data.get("first_name"),
@@ -74,7 +67,8 @@ def telegram_mini_app_auth(
                 language_code=user_data.get("language_code", "en")
             )
 
-            new_user = UserCRUD.create_user(db, user_create)
+            new_user = await UserCRUD.create_user(db, user_create)
+            set_session_cookie(response, await create_session(telegram_id, new_user.id))
             return {
                 "success": True,
                 "data": new_user,
@@ -89,3 +83,15 @@ def telegram_mini_app_auth(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during authentication"
         )
+
+
+@router.post("/logout")
+async def telegram_mini_app_logout(
+        response: Response,
+        session_id: Optional[str] = Cookie(default=None)
+):
+    """End the current session, signed session tokens are revoked"""
+    if session_id:
+        await delete_session(session_id)
+    response.delete_cookie(key=SESSION_COOKIE, httponly=True, secure=True, samesite="strict")
+    return {"success": True, "message": "Logged out"}
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.functions import current_user
 
 from app.database import get_db
 from app.models import User
-from app.schemas import UserSchema
+from app.schemas import UserSchema, ProgressSummarySchema, CurrentUserSchema
 from app.crud import UserCRUD, LessonProgressCRUD
 # from app.api.dependencies import get_current_user
-from app.utils.session_store import get_current_user
+from app.utils.session_store import get_current_user, get_current_user_record
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -26,8 +27,9 @@ async def update_user_info(
         first_name: str = None,
         last_name: str = None,
         language_code: str = None,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        desired_retention: Optional[float] = Query(None, gt=0, lt=1),
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Update current user information"""
     update_data = {}
@@ -39,6 +41,8 @@ async def update_user_info(
         update_data["last_name"] = last_name
     if language_code is not None:
         update_data["language_code"] = language_code
+    if desired_retention is not None:
+        update_data["desired_retention"] = desired_retention
 
     if not update_data:
         raise HTTPException(
@@ -46,7 +50,7 @@ async def update_user_info(
             detail="No update data provided"
         )
 
-    updated_user = UserCRUD.update_user(db, current_user.id, **update_data)
+    updated_user = await UserCRUD.update_user(db, current_user.id, **update_data)
     if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -56,26 +60,10 @@ async def update_user_info(
     return updated_user
 
 
-@router.get("/progress", response_model=dict)
-async def get_current_user_info(
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+@router.get("/progress", response_model=ProgressSummarySchema)
+async def get_user_progress(
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
-    """Get lesson progress information"""
-    lessons = LessonProgressCRUD.get_lessons_progresses(db, current_user.id)
-    total_lessons = len(lessons)
-    completed_lessons = 0
-    total_words = 0
-    words_due_for_review = 0
-    for lesson in lessons:
-        total_words += lesson.words_learned
-        words_due_for_review += lesson.words_to_review
-        if lesson.is_completed:
-            completed_lessons += 1
-    return {
-        "total_words": total_words,
-        "completed_lessons": completed_lessons,
-        "total_lessons": total_lessons,
-        "words_due_for_review": words_due_for_review
-    }
-
+    """Get lesson and review progress information"""
+    return await LessonProgressCRUD.get_user_progress_summary(db, current_user.id)
@@ -1,89 +1,152 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import logging
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.models import User
 from app.schemas import (
-    WordSchema, WordCreateSchema, WordUpdateSchema, SuccessResponseSchema
+    WordSchema, WordCreateSchema, WordUpdateSchema, SuccessResponseSchema, WordImportResultSchema,
+    CurrentUserSchema
 )
 from app.crud import WordCRUD
 # from app.api.dependencies import get_current_user
-from app.utils.session_store import get_current_user
+from app.utils.session_store import get_current_user_record
+from app.utils.responses import schema_response
+from app.utils.streaming import ndjson_response
+from app.word_import import WordImporter, ImportFormatError, detect_format, iter_records
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/words", tags=["words"])
 
 
 @router.get("/lesson/{lesson_id}", response_model=List[WordSchema])
 async def get_lesson_words(
+        response: Response,
         lesson_id: int,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        after_id: Optional[int] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000),
+        stream: bool = False,
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
-    """Get all words for a specific lesson"""
-    return WordCRUD.get_lesson_words(db, lesson_id, current_user.id)
+    """Get the words of a lesson.
+
+    Pass the id of the last word seen as `after_id` to get the next page, or
+    `stream=true` to receive the words as NDJSON.
+    """
+    if stream:
+        stmt = WordCRUD.lesson_words_query(lesson_id, current_user.id, after_id, limit)
+        return ndjson_response(WordSchema, stmt, response)
+    words = await WordCRUD.get_lesson_words(db, lesson_id, current_user.id, after_id, limit)
+    return schema_response(List[WordSchema], words, response)
 
 
 @router.post("/lesson/{lesson_id}", response_model=WordSchema)
 async def create_word(
+        response: Response,
         lesson_id: int,
         word_data: WordCreateSchema,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Create a new word in a lesson"""
     # Verify lesson belongs to user
     from app.crud import LessonCRUD
-    lesson = LessonCRUD.get_lesson(db, lesson_id, current_user.id)
+    lesson = await LessonCRUD.get_lesson(db, lesson_id, current_user.id)
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Lesson not found"
         )
 
-    return WordCRUD.create_word(db, word_data, lesson_id)
+    word = await WordCRUD.create_word(db, word_data, lesson_id, current_user.id)
+    return schema_response(WordSchema, word, response)
+
+
+@router.post("/import", response_model=WordImportResultSchema)
+async def import_words(
+        course_id: int,
+        lesson_id: Optional[int] = None,
+        create_lessons: bool = False,
+        format: Optional[str] = None,
+        file: UploadFile = File(...),
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
+):
+    """Bulk import words from a CSV, JSON, NDJSON or Anki (.apkg) file.
+
+    Records without a `lesson` field go into `lesson_id`. Invalid records are
+    skipped and reported per row, the valid ones are imported.
+    """
+    try:
+        records = iter_records(file.file, detect_format(file.filename, format))
+        importer = WordImporter(db, current_user.id, course_id, lesson_id, create_lessons)
+        result = await importer.run(records)
+    except ImportFormatError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        await db.rollback()
+        logger.exception("Word import into course %s failed", course_id)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error importing words: {str(e)}"
+        )
+
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course or lesson not found"
+        )
+    return result
 
 
 @router.get("/{word_id}", response_model=WordSchema)
 async def get_word(
+        response: Response,
         word_id: int,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Get a specific word"""
-    word = WordCRUD.get_word(db, word_id, current_user.id)
+    word = await WordCRUD.get_word(db, word_id, current_user.id)
     if not word:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Word not found"
         )
-    return word
+    return schema_response(WordSchema, word, response)
 
 
 @router.put("/{word_id}", response_model=WordSchema)
 async def update_word(
+        response: Response,
         word_id: int,
         word_data: WordUpdateSchema,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Update a word"""
-    word = WordCRUD.update_word(db, word_id, current_user.id, word_data)
+    word = await WordCRUD.update_word(db, word_id, current_user.id, word_data)
     if not word:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Word not found"
         )
-    return word
+    return schema_response(WordSchema, word, response)
 
 
 @router.delete("/{word_id}", response_model=SuccessResponseSchema)
 async def delete_word(
         word_id: int,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: CurrentUserSchema = Depends(get_current_user_record),
+        db: AsyncSession = Depends(get_db)
 ):
     """Delete a word"""
-    success = WordCRUD.delete_word(db, word_id, current_user.id)
+    success = await WordCRUD.delete_word(db, word_id, current_user.id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,168 @@
+"""Streaming course export as NDJSON or CSV.
+
+Every word of a course is written as one WordExportSchema record with its lesson,
+the owner's card state and review history, in the format app.word_import reads back.
+Rows come from a server-side cursor, so memory stays flat whatever the course size.
+Run as
+
+    python -m app.course_export COURSE_ID --user-id ID [--format csv] [--output course.ndjson.gz]
+"""
+import argparse
+import asyncio
+import csv
+import io
+import sys
+import zlib
+from typing import Optional, AsyncIterator
+
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Course, Lesson, Word, UserWord, Review
+from app.schemas import WordExportSchema, WordCardExportSchema, WordReviewExportSchema
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_BATCH_SIZE = 1000
+CSV_COLUMNS = tuple(WordExportSchema.model_fields)
+GZIP_CHUNK_SIZE = 64 * 1024
+
+
+class CourseExporter:
+    """Streams the words of one course with the owner's card states and reviews"""
+    WORD_COLUMNS = (
+        Word.id, Lesson.title, Lesson.order_index, Word.text, Word.translation,
+        Word.pronunciation, Word.example_sentence
+    )
+    CARD_COLUMNS = (
+        UserWord.state, UserWord.step, UserWord.stability, UserWord.difficulty,
+        UserWord.due, UserWord.last_review
+    )
+    REVIEW_COLUMNS = (Review.rating, Review.review_datetime, Review.response_time_seconds)
+
+    def __init__(self, db: AsyncSession, user_id: int, course_id: int):
+        self.db = db
+        self.user_id = user_id
+        self.course_id = course_id
+
+    async def exists(self) -> bool:
+        course_id = await self.db.scalar(
+            select(Course.id).where(Course.id == self.course_id, Course.user_id == self.user_id)
+        )
+        return course_id is not None
+
+    async def iter_words(self) -> AsyncIterator[WordExportSchema]:
+        stmt = select(*self.WORD_COLUMNS, *self.CARD_COLUMNS, *self.REVIEW_COLUMNS) \
+            .join(Lesson, Lesson.id == Word.lesson_id) \
+            .outerjoin(UserWord, and_(UserWord.word_id == Word.id, UserWord.user_id == self.user_id)) \
+            .outerjoin(Review, Review.user_word_id == UserWord.id) \
+            .where(Word.user_id == self.user_id, Lesson.course_id == self.course_id) \
+            .order_by(Lesson.order_index, Lesson.id, Word.id, Review.review_datetime, Review.id) \
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+        word_columns = len(self.WORD_COLUMNS)
+        reviews_start = word_columns + len(self.CARD_COLUMNS)
+        word = None
+        word_id = None
+        # Rows arrive grouped by word, one per review
+        async for row in await self.db.stream(stmt):
+            if row[0] != word_id:
+                if word is not None:
+                    yield word
+                word_id = row[0]
+                card_row = row[word_columns:reviews_start]
+                word = WordExportSchema(
+                    lesson=row[1],
+                    lesson_order_index=row[2],
+                    text=row[3],
+                    translation=row[4],
+                    pronunciation=row[5],
+                    example_sentence=row[6],
+                    card=WordCardExportSchema(**dict(zip((column.key for column in self.CARD_COLUMNS), card_row)))
+                    if card_row[0] is not None else None
+                )
+            if row[reviews_start] is not None:
+                word.reviews.append(WordReviewExportSchema(
+                    **dict(zip((column.key for column in self.REVIEW_COLUMNS), row[reviews_start:]))
+                ))
+        if word is not None:
+            yield word
+
+    async def iter_lines(self, format: str = "ndjson") -> AsyncIterator[str]:
+        if format == "ndjson":
+            async for word in self.iter_words():
+                yield word.model_dump_json() + "\n"
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def line(values) -> str:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(values)
+            return buffer.getvalue()
+
+        yield line(CSV_COLUMNS)
+        async for word in self.iter_words():
+            record = word.model_dump(mode="json")
+            # Nested card and reviews travel as JSON encoded columns
+            record["card"] = word.card.model_dump_json() if word.card else ""
+            record["reviews"] = "[" + ",".join(review.model_dump_json() for review in word.reviews) + "]"
+            yield line(["" if record[column] is None else record[column] for column in CSV_COLUMNS])
+
+
+async def gzip_stream(lines: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """Gzip a stream of text lines into chunks of about GZIP_CHUNK_SIZE bytes"""
+    compressor = zlib.compressobj(wbits=31)
+    pending = []
+    pending_size = 0
+    async for text in lines:
+        data = text.encode()
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size >= GZIP_CHUNK_SIZE:
+            compressed = compressor.compress(b"".join(pending))
+            pending.clear()
+            pending_size = 0
+            if compressed:
+                yield compressed
+    yield compressor.compress(b"".join(pending)) + compressor.flush()
+
+
+async def export_course(user_id: int, course_id: int, format: str, output: Optional[str]) -> bool:
+    from app.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        exporter = CourseExporter(db, user_id, course_id)
+        if not await exporter.exists():
+            return False
+
+        lines = exporter.iter_lines(format)
+        if output is None:
+            async for text in lines:
+                sys.stdout.write(text)
+        elif output.endswith(".gz"):
+            with open(output, "wb") as fileobj:
+                async for chunk in gzip_stream(lines):
+                    fileobj.write(chunk)
+        else:
+            with open(output, "w", encoding="utf-8", newline="") as fileobj:
+                async for text in lines:
+                    fileobj.write(text)
+    return True
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export a course with card states and review history")
+    parser.add_argument("course_id", type=int, help="course to export")
+    parser.add_argument("--user-id", type=int, required=True, help="owner of the course")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson", help="output format")
+    parser.add_argument("--output", "-o", default=None, help="output file, gzipped if it ends in .gz, stdout by default")
+    args = parser.parse_args(argv)
+
+    if not asyncio.run(export_course(args.user_id, args.course_id, args.format, args.output)):
+        parser.exit(1, "Course not found for this user\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,108 @@
-from datetime import datetime, timezone
-from typing import Optional, List
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, List, AsyncIterator, Iterable, Type
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, desc, asc, select, func, tuple_, true, literal, Integer, String, Select, cast
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, asc
+from app.config import settings
 from app.models import User, Course, Lesson, Word, UserWord, LessonProgress
 from app.schemas import (
     UserCreateSchema, UserSchema, CourseCreateSchema, CourseUpdateSchema, CourseSchema,
     LessonCreateSchema, LessonUpdateSchema, LessonSchema, WordCreateSchema,
     WordUpdateSchema, WordSchema, LessonProgressCreateSchema, LessonProgressUpdateSchema,
-    LessonProgressSchema, UserWordSchema
+    LessonProgressSchema, UserWordSchema, CourseWithLessonsAndWordsSchema, LessonWithWordsSchema,
+    ProgressSummarySchema, CardStateCountsSchema, StateEnum, CurrentUserSchema
 )
+from app.utils.cache import TTLCache
+
+progress_cache = TTLCache(settings.progress_cache_size, settings.progress_cache_ttl_seconds)
+user_cache = TTLCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+
+# NOTIFY channel carrying the telegram ids of users whose cached record is stale
+USER_CACHE_CHANNEL = "user_cache_invalidate"
+# NOTIFY channel carrying the ids of users whose cached progress summary is stale,
+# or ALL_USERS when every summary is
+PROGRESS_CACHE_CHANNEL = "progress_cache_invalidate"
+ALL_USERS = "*"
+
+# Rows fetched per round trip when streaming listings over a server-side cursor
+STREAM_BATCH_SIZE = 500
+
+
+async def stream_scalars(db: AsyncSession, stmt: Select) -> AsyncIterator:
+    result = await db.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    async for obj in result.scalars():
+        yield obj
+
+
+@lru_cache(maxsize=None)
+def schema_columns(model, schema: Type[BaseModel]) -> tuple:
+    """Columns of `model` behind the fields of `schema`.
+
+    Rows selected with them validate straight into the schema, without building ORM objects.
+    """
+    return tuple(getattr(model, name) for name in schema.model_fields if name in model.__table__.c)
+
+
+async def get_words_by_lesson(db: AsyncSession, user_id: int, *criteria) -> dict[int, list]:
+    """Word rows of the user matching `criteria` in insertion order, grouped by lesson id"""
+    result = await db.execute(
+        select(*schema_columns(Word, WordSchema)).where(Word.user_id == user_id, *criteria).order_by(Word.id)
+    )
+    words = defaultdict(list)
+    for row in result:
+        words[row.lesson_id].append(row)
+    return words
 
 
 class UserCRUD:
     @staticmethod
-    def get_user_by_telegram_id(db: Session, telegram_id: int) -> Optional[User]:
-        return db.query(User).filter(User.telegram_id == telegram_id).first()
+    async def get_user_by_telegram_id(db: AsyncSession, telegram_id: int) -> Optional[User]:
+        result = await db.execute(select(User).where(User.telegram_id == telegram_id))
+        return result.scalars().first()
+
+    @staticmethod
+    async def get_current_user_record(db: AsyncSession, telegram_id: int) -> Optional[CurrentUserSchema]:
+        record = user_cache.get(telegram_id)
+        if record is not None:
+            return record
+
+        result = await db.execute(
+            select(User.id, User.telegram_id, User.username, User.language_code)
+            .where(User.telegram_id == telegram_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        record = CurrentUserSchema.model_validate(row)
+        user_cache.set(telegram_id, record)
+        return record
+
+    @staticmethod
+    async def invalidate_user(db: AsyncSession, telegram_id: int) -> None:
+        """Drop the cached record here now and in every worker once the transaction commits"""
+        user_cache.pop(telegram_id)
+        await db.execute(select(func.pg_notify(USER_CACHE_CHANNEL, str(telegram_id))))
+
+    @staticmethod
+    def on_user_invalidated(payload: str) -> None:
+        user_cache.pop(int(payload))
 
     @staticmethod
-    def create_user(db: Session, user_data: UserCreateSchema) -> UserSchema:
-        db_user = UserSchema(**user_data.dict())
+    async def create_user(db: AsyncSession, user_data: UserCreateSchema) -> UserSchema:
+        db_user = User(**user_data.model_dump())
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         return db_user
 
     @staticmethod
-    def update_user(db: Session, user_id: int, **kwargs) -> Optional[UserSchema]:
-        user = db.query(User).filter(User.id == user_id).first()
+    async def update_user(db: AsyncSession, user_id: int, **kwargs) -> Optional[UserSchema]:
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalars().first()
         if user:
             # Disallow streak fields from being updated via generic user update
             disallowed = {"current_streak", "longest_streak", "last_active_date"}
@@ -34,187 +110,263 @@ class UserCRUD:
                 if key in disallowed:
                     continue
                 setattr(user, key, value)
-            db.commit()
-            db.refresh(user)
+            await UserCRUD.invalidate_user(db, user.telegram_id)
+            await db.commit()
+            await db.refresh(user)
         return user
 
 
 class CourseCRUD:
     @staticmethod
-    def get_user_courses(db: Session, user_id: int) -> List[CourseSchema]:
-        return db.query(Course).filter(Course.user_id == user_id).order_by(desc(Course.created_at)).all()
+    def user_courses_query(user_id: int, after_id: Optional[int] = None, limit: Optional[int] = None) -> Select:
+        """Newest courses first, keyset paginated after the course `after_id`"""
+        stmt = select(Course).where(Course.user_id == user_id)
+        if after_id is not None:
+            anchor = select(Course.created_at, Course.id).where(
+                and_(Course.id == after_id, Course.user_id == user_id)
+            ).subquery()
+            stmt = stmt.join(anchor, tuple_(Course.created_at, Course.id) < tuple_(anchor.c.created_at, anchor.c.id))
+        stmt = stmt.order_by(desc(Course.created_at), desc(Course.id))
+        return stmt.limit(limit) if limit is not None else stmt
 
     @staticmethod
-    def get_course(db: Session, course_id: int, user_id: int) -> Optional[CourseSchema]:
-        return db.query(Course).filter(
+    async def get_user_courses(db: AsyncSession, user_id: int, after_id: Optional[int] = None,
+                               limit: Optional[int] = None) -> List[CourseSchema]:
+        result = await db.execute(CourseCRUD.user_courses_query(user_id, after_id, limit))
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_course(db: AsyncSession, course_id: int, user_id: int) -> Optional[CourseSchema]:
+        result = await db.execute(select(Course).where(
             and_(Course.id == course_id, Course.user_id == user_id)
-        ).first()
+        ))
+        return result.scalars().first()
+
+    @staticmethod
+    async def get_course_tree(db: AsyncSession, course_id: int,
+                              user_id: int) -> Optional[CourseWithLessonsAndWordsSchema]:
+        """Course with its lessons in order and their words, in three queries over plain rows"""
+        result = await db.execute(
+            select(*schema_columns(Course, CourseSchema))
+            .where(and_(Course.id == course_id, Course.user_id == user_id))
+        )
+        course = result.first()
+        if course is None:
+            return None
+
+        result = await db.execute(
+            select(*schema_columns(Lesson, LessonSchema))
+            .where(and_(Lesson.course_id == course_id, Lesson.user_id == user_id))
+            .order_by(Lesson.order_index, Lesson.id)
+        )
+        lessons = result.all()
+        words = await get_words_by_lesson(db, user_id, Word.lesson_id.in_([lesson.id for lesson in lessons]))
+        return CourseWithLessonsAndWordsSchema.model_validate({
+            **course._asdict(),
+            "lessons": [{**lesson._asdict(), "words": words[lesson.id]} for lesson in lessons]
+        }, from_attributes=True)
 
     @staticmethod
-    def create_course(db: Session, course_data: CourseCreateSchema, user_id: int) -> CourseSchema:
+    async def create_course(db: AsyncSession, course_data: CourseCreateSchema, user_id: int) -> CourseSchema:
         db_course = Course(**course_data.__dict__, user_id=user_id)
         db.add(db_course)
-        db.commit()
-        db.refresh(db_course)
+        await db.commit()
+        await db.refresh(db_course)
         return CourseSchema.model_validate(db_course)
 
     @staticmethod
-    def update_course(db: Session, course_id: int, user_id: int, course_data: CourseUpdateSchema) -> Optional[CourseSchema]:
-        course = db.query(Course).filter(
-            and_(Course.id == course_id, Course.user_id == user_id)
-        ).first()
+    async def update_course(db: AsyncSession, course_id: int, user_id: int,
+                            course_data: CourseUpdateSchema) -> Optional[CourseSchema]:
+        course = await CourseCRUD.get_course(db, course_id, user_id)
         if course:
             update_data = course_data.dict(exclude_unset=True)
             for key, value in update_data.items():
                 setattr(course, key, value)
-            db.commit()
-            db.refresh(course)
+            await db.commit()
+            await db.refresh(course)
         return course
 
     @staticmethod
-    def delete_course(db: Session, course_id: int, user_id: int) -> bool:
-        course = db.query(Course).filter(
-            and_(Course.id == course_id, Course.user_id == user_id)
-        ).first()
+    async def delete_course(db: AsyncSession, course_id: int, user_id: int) -> bool:
+        course = await CourseCRUD.get_course(db, course_id, user_id)
         if course:
-            db.delete(course)
-            db.commit()
+            await db.delete(course)
+            await db.commit()
             return True
         return False
 
 
 class LessonCRUD:
     @staticmethod
-    def get_course_lessons(db: Session, course_id: int, user_id: int) -> List[LessonSchema]:
-        return db.query(Lesson).join(Course).filter(
-            and_(Lesson.course_id == course_id, Course.user_id == user_id)
-        ).all()
+    def course_lessons_query(course_id: int, user_id: int, after_order_index: Optional[int] = None,
+                             after_id: Optional[int] = None, limit: Optional[int] = None) -> Select:
+        """Lessons in course order, keyset paginated after (`after_order_index`, `after_id`)"""
+        stmt = select(Lesson).where(and_(Lesson.user_id == user_id, Lesson.course_id == course_id))
+        if after_order_index is not None:
+            stmt = stmt.where(tuple_(Lesson.order_index, Lesson.id) > tuple_(after_order_index, after_id or 0))
+        stmt = stmt.order_by(Lesson.order_index, Lesson.id)
+        return stmt.limit(limit) if limit is not None else stmt
+
+    @staticmethod
+    async def get_course_lessons(db: AsyncSession, course_id: int, user_id: int,
+                                 after_order_index: Optional[int] = None, after_id: Optional[int] = None,
+                                 limit: Optional[int] = None) -> List[LessonSchema]:
+        result = await db.execute(
+            LessonCRUD.course_lessons_query(course_id, user_id, after_order_index, after_id, limit)
+        )
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_lesson(db: AsyncSession, lesson_id: int, user_id: int) -> Optional[LessonSchema]:
+        result = await db.execute(select(Lesson).where(
+            and_(Lesson.id == lesson_id, Lesson.user_id == user_id)
+        ))
+        return result.scalars().first()
 
     @staticmethod
-    def get_lesson(db: Session, lesson_id: int, user_id: int) -> Optional[LessonSchema]:
-        return db.query(Lesson).join(Course).filter(
-            and_(Lesson.id == lesson_id, Course.user_id == user_id)
-        ).first()
+    async def get_lesson_tree(db: AsyncSession, lesson_id: int, user_id: int) -> Optional[LessonWithWordsSchema]:
+        """Lesson with its words, in two queries over plain rows"""
+        result = await db.execute(
+            select(*schema_columns(Lesson, LessonSchema))
+            .where(and_(Lesson.id == lesson_id, Lesson.user_id == user_id))
+        )
+        lesson = result.first()
+        if lesson is None:
+            return None
+        words = await get_words_by_lesson(db, user_id, Word.lesson_id == lesson_id)
+        return LessonWithWordsSchema.model_validate(
+            {**lesson._asdict(), "words": words[lesson_id]}, from_attributes=True
+        )
 
     @staticmethod
-    def create_lesson(db: Session, lesson_data: LessonCreateSchema) -> LessonSchema:
-        db_lesson = Lesson(**lesson_data.__dict__)
+    async def create_lesson(db: AsyncSession, lesson_data: LessonCreateSchema, user_id: int) -> LessonSchema:
+        db_lesson = Lesson(**lesson_data.__dict__, user_id=user_id)
         db.add(db_lesson)
-        db.commit()
-        db.refresh(db_lesson)
+        await db.commit()
+        await db.refresh(db_lesson)
         return LessonSchema.model_validate(db_lesson)
 
     @staticmethod
-    def update_lesson(db: Session, lesson_id: int, user_id: int, lesson_data: LessonUpdateSchema) -> Optional[LessonSchema]:
-        lesson = db.query(Lesson).join(Course).filter(
-            and_(Lesson.id == lesson_id, Course.user_id == user_id)
-        ).first()
+    async def update_lesson(db: AsyncSession, lesson_id: int, user_id: int,
+                            lesson_data: LessonUpdateSchema) -> Optional[LessonSchema]:
+        lesson = await LessonCRUD.get_lesson(db, lesson_id, user_id)
         if lesson:
             update_data = lesson_data.dict(exclude_unset=True)
             for key, value in update_data.items():
                 setattr(lesson, key, value)
-            db.commit()
-            db.refresh(lesson)
+            await db.commit()
+            await db.refresh(lesson)
         return lesson
 
     @staticmethod
-    def delete_lesson(db: Session, lesson_id: int, user_id: int) -> bool:
-        lesson = db.query(Lesson).join(Course).filter(
-            and_(Lesson.id == lesson_id, Course.user_id == user_id)
-        ).first()
+    async def delete_lesson(db: AsyncSession, lesson_id: int, user_id: int) -> bool:
+        lesson = await LessonCRUD.get_lesson(db, lesson_id, user_id)
         if lesson:
-            db.delete(lesson)
-            db.commit()
+            await db.delete(lesson)
+            await db.commit()
             return True
         return False
 
 
 class WordCRUD:
     @staticmethod
-    def get_lesson_words(db: Session, lesson_id: int, user_id: int) -> List[WordSchema]:
-        return db.query(Word).join(Lesson).join(Course).filter(
-            and_(Word.lesson_id == lesson_id, Course.user_id == user_id)
-        ).all()
+    def lesson_words_query(lesson_id: int, user_id: int, after_id: Optional[int] = None,
+                           limit: Optional[int] = None) -> Select:
+        """Words in insertion order, keyset paginated after the word `after_id`"""
+        stmt = select(Word).where(and_(Word.user_id == user_id, Word.lesson_id == lesson_id))
+        if after_id is not None:
+            stmt = stmt.where(Word.id > after_id)
+        stmt = stmt.order_by(Word.id)
+        return stmt.limit(limit) if limit is not None else stmt
+
+    @staticmethod
+    async def get_lesson_words(db: AsyncSession, lesson_id: int, user_id: int, after_id: Optional[int] = None,
+                               limit: Optional[int] = None) -> List[WordSchema]:
+        result = await db.execute(WordCRUD.lesson_words_query(lesson_id, user_id, after_id, limit))
+        return result.scalars().all()
 
     @staticmethod
-    def get_word(db: Session, word_id: int, user_id: int) -> Optional[WordSchema]:
-        return db.query(Word).join(Lesson).join(Course).filter(
-            and_(Word.id == word_id, Course.user_id == user_id)
-        ).first()
+    async def get_word(db: AsyncSession, word_id: int, user_id: int) -> Optional[WordSchema]:
+        result = await db.execute(select(Word).where(
+            and_(Word.id == word_id, Word.user_id == user_id)
+        ))
+        return result.scalars().first()
 
     @staticmethod
-    def create_word(db: Session, word_data: WordCreateSchema, lesson_id: int) -> WordSchema:
-        db_word = Word(**word_data.__dict__, lesson_id=lesson_id)
+    async def create_word(db: AsyncSession, word_data: WordCreateSchema, lesson_id: int, user_id: int) -> WordSchema:
+        db_word = Word(**word_data.__dict__, lesson_id=lesson_id, user_id=user_id)
         db.add(db_word)
-        db.commit()
-        db.refresh(db_word)
+        await db.commit()
+        await db.refresh(db_word)
         return WordSchema.model_validate(db_word)
 
     @staticmethod
-    def update_word(db: Session, word_id: int, user_id: int, word_data: WordUpdateSchema) -> Optional[WordSchema]:
-        word = db.query(Word).join(Lesson).join(Course).filter(
-            and_(Word.id == word_id, Course.user_id == user_id)
-        ).first()
+    async def update_word(db: AsyncSession, word_id: int, user_id: int,
+                          word_data: WordUpdateSchema) -> Optional[WordSchema]:
+        word = await WordCRUD.get_word(db, word_id, user_id)
         if word:
             update_data = word_data.dict(exclude_unset=True)
             for key, value in update_data.items():
                 setattr(word, key, value)
-            db.commit()
-            db.refresh(word)
+            await db.commit()
+            await db.refresh(word)
         return word
 
     @staticmethod
-    def delete_word(db: Session, word_id: int, user_id: int) -> bool:
-        word = db.query(Word).join(Lesson).join(Course).filter(
-            and_(Word.id == word_id, Course.user_id == user_id)
-        ).first()
+    async def delete_word(db: AsyncSession, word_id: int, user_id: int) -> bool:
+        word = await WordCRUD.get_word(db, word_id, user_id)
         if word:
-            db.delete(word)
-            db.commit()
+            await db.delete(word)
+            await db.commit()
             return True
         return False
 
 
 class UserWordCRUD:
     @staticmethod
-    def get_user_word(db: Session, user_id: int, word_id: int) -> Optional[UserWordSchema]:
-        return db.query(UserWord).filter(
+    async def get_user_word(db: AsyncSession, user_id: int, word_id: int) -> Optional[UserWordSchema]:
+        result = await db.execute(select(UserWord).where(
             and_(UserWord.user_id == user_id, UserWord.word_id == word_id)
-        ).first()
+        ))
+        return result.scalars().first()
 
     @staticmethod
-    def get_user_words_by_lesson(db: Session, user_id: int, lesson_id: int) -> List[UserWordSchema]:
-        return db.query(UserWord).join(Word).filter(
+    async def get_user_words_by_lesson(db: AsyncSession, user_id: int, lesson_id: int) -> List[UserWordSchema]:
+        result = await db.execute(select(UserWord).join(Word).where(
             and_(UserWord.user_id == user_id, Word.lesson_id == lesson_id)
-        ).all()
+        ))
+        return result.scalars().all()
 
     @staticmethod
-    def get_user_words_due(db: Session, user_id: int, limit: int = 20) -> List[UserWordSchema]:
-        # This will be enhanced with FSRS logic
-        return db.query(UserWord).filter(UserWord.user_id == user_id).limit(limit).all()
+    async def get_user_words_due(db: AsyncSession, user_id: int, limit: int = 20) -> List[UserWordSchema]:
+        result = await db.execute(select(UserWord).where(
+            and_(UserWord.user_id == user_id, UserWord.due <= datetime.now(timezone.utc))
+        ).order_by(asc(UserWord.due)).limit(limit))
+        return result.scalars().all()
 
 
 class LessonProgressCRUD:
     @staticmethod
-    def get_lesson_progress(db: Session, user_id: int, lesson_id: int) -> Optional[LessonProgressSchema]:
-        return db.query(LessonProgress).filter(
+    async def get_lesson_progress(db: AsyncSession, user_id: int, lesson_id: int) -> Optional[LessonProgressSchema]:
+        result = await db.execute(select(LessonProgress).where(
             and_(LessonProgress.user_id == user_id, LessonProgress.lesson_id == lesson_id)
-        ).first()
+        ))
+        return result.scalars().first()
 
     @staticmethod
-    def create_lesson_progress(db: Session, progress_data: LessonProgressCreateSchema, user_id: int) -> LessonProgressCreateSchema:
+    async def create_lesson_progress(db: AsyncSession, progress_data: LessonProgressCreateSchema,
+                                     user_id: int) -> LessonProgressCreateSchema:
         db_progress = LessonProgress(**progress_data.__dict__, user_id=user_id)
         db.add(db_progress)
-        db.commit()
-        db.refresh(db_progress)
-        return LessonProgressCreateSchema.model_validate(db_progress)
+        await LessonProgressCRUD.invalidate_progress_summary(db, user_id)
+        await db.commit()
+        await db.refresh(db_progress)
+        return LessonProgressCreateSchema.model_validate(db_progress, from_attributes=True)
 
     @staticmethod
-    def update_lesson_progress(db: Session, user_id: int, lesson_id: int,
-                               progress_data: LessonProgressUpdateSchema) -> Optional[LessonProgressSchema]:
-        progress = db.query(LessonProgress).filter(
-            and_(LessonProgress.user_id == user_id, LessonProgress.lesson_id == lesson_id)
-        ).first()
+    async def update_lesson_progress(db: AsyncSession, user_id: int, lesson_id: int,
+                                     progress_data: LessonProgressUpdateSchema) -> Optional[LessonProgressSchema]:
+        progress = await LessonProgressCRUD.get_lesson_progress(db, user_id, lesson_id)
         if progress:
             update_data = progress_data.dict(exclude_unset=True)
             for key, value in update_data.items():
@@ -224,30 +376,79 @@ class LessonProgressCRUD:
                 progress.started_at = datetime.now(timezone.utc)
             if update_data.get('is_completed') and not progress.completed_at:
                 progress.completed_at = datetime.now(timezone.utc)
-            db.commit()
-            db.refresh(progress)
+            await LessonProgressCRUD.invalidate_progress_summary(db, user_id)
+            await db.commit()
+            await db.refresh(progress)
         return LessonProgressSchema.model_validate(progress)
 
     @staticmethod
-    def get_user_progress_summary(db: Session, user_id: int) -> dict:
-        """Get overall progress summary for a user"""
-        total_lessons = db.query(LessonProgress).filter(LessonProgress.user_id == user_id).count()
-        completed_lessons = db.query(LessonProgress).filter(
-            and_(LessonProgress.user_id == user_id, LessonProgress.is_completed == True)
-        ).count()
+    async def get_user_progress_summary(db: AsyncSession, user_id: int) -> ProgressSummarySchema:
+        """Get overall progress summary for a user in one aggregate query, cached per user"""
+        summary = progress_cache.get(user_id)
+        if summary is not None:
+            return summary
+
+        now = datetime.now(timezone.utc)
+        end_of_today = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), timezone.utc)
+
+        lessons = select(
+            func.count().label("total_lessons"),
+            func.count().filter(LessonProgress.is_completed.is_(True)).label("completed_lessons")
+        ).where(LessonProgress.user_id == user_id).subquery()
+        cards = select(
+            func.count().label("total_words"),
+            func.count().filter(UserWord.due <= now).label("due_now"),
+            func.count().filter(UserWord.due < end_of_today).label("due_today"),
+            *[
+                func.count().filter(UserWord.state == state.value).label(state.name.lower())
+                for state in StateEnum
+            ]
+        ).where(UserWord.user_id == user_id).subquery()
+
+        # Both sides are one row, the join only silences the cartesian product warning
+        row = (await db.execute(select(lessons, cards).select_from(lessons.join(cards, true())))).one()
+        summary = ProgressSummarySchema(
+            total_lessons=row.total_lessons,
+            completed_lessons=row.completed_lessons,
+            total_words=row.total_words,
+            words_due_for_review=row.due_now,
+            words_due_today=row.due_today,
+            cards_by_state=CardStateCountsSchema(
+                **{state.name.lower(): row._mapping[state.name.lower()] for state in StateEnum}
+            )
+        )
+        progress_cache.set(user_id, summary)
+        return summary
 
-        total_words = db.query(UserWord).filter(UserWord.user_id == user_id).count()
-        words_due = db.query(UserWord).filter(
-            and_(UserWord.user_id == user_id, UserWord.last_reviewed_at.isnot(None))
-        ).count()
+    @staticmethod
+    async def invalidate_progress_summary(db: AsyncSession, user_id: int) -> None:
+        """Drop the cached summary here now and in every worker once the transaction commits"""
+        progress_cache.pop(user_id)
+        await db.execute(select(func.pg_notify(PROGRESS_CACHE_CHANNEL, str(user_id))))
+
+    @staticmethod
+    def invalidate_progress_summaries(db: Session, user_ids: Optional[Iterable[int]] = None) -> None:
+        """For the offline jobs: drop the cached summaries of `user_ids`, of every user if
+        None, in every worker once the transaction commits"""
+        if user_ids is None:
+            progress_cache.clear()
+            db.execute(select(func.pg_notify(PROGRESS_CACHE_CHANNEL, ALL_USERS)))
+            return
+        user_ids = list(user_ids)
+        for user_id in user_ids:
+            progress_cache.pop(user_id)
+        # One NOTIFY per user in a single statement
+        stale = func.unnest(literal(user_ids, ARRAY(Integer))).column_valued("user_id")
+        db.execute(select(func.pg_notify(PROGRESS_CACHE_CHANNEL, cast(stale, String))))
 
-        return {
-            "total_lessons": total_lessons,
-            "completed_lessons": completed_lessons,
-            "total_words": total_words,
-            "words_due_for_review": words_due
-        }
+    @staticmethod
+    def on_progress_invalidated(payload: str) -> None:
+        if payload == ALL_USERS:
+            progress_cache.clear()
+        else:
+            progress_cache.pop(int(payload))
 
     @staticmethod
-    def get_lessons_progresses(db: Session, user_id: int) -> List[LessonProgressSchema]:
-        return db.query(LessonProgress).filter(LessonProgress.user_id == user_id).all()
+    async def get_lessons_progresses(db: AsyncSession, user_id: int) -> List[LessonProgressSchema]:
+        result = await db.execute(select(LessonProgress).where(LessonProgress.user_id == user_id))
+        return result.scalars().all()
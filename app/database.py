@@ -1,17 +1,139 @@
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from app.config import settings
 
-engine = create_engine(settings.database_url)
+ASYNC_DRIVERS = {
+    "asyncpg": "postgresql+asyncpg",
+    "psycopg": "postgresql+psycopg",
+}
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        self.checkouts += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        return connection
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_avg": self.wait_seconds_total / self.checkouts if self.checkouts else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+
+def _pool_options() -> Dict[str, Any]:
+    if settings.db_pgbouncer:
+        # PgBouncer owns the pooling, connections are returned to it after each transaction
+        return {"poolclass": NullPool}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def _async_connect_args() -> Dict[str, Any]:
+    if settings.db_driver == "psycopg":
+        # Transaction pooling can hand each transaction a different server connection,
+        # so statements prepared on one are unknown on the next
+        return {"prepare_threshold": None if settings.db_pgbouncer else settings.db_prepare_threshold}
+    if settings.db_pgbouncer:
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {}
+
+
+def _async_database_url():
+    if settings.db_driver not in ASYNC_DRIVERS:
+        raise ValueError(f"Unsupported db_driver {settings.db_driver!r}, expected one of {sorted(ASYNC_DRIVERS)}")
+    return make_url(settings.database_url).set(drivername=ASYNC_DRIVERS[settings.db_driver])
+
+
+# Synchronous engine for alembic and the offline FSRS jobs
+engine = create_engine(settings.database_url, **_pool_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Request handlers run on the event loop and use an async driver
+async_engine = create_async_engine(
+    _async_database_url(),
+    connect_args=_async_connect_args(),
+    **{"poolclass": InstrumentedAsyncPool, **_pool_options()}
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Connection pool statistics of the async engine"""
+    pool = async_engine.pool
+    if isinstance(pool, InstrumentedAsyncPool):
+        return {"pool": type(pool).__name__, **pool.stats()}
+    return {"pool": type(pool).__name__, "status": pool.status()}
+
+
+@asynccontextmanager
+async def listen(channel: str, callback: Callable[[str], None]) -> AsyncIterator[bool]:
+    """Call `callback` with the payload of every NOTIFY on `channel` while the context is open.
+
+    Holds one pooled connection for the duration. Only asyncpg can LISTEN here, and not
+    through PgBouncer transaction pooling, otherwise yields False and listens to nothing.
+    """
+    if settings.db_driver != "asyncpg" or settings.db_pgbouncer:
+        yield False
+        return
+
+    def on_notify(connection, pid, channel, payload):
+        callback(payload)
+
+    async with async_engine.connect() as connection:
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        await driver_connection.add_listener(channel, on_notify)
+        try:
+            yield True
+        finally:
+            await driver_connection.remove_listener(channel, on_notify)
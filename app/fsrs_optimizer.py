@@ -0,0 +1,193 @@
+"""Offline FSRS parameter optimizer.
+
+Fits personal FSRS parameters from each user's review history and stores them on
+the user, where the scheduler registry picks them up. Run as
+
+    python -m app.fsrs_optimizer [--incremental] [--reschedule] [--workers N] [--interval SECONDS]
+
+Requires the optimizer extra of the fsrs package: pip install "fsrs[optimizer]".
+"""
+import argparse
+import importlib.util
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import User, UserWord, Review
+
+# (user_word_id, rating, review_datetime, response_time_seconds)
+ReviewRow = tuple[int, int, datetime, Optional[float]]
+
+
+def to_review_logs(reviews: list[ReviewRow]) -> list:
+    """fsrs ReviewLogs of review rows"""
+    from fsrs import Rating, ReviewLog
+
+    return [
+        ReviewLog(
+            card_id=user_word_id,
+            rating=Rating(rating),
+            # Drivers return the session time zone, fsrs only accepts timezone.utc
+            review_datetime=review_datetime.astimezone(timezone.utc),
+            review_duration=int(response_time_seconds * 1000) if response_time_seconds is not None else None
+        )
+        for user_word_id, rating, review_datetime, response_time_seconds in reviews
+    ]
+
+
+def fit_user_parameters(user_id: int, reviews: list[ReviewRow]) -> tuple[int, list[float], int]:
+    """Fit FSRS parameters for one user, runs inside a worker process"""
+    from fsrs.optimizer import Optimizer
+
+    review_logs = to_review_logs(reviews)
+    parameters = Optimizer(review_logs).compute_optimal_parameters()
+    return user_id, list(parameters), len(review_logs)
+
+
+class ParameterOptimizer:
+    """Streams review histories and fits parameters per user in a process pool"""
+    def __init__(self, workers: Optional[int] = None, min_reviews: Optional[int] = None,
+                 min_new_reviews: Optional[int] = None, incremental: bool = False,
+                 write_batch_size: int = 100):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_reviews = settings.fsrs_optimizer_min_reviews if min_reviews is None else min_reviews
+        self.min_new_reviews = settings.fsrs_optimizer_min_new_reviews if min_new_reviews is None else min_new_reviews
+        self.incremental = incremental
+        self.write_batch_size = write_batch_size
+
+    def eligible_users(self):
+        """Subquery of (user_id, review_count) for users that need a fit"""
+        review_counts = select(
+            UserWord.user_id.label("user_id"),
+            func.count(Review.id).label("review_count")
+        ).join(Review, Review.user_word_id == UserWord.id).group_by(UserWord.user_id).subquery()
+
+        stmt = select(review_counts.c.user_id, review_counts.c.review_count).where(
+            review_counts.c.review_count >= self.min_reviews
+        )
+        if self.incremental:
+            stmt = stmt.join(User, User.id == review_counts.c.user_id).where(
+                review_counts.c.review_count - func.coalesce(User.fsrs_parameters_review_count, 0)
+                >= self.min_new_reviews
+            )
+        return stmt.subquery()
+
+    def stream_review_histories(self, db: Session):
+        """Yield (user_id, reviews) per eligible user over a server-side cursor"""
+        eligible = self.eligible_users()
+        stmt = select(
+            UserWord.user_id, Review.user_word_id, Review.rating,
+            Review.review_datetime, Review.response_time_seconds
+        ).join(Review, Review.user_word_id == UserWord.id).join(
+            eligible, eligible.c.user_id == UserWord.user_id
+        ).order_by(UserWord.user_id, Review.review_datetime, Review.id).execution_options(yield_per=10000)
+
+        rows = db.execute(stmt)
+        for user_id, user_rows in itertools.groupby(rows, key=lambda row: row[0]):
+            yield user_id, [tuple(row[1:]) for row in user_rows]
+
+    @staticmethod
+    def store_parameters(db: Session, results: list[tuple[int, list[float], int]]) -> None:
+        fitted_at = datetime.now(timezone.utc)
+        db.execute(update(User), [
+            {
+                "id": user_id,
+                "fsrs_parameters": parameters,
+                "fsrs_parameters_review_count": review_count,
+                "fsrs_parameters_fitted_at": fitted_at,
+            }
+            for user_id, parameters, review_count in results
+        ])
+        db.commit()
+
+    def run(self) -> list[int]:
+        """Run one optimization pass, returns the ids of the users that were fitted"""
+        if importlib.util.find_spec("torch") is None:
+            raise RuntimeError('FSRS optimizer requires torch, install it with: pip install "fsrs[optimizer]"')
+
+        started = time.perf_counter()
+        fitted_user_ids = []
+        pending_results = []
+        failures = 0
+
+        with SessionLocal() as read_db, SessionLocal() as write_db, \
+                ProcessPoolExecutor(max_workers=self.workers) as executor:
+            in_flight = set()
+
+            def collect(done):
+                nonlocal failures
+                for future in done:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        failures += 1
+                        print(f"[fsrs_optimizer] Fit failed: {e}")
+                        continue
+                    pending_results.append(result)
+                    fitted_user_ids.append(result[0])
+                if len(pending_results) >= self.write_batch_size:
+                    self.store_parameters(write_db, pending_results)
+                    pending_results.clear()
+                    elapsed = time.perf_counter() - started
+                    print(f"[fsrs_optimizer] {len(fitted_user_ids)} users fitted "
+                          f"({len(fitted_user_ids) / elapsed:.2f} users/s)")
+
+            for user_id, reviews in self.stream_review_histories(read_db):
+                # Keep a bounded number of histories in memory
+                if len(in_flight) >= self.workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(executor.submit(fit_user_parameters, user_id, reviews))
+
+            collect(wait(in_flight).done)
+            if pending_results:
+                self.store_parameters(write_db, pending_results)
+
+        elapsed = time.perf_counter() - started
+        rate = len(fitted_user_ids) / elapsed if elapsed > 0 else 0.0
+        print(f"[fsrs_optimizer] Fitted {len(fitted_user_ids)} users in {elapsed:.1f}s "
+              f"({rate:.2f} users/s, {failures} failed, {self.workers} workers)")
+        return fitted_user_ids
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fit personal FSRS parameters from the review history")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-fit users with enough new reviews since their last fit")
+    parser.add_argument("--min-reviews", type=int, default=None,
+                        help="minimum reviews a user needs to be fitted")
+    parser.add_argument("--min-new-reviews", type=int, default=None,
+                        help="new reviews since the last fit required in incremental mode")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to all cores")
+    parser.add_argument("--interval", type=int, default=None,
+                        help="run repeatedly, sleeping this many seconds between passes")
+    parser.add_argument("--reschedule", action="store_true",
+                        help="recompute the cards of fitted users with their new parameters")
+    args = parser.parse_args(argv)
+
+    optimizer = ParameterOptimizer(
+        workers=args.workers,
+        min_reviews=args.min_reviews,
+        min_new_reviews=args.min_new_reviews,
+        incremental=args.incremental
+    )
+    while True:
+        fitted_user_ids = optimizer.run()
+        if args.reschedule and fitted_user_ids:
+            from app.fsrs_rescheduler import CardRescheduler
+            CardRescheduler(user_ids=fitted_user_ids, workers=args.workers).run()
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Bulk FSRS card rescheduler.
+
+Replays every card's review log through its current scheduler and writes back the
+recomputed card state, e.g. after new parameters were fitted or a desired retention
+changed. Run as
+
+    python -m app.fsrs_rescheduler [--user-id ID ...] [--course-id ID] [--checkpoint PATH]
+"""
+import argparse
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Any, Iterable
+
+from fsrs import Rating, ReviewLog
+from sqlalchemy import select, update, bindparam, func
+from sqlalchemy.orm import Session
+
+from app.crud import LessonProgressCRUD
+from app.database import SessionLocal
+from app.fsrs_service import FSRSManager, CardRecord
+from app.models import User, Course, Lesson, Word, UserWord, Review
+
+# (updated_at, card row in CardRecord.COLUMNS order, parameters, desired_retention,
+#  [(rating, review_datetime, response_time_seconds), ...])
+CardHistory = tuple[Optional[datetime], tuple, Optional[list], Optional[float],
+                    list[tuple[int, datetime, Optional[float]]]]
+
+
+def reschedule_chunk(histories: list[CardHistory]) -> list[dict[str, Any]]:
+    """Replay a chunk of card histories, runs inside a worker process"""
+    rows = []
+    for updated_at, card_row, parameters, desired_retention, reviews in histories:
+        fsrs_manager = FSRSManager(parameters, desired_retention)
+        card = CardRecord.from_row(card_row)
+        review_logs = [
+            ReviewLog(
+                card_id=card.card_id,
+                rating=Rating(rating),
+                # Drivers return the session time zone, fsrs only accepts timezone.utc
+                review_datetime=review_datetime.astimezone(timezone.utc),
+                review_duration=int(response_time_seconds * 1000) if response_time_seconds is not None else None
+            )
+            for rating, review_datetime, response_time_seconds in reviews
+        ]
+        card = fsrs_manager.reschedule_card(card, review_logs)
+        rows.append({
+            "b_id": card.card_id,
+            "b_updated_at": updated_at,
+            **{f"b_{column}": value for column, value in card.to_columns().items()},
+        })
+    return rows
+
+
+class CardRescheduler:
+    """Streams (user word, reviews) groups and rewrites card states in batches"""
+    def __init__(self, user_ids: Optional[Iterable[int]] = None, course_id: Optional[int] = None,
+                 checkpoint_path: Optional[str] = None, workers: Optional[int] = None,
+                 chunk_size: int = 500, batch_size: int = 5000):
+        self.user_ids = list(user_ids) if user_ids is not None else None
+        self.course_id = course_id
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+
+    def read_checkpoint(self) -> int:
+        if self.checkpoint_path and self.checkpoint_path.exists():
+            return int(self.checkpoint_path.read_text().strip() or 0)
+        return 0
+
+    def write_checkpoint(self, user_word_id: int) -> None:
+        if self.checkpoint_path:
+            tmp_path = self.checkpoint_path.with_suffix(".tmp")
+            tmp_path.write_text(str(user_word_id))
+            tmp_path.replace(self.checkpoint_path)
+
+    def stream_histories(self, db: Session, after_id: int):
+        """Yield card histories ordered by user_word_id over a server-side cursor"""
+        card_columns = len(CardRecord.COLUMNS)
+        stmt = select(
+            *CardRecord.COLUMNS, UserWord.updated_at,
+            User.fsrs_parameters, User.desired_retention,
+            Course.fsrs_parameters, Course.desired_retention,
+            Review.rating, Review.review_datetime, Review.response_time_seconds
+        ).join(Review, Review.user_word_id == UserWord.id) \
+            .join(User, User.id == UserWord.user_id) \
+            .join(Word, Word.id == UserWord.word_id) \
+            .join(Lesson, Lesson.id == Word.lesson_id) \
+            .join(Course, Course.id == Lesson.course_id) \
+            .where(UserWord.id > after_id)
+        if self.user_ids is not None:
+            stmt = stmt.where(UserWord.user_id.in_(self.user_ids))
+        if self.course_id is not None:
+            stmt = stmt.where(Course.id == self.course_id)
+        stmt = stmt.order_by(UserWord.id, Review.review_datetime, Review.id).execution_options(yield_per=10000)
+
+        reviews_start = card_columns + 5
+        for _, rows in itertools.groupby(db.execute(stmt), key=lambda row: row[0]):
+            first = next(rows)
+            card_row = tuple(first[:card_columns])
+            (updated_at, user_parameters, user_retention,
+             course_parameters, course_retention) = first[card_columns:reviews_start]
+            reviews = [tuple(first[reviews_start:])] + [tuple(row[reviews_start:]) for row in rows]
+            # Course-level settings take precedence, as in FSRSManager.for_settings
+            parameters = course_parameters or user_parameters
+            desired_retention = course_retention if course_retention is not None else user_retention
+            yield updated_at, card_row, parameters, desired_retention, reviews
+
+    @staticmethod
+    def write_batch(db: Session, rows: list[dict[str, Any]]) -> None:
+        user_words = UserWord.__table__
+        # Skip cards that were reviewed after they were read, their state is already current
+        stmt = update(user_words).where(
+            user_words.c.id == bindparam("b_id"),
+            user_words.c.updated_at.is_not_distinct_from(bindparam("b_updated_at"))
+        ).values(
+            state=bindparam("b_state"),
+            step=bindparam("b_step"),
+            stability=bindparam("b_stability"),
+            difficulty=bindparam("b_difficulty"),
+            due=bindparam("b_due"),
+            last_review=bindparam("b_last_review"),
+            updated_at=func.now()
+        )
+        db.execute(stmt, rows)
+        db.commit()
+
+    def run(self) -> int:
+        """Reschedule all matching cards, returns the number of cards written"""
+        started = time.perf_counter()
+        after_id = self.read_checkpoint()
+        if after_id:
+            print(f"[fsrs_rescheduler] Resuming after user word {after_id}")
+
+        written = 0
+        pending_rows: list[dict[str, Any]] = []
+
+        def flush():
+            nonlocal written
+            self.write_batch(write_db, pending_rows)
+            LessonProgressCRUD.invalidate_progress_summaries(write_db, self.user_ids)
+            write_db.commit()
+            written += len(pending_rows)
+            self.write_checkpoint(pending_rows[-1]["b_id"])
+            pending_rows.clear()
+            elapsed = time.perf_counter() - started
+            print(f"[fsrs_rescheduler] {written} cards rescheduled ({written / elapsed:.0f} cards/s)")
+
+        with SessionLocal() as read_db, SessionLocal() as write_db, \
+                ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # Results are consumed in submission order so the checkpoint only ever advances
+            # past fully written cards
+            in_flight = deque()
+            histories = self.stream_histories(read_db, after_id)
+            while True:
+                chunk = list(itertools.islice(histories, self.chunk_size))
+                if chunk:
+                    in_flight.append(executor.submit(reschedule_chunk, chunk))
+                if in_flight and (not chunk or len(in_flight) >= self.workers * 2):
+                    pending_rows.extend(in_flight.popleft().result())
+                    if len(pending_rows) >= self.batch_size:
+                        flush()
+                if not chunk and not in_flight:
+                    break
+            if pending_rows:
+                flush()
+
+        elapsed = time.perf_counter() - started
+        print(f"[fsrs_rescheduler] Rescheduled {written} cards in {elapsed:.1f}s")
+        return written
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Recompute FSRS card states from their review logs")
+    parser.add_argument("--user-id", type=int, action="append", dest="user_ids",
+                        help="limit to a user, can be repeated")
+    parser.add_argument("--course-id", type=int, default=None, help="limit to a course")
+    parser.add_argument("--checkpoint", default=None, help="file to resume from and record progress in")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to all cores")
+    parser.add_argument("--chunk-size", type=int, default=500, help="cards per worker task")
+    parser.add_argument("--batch-size", type=int, default=5000, help="cards per UPDATE batch")
+    args = parser.parse_args(argv)
+
+    CardRescheduler(
+        user_ids=args.user_ids,
+        course_id=args.course_id,
+        checkpoint_path=args.checkpoint,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
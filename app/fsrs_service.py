@@ -1,125 +1,614 @@
-from typing import Optional, Dict, Any
+import base64
+import heapq
+import json
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Sequence, AsyncIterator
 from datetime import datetime, timezone
-from fsrs import Scheduler, Card, Rating, ReviewLog
-from app.schemas import RatingEnum, StateEnum, UserWordSchema, ReviewSchema
-from app.models import UserWord, Review
-from sqlalchemy.orm import Session
+import numpy as np
+from fsrs import Scheduler, Card, Rating, ReviewLog, State
+from app.schemas import (
+    RatingEnum, StateEnum, UserWordSchema, ReviewSchema, ReviewResultSchema, WordRatingBatchItemSchema,
+    DueOrderEnum, DueWordSchema, RatingPreviewSchema
+)
+from app.models import UserWord, Review, Word, Lesson, Course, LessonProgress
+from app.crud import LessonProgressCRUD
+from sqlalchemy import insert, select, update, func, and_, case, tuple_, literal, true, false
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+
+
+class SchedulerRegistry:
+    """Process-wide LRU cache of FSRS schedulers keyed by their parameter set"""
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._schedulers: OrderedDict[tuple, Scheduler] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, parameters: Optional[Sequence[float]] = None,
+            desired_retention: Optional[float] = None) -> Scheduler:
+        key = (tuple(parameters) if parameters else None, desired_retention)
+        with self._lock:
+            scheduler = self._schedulers.get(key)
+            if scheduler is not None:
+                self._schedulers.move_to_end(key)
+                return scheduler
+
+        scheduler_kwargs = {}
+        if parameters:
+            scheduler_kwargs["parameters"] = tuple(parameters)
+        if desired_retention is not None:
+            scheduler_kwargs["desired_retention"] = desired_retention
+        scheduler = Scheduler(**scheduler_kwargs)
+
+        with self._lock:
+            scheduler = self._schedulers.setdefault(key, scheduler)
+            self._schedulers.move_to_end(key)
+            while len(self._schedulers) > self.maxsize:
+                self._schedulers.popitem(last=False)
+        return scheduler
+
+    def clear(self) -> None:
+        with self._lock:
+            self._schedulers.clear()
+
+
+scheduler_registry = SchedulerRegistry(settings.fsrs_scheduler_cache_size)
+
+
+def encode_due_cursor(key: tuple, order: DueOrderEnum) -> str:
+    """Opaque continuation token for the last (priority, user_word_id) of a due page"""
+    priority, user_word_id = key
+    if order == DueOrderEnum.DUE:
+        priority = priority.isoformat()
+    payload = json.dumps([order.value, priority, user_word_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_due_cursor(cursor: Optional[str], order: DueOrderEnum) -> Optional[tuple]:
+    if not cursor:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_order, priority, user_word_id = json.loads(payload)
+        if cursor_order != order.value:
+            raise ValueError("cursor belongs to a different order")
+        if order == DueOrderEnum.DUE:
+            return datetime.fromisoformat(priority), int(user_word_id)
+        return float(priority), int(user_word_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+class CardRecord:
+    """Lightweight FSRS card state hydrated straight from the typed UserWord columns"""
+    __slots__ = ("card_id", "state", "step", "stability", "difficulty", "due", "last_review")
+
+    # Column order expected by from_row
+    COLUMNS = (
+        UserWord.id, UserWord.state, UserWord.step, UserWord.stability,
+        UserWord.difficulty, UserWord.due, UserWord.last_review
+    )
+
+    def __init__(self, card_id: Optional[int], state: int, step: Optional[int], stability: Optional[float],
+                 difficulty: Optional[float], due: datetime, last_review: Optional[datetime]):
+        self.card_id = card_id
+        self.state = state
+        self.step = step
+        self.stability = stability
+        self.difficulty = difficulty
+        self.due = due
+        self.last_review = last_review
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "CardRecord":
+        return cls(*row)
+
+    @classmethod
+    def from_user_word(cls, user_word) -> "CardRecord":
+        return cls(user_word.id, user_word.state, user_word.step, user_word.stability,
+                   user_word.difficulty, user_word.due, user_word.last_review)
+
+    @classmethod
+    def from_card(cls, card: Card, card_id: Optional[int] = None) -> "CardRecord":
+        return cls(card_id, int(card.state), card.step, card.stability,
+                   card.difficulty, card.due, card.last_review)
+
+    @classmethod
+    def new(cls, card_id: Optional[int] = None) -> "CardRecord":
+        """Card state of a word never reviewed, the same as fsrs' Card() defaults"""
+        return cls(card_id, int(State.Learning), 0, None, None, datetime.now(timezone.utc), None)
+
+    def to_card(self) -> Card:
+        # Without a card_id fsrs derives one from the clock and sleeps 1ms to keep it unique
+        return Card(
+            card_id=self.card_id or 0,
+            state=State(self.state),
+            step=self.step,
+            stability=self.stability,
+            difficulty=self.difficulty,
+            due=self.due,
+            last_review=self.last_review
+        )
+
+    def to_columns(self) -> Dict[str, Any]:
+        """Values for the typed UserWord card columns"""
+        return {
+            "state": self.state,
+            "step": self.step,
+            "stability": self.stability,
+            "difficulty": self.difficulty,
+            "due": self.due,
+            "last_review": self.last_review,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Card in the fsrs package's Card.to_dict() format"""
+        return {
+            "card_id": self.card_id,
+            "state": self.state,
+            "step": self.step,
+            "stability": self.stability,
+            "difficulty": self.difficulty,
+            "due": self.due.isoformat(),
+            "last_review": self.last_review.isoformat() if self.last_review else None,
+        }
 
 
 class FSRSManager:
     """Manages FSRS (Free Spaced Repetition Scheduler) integration"""
-    def __init__(self):
-        self.scheduler = Scheduler()
+    def __init__(self, parameters: Optional[Sequence[float]] = None,
+                 desired_retention: Optional[float] = None):
+        self.scheduler = scheduler_registry.get(parameters, desired_retention)
 
-    def review_card(self, user_word: UserWordSchema, rating: RatingEnum,
-                    response_time_seconds: Optional[float] = None) -> tuple[Dict[str, Any], Dict[str, Any]]:
-        # Prepare data
-        card = Card.from_dict(user_word.fsrs_card_data)
-        fsrs_rating = Rating(rating.value)
+    @classmethod
+    def for_settings(cls, user=None, course_parameters: Optional[Sequence[float]] = None,
+                     course_desired_retention: Optional[float] = None) -> "FSRSManager":
+        """Resolve the scheduler for a user, course-level settings take precedence"""
+        parameters = course_parameters or (user.fsrs_parameters if user is not None else None)
+        desired_retention = course_desired_retention
+        if desired_retention is None and user is not None:
+            desired_retention = user.desired_retention
+        return cls(parameters, desired_retention)
 
-        # Review the card
-        card, review_log = self.scheduler.review_card(
-            card, fsrs_rating, datetime.now(timezone.utc), response_time_seconds)
+    def review_card(self, card: CardRecord, rating: RatingEnum,
+                    response_time_seconds: Optional[float] = None,
+                    review_datetime: Optional[datetime] = None) -> tuple[CardRecord, ReviewLog]:
+        """Raises ValueError for a review time in the future or before the card's last review"""
+        now = datetime.now(timezone.utc)
+        if review_datetime is None:
+            review_datetime = now
+        elif review_datetime.tzinfo is None:
+            review_datetime = review_datetime.replace(tzinfo=timezone.utc)
+        else:
+            # fsrs requires UTC datetimes
+            review_datetime = review_datetime.astimezone(timezone.utc)
+        if review_datetime > now:
+            raise ValueError(f"Review time {review_datetime.isoformat()} is in the future")
+        if card.last_review is not None and review_datetime < card.last_review:
+            raise ValueError(
+                f"Review time {review_datetime.isoformat()} is before the card's last review "
+                f"{card.last_review.isoformat()}"
+            )
 
-        # Convert back to dictionaries
-        updated_card_data = card.to_dict()
-        review_log_data = review_log.to_dict()
+        reviewed_card, review_log = self.scheduler.review_card(
+            card.to_card(), Rating(rating.value), review_datetime, response_time_seconds)
 
-        return updated_card_data, review_log_data
+        return CardRecord.from_card(reviewed_card, card.card_id), review_log
 
-    def get_card_retrievability(self, user_word: UserWordSchema) -> float:
+    def get_card_retrievability(self, card: CardRecord) -> float:
         """Get the current retrievability (probability of recall) for a card"""
-        card = Card.from_dict(user_word.fsrs_card_data)
-        return self.scheduler.get_card_retrievability(card)
+        return self.scheduler.get_card_retrievability(card.to_card())
 
-    def is_card_due(self, user_word: UserWordSchema) -> bool:
+    def is_card_due(self, card: CardRecord) -> bool:
         """Check if a card is due for review"""
-        card = Card.from_dict(user_word.fsrs_card_data)
-        now = datetime.now(timezone.utc)
-        return card.due <= now
+        return card.due <= datetime.now(timezone.utc)
 
-    def get_next_review_time(self, user_word: UserWordSchema) -> Optional[datetime]:
+    def get_next_review_time(self, card: CardRecord) -> Optional[datetime]:
         """Get the next review time for a card"""
-        card = Card.from_dict(user_word.fsrs_card_data)
         return card.due
 
-    def get_card_state(self, user_word: UserWordSchema) -> StateEnum:
+    def get_card_state(self, card: CardRecord) -> StateEnum:
         """Get the current state of a card"""
-        card = Card.from_dict(user_word.fsrs_card_data)
         return StateEnum(card.state)
 
-    def reschedule_card(self, user_word: UserWordSchema, review_logs: list[ReviewLog]) -> Dict[str, Any]:
+    def reschedule_card(self, card: CardRecord, review_logs: list[ReviewLog]) -> CardRecord:
         """Reschedule a card based on historical review logs"""
-        card = Card.from_dict(user_word.fsrs_card_data)
-        rescheduled_card = self.scheduler.reschedule_card(card, review_logs)
-        return rescheduled_card.to_dict()
+        rescheduled_card = self.scheduler.reschedule_card(card.to_card(), review_logs)
+        return CardRecord.from_card(rescheduled_card, card.card_id)
 
 
 class WordLearningService:
     """Service for managing word learning with FSRS"""
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession, user=None):
         self.db = db
-        self.fsrs_manager = FSRSManager()
+        self.user = user
+        self.fsrs_manager = FSRSManager.for_settings(user)
 
-    def create_user_word(self, user_id: int, word_id: int) -> Optional[UserWordSchema]:
-        card = Card()
+    def _fsrs_manager_for_course(self, course_parameters: Optional[Sequence[float]],
+                                 course_desired_retention: Optional[float]) -> FSRSManager:
+        if course_parameters is None and course_desired_retention is None:
+            return self.fsrs_manager
+        return FSRSManager.for_settings(self.user, course_parameters, course_desired_retention)
+
+    async def create_user_word(self, user_id: int, word_id: int) -> Optional[UserWordSchema]:
         user_word = UserWord(
             user_id=user_id,
             word_id=word_id,
-            fsrs_card_data=card.to_dict()
+            **CardRecord.new().to_columns()
         )
         self.db.add(user_word)
-        self.db.commit()
-        self.db.refresh(user_word)
+        await LessonProgressCRUD.invalidate_progress_summary(self.db, user_id)
+        await self.db.commit()
+        await self.db.refresh(user_word)
 
         return UserWordSchema.model_validate(user_word)
 
 
-    def review_word(self, user_word: UserWordSchema, rating: RatingEnum,
+    async def review_word(self, user_word: UserWordSchema, rating: RatingEnum,
                     response_time_seconds: Optional[float] = None,
                     lesson_context: Optional[int] = None) -> tuple[UserWordSchema, ReviewSchema]:
         # Update FSRS card
-        updated_card_data, review_log_data = self.fsrs_manager.review_card(
-            user_word, rating, response_time_seconds
+        card, review_log = self.fsrs_manager.review_card(
+            CardRecord.from_user_word(user_word), rating, response_time_seconds
         )
 
-        # Update user word
-        user_word.fsrs_card_data = updated_card_data
-
         # Create review log
         review = Review(
             user_word_id=user_word.id,
             rating=rating.value,
-            review_datetime=datetime.fromisoformat(review_log_data["review_datetime"].replace('Z', '+00:00')),
+            review_datetime=review_log.review_datetime,
             # TODO: add due field
-            # due=updated_card_data.get("due"),
+            # due=card.due,
             lesson_context=lesson_context,
             response_time_seconds=response_time_seconds
         )
 
-        word_query = self.db.query(UserWord).filter(UserWord.id == user_word.id)
-        word_query.update({
-            'fsrs_card_data': user_word.fsrs_card_data
-        }, synchronize_session=False)
+        updated_user_word = await self.db.scalar(
+            update(UserWord).where(UserWord.id == user_word.id).values(**card.to_columns()).returning(UserWord)
+        )
 
         self.db.add(review)
-        self.db.commit()
-        self.db.refresh(review)
+        await LessonProgressCRUD.invalidate_progress_summary(self.db, user_word.user_id)
+        await self.db.commit()
+        await self.db.refresh(review)
+
+        return UserWordSchema.model_validate(updated_user_word), ReviewSchema.model_validate(review)
 
-        return UserWordSchema.model_validate(word_query.first()), ReviewSchema.model_validate(review)
 
+    async def rate_word(self, user_id: int, word_id: int, rating: RatingEnum,
+                  lesson_id: Optional[int] = None,
+                  response_time_seconds: Optional[float] = None) -> Optional[ReviewResultSchema]:
+        """Rate a single word with upserts and one commit.
 
-    def get_words_due_for_review(self, user_id: int, limit: int = 20) -> list[UserWordSchema]:
-        """Get words that are due for review"""
-        user_words = self.db.query(UserWord).filter(
-            UserWord.user_id == user_id
-        ).all()
+        Returns None if the word does not belong to the user.
+        """
+        # Ownership check and current card in one statement. Concurrent ratings of the same
+        # word are last-writer-wins on the card, each of them is still logged as a review.
+        row = (await self.db.execute(
+            select(Word.id, Course.fsrs_parameters, Course.desired_retention, *CardRecord.COLUMNS)
+            .join(Lesson, Word.lesson_id == Lesson.id)
+            .join(Course, Lesson.course_id == Course.id)
+            .outerjoin(UserWord, and_(UserWord.word_id == Word.id, UserWord.user_id == user_id))
+            .where(Word.id == word_id, Word.user_id == user_id)
+        )).first()
+        if row is None:
+            return None
 
-        due_words = []
-        for user_word in user_words:
-            if self.fsrs_manager.is_card_due(UserWordSchema.model_validate(user_word)):
-                due_words.append(UserWordSchema.model_validate(user_word))
+        # Word.id comes first, the card columns start at UserWord.id
+        card_row = row[3:]
+        new_review = 1 if card_row[0] is None else 0
+        card = CardRecord.new() if new_review else CardRecord.from_row(card_row)
+        fsrs_manager = self._fsrs_manager_for_course(row.fsrs_parameters, row.desired_retention)
+        card, review_log = fsrs_manager.review_card(card, rating, response_time_seconds)
+
+        card_columns = card.to_columns()
+        upsert = pg_insert(UserWord).values(user_id=user_id, word_id=word_id, **card_columns)
+        upsert = upsert.on_conflict_do_update(
+            constraint="uq_user_words_user_id_word_id",
+            set_={
+                **{column: upsert.excluded[column] for column in card_columns},
+                "updated_at": func.now(),
+            }
+        ).returning(UserWord.id)
+        user_word_id = (await self.db.execute(upsert)).scalar_one()
+        card.card_id = user_word_id
+
+        await self.db.execute(insert(Review).values(
+            user_word_id=user_word_id,
+            rating=rating.value,
+            review_datetime=review_log.review_datetime,
+            lesson_context=lesson_id,
+            response_time_seconds=response_time_seconds
+        ))
+
+        if lesson_id:
+            await self._upsert_lesson_progress(user_id, lesson_id, rating, new_review)
+
+        await LessonProgressCRUD.invalidate_progress_summary(self.db, user_id)
+        await self.db.commit()
+
+        return ReviewResultSchema(
+            word_id=word_id,
+            rating=rating,
+            success=True,
+            next_review_at=card.due,
+            fsrs_card_data=card.to_dict(),
+            review_log=review_log.to_dict()
+        )
+
+    async def _upsert_lesson_progress(self, user_id: int, lesson_id: int, rating: RatingEnum, new_review: int) -> None:
+        words_learned = 1 if rating >= 2 else 0
+        # INSERT ... SELECT over the user's own lesson: lessons of other users and lessons
+        # without words select no row, so no progress is written for them
+        source = select(
+            literal(user_id),
+            Lesson.id,
+            func.count(Word.id),
+            literal(words_learned),
+            literal(new_review - words_learned),
+            true(),
+            false(),
+            func.now()
+        ).join(Word, Word.lesson_id == Lesson.id) \
+            .where(Lesson.id == lesson_id, Lesson.user_id == user_id) \
+            .group_by(Lesson.id)
+
+        upsert = pg_insert(LessonProgress).from_select(
+            ["user_id", "lesson_id", "total_words", "words_learned", "words_to_review", "is_started",
+             "is_completed", "started_at"],
+            source
+        )
+        learned_total = func.coalesce(LessonProgress.words_learned, 0) + words_learned
+        is_completed = learned_total >= upsert.excluded.total_words
+        upsert = upsert.on_conflict_do_update(
+            constraint="uq_lesson_progress_user_id_lesson_id",
+            set_={
+                "words_learned": learned_total,
+                # TODO: remove words_to_review field or update its calculation, logic is wrong
+                "words_to_review": func.coalesce(LessonProgress.words_to_review, 0) - (1 - words_learned),
+                "total_words": upsert.excluded.total_words,
+                "is_completed": is_completed,
+                "completed_at": case(
+                    (and_(is_completed, LessonProgress.completed_at.is_(None)), func.now()),
+                    else_=LessonProgress.completed_at
+                ),
+                "updated_at": func.now(),
+            }
+        )
+        await self.db.execute(upsert)
+
+    # Word content columns selected ahead of the course settings and card columns
+    DUE_WORD_COLUMNS = (
+        Word.id, Word.lesson_id, Word.text, Word.translation, Word.pronunciation,
+        Word.example_sentence, Word.created_at, Word.updated_at
+    )
+
+    async def get_words_due_for_review(self, user_id: int, limit: int = 20, order: DueOrderEnum = DueOrderEnum.DUE,
+                                 cursor: Optional[str] = None) -> tuple[list[DueWordSchema], Optional[str]]:
+        """Get a page of words that are due for review and the cursor of the next page.
+
+        Raises ValueError for a malformed cursor.
+        """
+        now = datetime.now(timezone.utc)
+        after = decode_due_cursor(cursor, order)
+        stmt = select(*self.DUE_WORD_COLUMNS, Course.fsrs_parameters, Course.desired_retention, *CardRecord.COLUMNS) \
+            .join(UserWord, UserWord.word_id == Word.id) \
+            .join(Lesson, Lesson.id == Word.lesson_id) \
+            .join(Course, Course.id == Lesson.course_id) \
+            .where(UserWord.user_id == user_id)
+
+        if order == DueOrderEnum.DUE:
+            # Keyset page straight off the (user_id, due) index
+            stmt = stmt.where(UserWord.due <= now)
+            if after is not None:
+                stmt = stmt.where(tuple_(UserWord.due, UserWord.id) > tuple_(*after))
+            rows = (await self.db.execute(stmt.order_by(UserWord.due, UserWord.id).limit(limit))).all()
+            due_words = [self._due_word(row, now) for row in rows]
+            keys = [(due_word.due, due_word.user_word_id) for due_word in due_words]
+        else:
+            # Bounded heap over a server-side cursor, memory stays O(limit)
+            keys = await self._nsmallest_due_keys(limit, self._iter_due_keys(user_id, order, now, after))
+            rows = (await self.db.execute(stmt.where(UserWord.id.in_([key[-1] for key in keys])))).all()
+            due_words_by_id = {due_word.user_word_id: due_word for due_word in (self._due_word(row, now) for row in rows)}
+            due_words = [due_words_by_id[key[-1]] for key in keys if key[-1] in due_words_by_id]
+
+        next_cursor = encode_due_cursor(keys[-1], order) if len(keys) == limit else None
+        return due_words, next_cursor
+
+    def _due_word(self, row: Sequence[Any], now: datetime) -> DueWordSchema:
+        word_columns = len(self.DUE_WORD_COLUMNS)
+        course_parameters, course_desired_retention = row[word_columns:word_columns + 2]
+        card = CardRecord.from_row(row[word_columns + 2:])
+        fsrs_manager = self._fsrs_manager_for_course(course_parameters, course_desired_retention)
+
+        next_review_at = {
+            rating.name.lower(): fsrs_manager.review_card(card, rating, review_datetime=now)[0].due
+            for rating in RatingEnum
+        }
+        return DueWordSchema(
+            **{column.key: value for column, value in zip(self.DUE_WORD_COLUMNS, row[:word_columns])},
+            user_word_id=card.card_id,
+            state=card.state,
+            step=card.step,
+            stability=card.stability,
+            difficulty=card.difficulty,
+            due=card.due,
+            last_review=card.last_review,
+            next_review_at=RatingPreviewSchema(**next_review_at)
+        )
+
+    @staticmethod
+    async def _nsmallest_due_keys(limit: int, keys: AsyncIterator[tuple[float, int]]) -> list[tuple[float, int]]:
+        """heapq.nsmallest for an async stream of (priority, user_word_id) keys"""
+        # Max-heap of the smallest keys seen so far, stored negated
+        heap: list[tuple[float, int]] = []
+        async for priority, user_word_id in keys:
+            negated = (-priority, -user_word_id)
+            if len(heap) < limit:
+                heapq.heappush(heap, negated)
+            elif negated > heap[0]:
+                heapq.heapreplace(heap, negated)
+        return sorted((-priority, -user_word_id) for priority, user_word_id in heap)
+
+    async def _iter_due_keys(self, user_id: int, order: DueOrderEnum, now: datetime,
+                             after: Optional[tuple]) -> AsyncIterator[tuple[float, int]]:
+        """Stream (priority, user_word_id) of due cards, lower priority values come first.
+
+        Priorities are computed with DeckRetention, one NumPy pass per batch of rows.
+        """
+        # retention_service imports this module
+        from app.retention_service import DECK_COLUMNS, DeckRetention, deck_columns
+
+        course_decays = {
+            course_id: -self._fsrs_manager_for_course(parameters, desired_retention).scheduler.parameters[20]
+            for course_id, parameters, desired_retention in await self.db.execute(
+                select(Course.id, Course.fsrs_parameters, Course.desired_retention).where(Course.user_id == user_id)
+            )
+        }
+        default_decay = -self.fsrs_manager.scheduler.parameters[20]
+        stmt = select(*DECK_COLUMNS) \
+            .join(Word, Word.id == UserWord.word_id) \
+            .join(Lesson, Lesson.id == Word.lesson_id) \
+            .where(UserWord.user_id == user_id, UserWord.due <= now) \
+            .execution_options(yield_per=1000)
+
+        async for rows in (await self.db.stream(stmt)).partitions():
+            user_word_ids, word_ids, lesson_ids, course_ids, stability, last_review, due = deck_columns(rows)
+            decay = np.array([course_decays.get(course_id, default_decay) for course_id in course_ids.tolist()])
+            deck = DeckRetention(user_word_ids, word_ids, lesson_ids, stability, last_review, due, decay, now)
+            if order == DueOrderEnum.RETRIEVABILITY:
+                priorities = deck.retrievability
+            else:
+                # Most overdue relative to the scheduled interval first
+                interval = np.where(np.isnan(last_review), 0.0, due - last_review)
+                priorities = -(deck.now - due) / np.maximum(interval, 60.0)
+            for key in zip(priorities.tolist(), user_word_ids.tolist()):
+                if after is None or key > after:
+                    yield key
+
+    async def review_words_batch(self, user_id: int,
+                           ratings: list[WordRatingBatchItemSchema]) -> Optional[list[ReviewResultSchema]]:
+        """Apply an ordered session of ratings in a single transaction.
+
+        Returns None if any of the rated words does not belong to the user. Raises
+        ValueError if a rating's time is in the future or before the word's last review.
+        """
+        word_ids = {item.word_id for item in ratings}
+        fsrs_managers = {
+            word_id: self._fsrs_manager_for_course(course_parameters, course_desired_retention)
+            for word_id, course_parameters, course_desired_retention in await self.db.execute(
+                select(Word.id, Course.fsrs_parameters, Course.desired_retention)
+                .join(Lesson, Word.lesson_id == Lesson.id).join(Course, Lesson.course_id == Course.id)
+                .where(Word.id.in_(word_ids), Word.user_id == user_id)
+            )
+        }
+        if fsrs_managers.keys() != word_ids:
+            return None
+
+        user_words = {
+            user_word.word_id: user_word
+            for user_word in await self.db.scalars(
+                select(UserWord).where(UserWord.user_id == user_id, UserWord.word_id.in_(word_ids))
+            )
+        }
+        new_user_words = []
+        for word_id in word_ids - user_words.keys():
+            user_word = UserWord(
+                user_id=user_id,
+                word_id=word_id,
+                **CardRecord.new().to_columns()
+            )
+            user_words[word_id] = user_word
+            new_user_words.append(user_word)
+        if new_user_words:
+            self.db.add_all(new_user_words)
+            # Assigns ids for the review rows below
+            await self.db.flush()
+        unreviewed = {user_word.word_id for user_word in new_user_words}
+
+        results = []
+        review_rows = []
+        lesson_ratings: dict[int, list[tuple[int, int]]] = {}
+        for item in ratings:
+            user_word = user_words[item.word_id]
+            card, review_log = fsrs_managers[item.word_id].review_card(
+                CardRecord.from_user_word(user_word), item.rating, item.response_time_seconds, item.reviewed_at
+            )
+            for column, value in card.to_columns().items():
+                setattr(user_word, column, value)
+
+            review_rows.append({
+                "user_word_id": user_word.id,
+                "rating": item.rating.value,
+                "review_datetime": review_log.review_datetime,
+                "lesson_context": item.lesson_id,
+                "response_time_seconds": item.response_time_seconds,
+            })
+            if item.lesson_id:
+                new_review = 1 if item.word_id in unreviewed else 0
+                lesson_ratings.setdefault(item.lesson_id, []).append((item.rating.value, new_review))
+            unreviewed.discard(item.word_id)
+
+            results.append(ReviewResultSchema(
+                word_id=item.word_id,
+                rating=item.rating,
+                success=True,
+                next_review_at=card.due,
+                fsrs_card_data=card.to_dict(),
+                review_log=review_log.to_dict()
+            ))
+
+        await self.db.execute(insert(Review), review_rows)
+        if lesson_ratings:
+            await self._apply_lesson_ratings(user_id, lesson_ratings)
+
+        await LessonProgressCRUD.invalidate_progress_summary(self.db, user_id)
+        await self.db.commit()
+        return results
+
+    async def _apply_lesson_ratings(self, user_id: int, lesson_ratings: dict[int, list[tuple[int, int]]]) -> None:
+        """Fold (rating, new_review) pairs into lesson progress, one row write per lesson"""
+        lesson_totals = dict((await self.db.execute(
+            select(Lesson.id, func.count(Word.id)).outerjoin(Word).where(
+                Lesson.id.in_(lesson_ratings.keys()), Lesson.user_id == user_id
+            ).group_by(Lesson.id)
+        )).all())
+        progresses = {
+            progress.lesson_id: progress
+            for progress in await self.db.scalars(
+                select(LessonProgress).where(
+                    LessonProgress.user_id == user_id, LessonProgress.lesson_id.in_(lesson_totals.keys())
+                )
+            )
+        }
+
+        now = datetime.now(timezone.utc)
+        for lesson_id, total_words in lesson_totals.items():
+            if total_words == 0:
+                continue
 
-        due_words.sort(key=lambda uw: self.fsrs_manager.get_next_review_time(uw))
+            progress = progresses.get(lesson_id)
+            for rating, new_review in lesson_ratings[lesson_id]:
+                words_learned = 1 if rating >= 2 else 0
+                if progress is None:
+                    progress = LessonProgress(
+                        user_id=user_id,
+                        lesson_id=lesson_id,
+                        total_words=total_words,
+                        words_learned=words_learned,
+                        words_to_review=new_review - words_learned,
+                        is_started=True,
+                        is_completed=False,
+                        started_at=now
+                    )
+                    self.db.add(progress)
+                else:
+                    progress.words_learned = (progress.words_learned or 0) + words_learned
+                    progress.words_to_review = (progress.words_to_review or 0) - (1 - words_learned)
 
-        return due_words[:limit]
+            progress.total_words = total_words
+            progress.is_completed = progress.words_learned >= total_words
+            if progress.is_completed and not progress.completed_at:
+                progress.completed_at = now
@@ -1,170 +1,134 @@
-from fastapi import FastAPI, Request, Depends, Cookie, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-
-from app.api.i18n import load_i18n
-from app.database import engine
-from app.models import Base
-from app.api import courses, lessons, words, users, reviews, telegram_auth, i18n
-from app.utils.session_store import get_current_user
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-# Setup Jinja2 templates
-templates = Jinja2Templates(directory="app/templates")
-
-# Create FastAPI app
-app = FastAPI(
-    title="Telegram Spaced Repetition Mini App",
-    description="A Telegram Mini App for learning words using spaced repetition",
-    version="1.0.0",
-)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure properly in production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(courses.router, prefix="/api/v1")
-app.include_router(lessons.router, prefix="/api/v1")
-app.include_router(words.router, prefix="/api/v1")
-app.include_router(users.router, prefix="/api/v1")
-app.include_router(reviews.router, prefix="/api/v1")
-app.include_router(telegram_auth.router, prefix="/api/v1")
-app.include_router(i18n.router, prefix="/api/v1")
-
-
-async def template_context(
-        request: Request,
-        user=Depends(get_current_user)
-):
-    lang = user.language_code or "en"
-    i18n = load_i18n(lang)
-
-    return {
-        "request": request,
-        "user": user,
-        "lang": lang,
-        "i18n": i18n,
-    }
-
-
-@app.get("/", response_class=HTMLResponse)
-async def root(request: Request):
-    return templates.TemplateResponse("start.html", {
-        "request": request
-    })
-
-@app.get("/home", response_class=HTMLResponse)
-async def home(context=Depends(template_context)):
-    return templates.TemplateResponse("index.html", context)
-
-
-@app.get("/courses", response_class=HTMLResponse)
-async def courses(context=Depends(template_context)):
-    return templates.TemplateResponse("course_list.html", context)
-
-
-@app.get("/courses/create", response_class=HTMLResponse)
-async def create_course_page(context=Depends(template_context)):
-    return templates.TemplateResponse("course_create.html", context)
-
-
-@app.get("/courses/{course_id}", response_class=HTMLResponse)
-async def course_detail_page(
-        course_id: int,
-        context=Depends(template_context)
-):
-    context["course_id"] = course_id
-    return templates.TemplateResponse("course_details.html", context)
-
-
-@app.get("/courses/{course_id}/lessons/create", response_class=HTMLResponse)
-async def create_lesson_page(
-    course_id: int,
-    context=Depends(template_context)
-):
-    context["course_id"] = course_id
-    return templates.TemplateResponse("lesson_create.html", context)
-
-
-@app.get("/lessons/{lesson_id}", response_class=HTMLResponse)
-async def lesson_detail_page(
-        lesson_id: int,
-        context=Depends(template_context)
-):
-    context["lesson_id"] = lesson_id
-    return templates.TemplateResponse("lesson_details.html", context)
-
-
-@app.get("/lessons/{lesson_id}/words/create", response_class=HTMLResponse)
-async def create_word_page(
-    lesson_id: int,
-    context=Depends(template_context)
-):
-    context["lesson_id"] = lesson_id
-    return templates.TemplateResponse("lesson_word_create.html", context)
-
-
-@app.get("/study/{lesson_id}", response_class=HTMLResponse)
-async def study_page(
-    lesson_id: int,
-    context=Depends(template_context)
-):
-    context["lesson_id"] = lesson_id
-    return templates.TemplateResponse("lesson_study.html", context)
-
-
-@app.get("/lessons/{lesson_id}/complete", response_class=HTMLResponse)
-async def completion_page(
-    lesson_id: int,
-    context=Depends(template_context)
-):
-    context["lesson_id"] = lesson_id if lesson_id != 0 else None
-    return templates.TemplateResponse("lesson_complete.html", context)
-
-
-@app.get("/review/due", response_class=HTMLResponse)
-async def review_due_page(context=Depends(template_context)):
-    # Special case for review lesson
-    context["lesson_id"] = None
-    return templates.TemplateResponse("lesson_study.html", context)
-
-
-@app.get("/stats", response_class=HTMLResponse)
-async def stats_page(context=Depends(template_context)):
-    return templates.TemplateResponse("stats.html", context)
-
-
-@app.get("/settings", response_class=HTMLResponse)
-async def settings_page(context=Depends(template_context)):
-    return templates.TemplateResponse("settings.html", context)
-
-
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "ok", "version": "1.0.0"}
-
-
-@app.exception_handler(404)
-async def not_found_handler(request, exc):
-    return {"error": "Not found", "detail": "The requested resource was not found"}
+from contextlib import asynccontextmanager
 
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
 
-@app.exception_handler(500)
-async def internal_error_handler(request, exc):
-    return {"error": "Internal server error", "detail": "An internal error occurred"}
+from app.config import settings
+
+
+def check_migrations(connection) -> None:
+    """Fail startup unless the database is at the Alembic head revision"""
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    heads = set(ScriptDirectory.from_config(Config(settings.alembic_config)).get_heads())
+    current = set(MigrationContext.configure(connection).get_current_heads())
+    if current != heads:
+        raise RuntimeError(
+            f"Database is at revision {', '.join(sorted(current)) or 'none'}, expected "
+            f"{', '.join(sorted(heads))}. Run `alembic upgrade head` before starting the app."
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from contextlib import AsyncExitStack
+
+    from app.api.i18n import ALLOWED_LANGS, load_i18n
+    from app.crud import PROGRESS_CACHE_CHANNEL, USER_CACHE_CHANNEL, LessonProgressCRUD, UserCRUD
+    from app.database import async_engine, listen
+    from app.fsrs_service import FSRSManager
+    from app.pages import warm_templates
+    from app.utils.session_store import get_session_backend
+
+    if settings.check_migrations:
+        async with async_engine.connect() as connection:
+            await connection.run_sync(check_migrations)
+
+    # Warm per-process caches ahead of the first request
+    warm_templates()
+    for lang in ALLOWED_LANGS:
+        load_i18n(lang)
+    FSRSManager()
+
+    if settings.session_backend == "signed" and settings.session_revocation_backend == "memory":
+        print("[lifespan] SESSION_REVOCATION_BACKEND=memory, logouts only apply to the worker that served them; "
+              "use sqlite or postgres with several workers")
+
+    session_backend = get_session_backend()
+    await session_backend.start()
+
+    async with AsyncExitStack() as stack:
+        if settings.user_cache_listen:
+            # Other workers announce user changes, drop their cached records here too
+            if not await stack.enter_async_context(listen(USER_CACHE_CHANNEL, UserCRUD.on_user_invalidated)):
+                print("[lifespan] Cannot LISTEN with this driver, cached users expire by TTL only")
+        if settings.progress_cache_listen:
+            # Reviews, imports and reschedules in other processes announce stale summaries
+            if not await stack.enter_async_context(
+                    listen(PROGRESS_CACHE_CHANNEL, LessonProgressCRUD.on_progress_invalidated)):
+                print("[lifespan] Cannot LISTEN with this driver, progress summaries expire by TTL only")
+        yield
+
+    await session_backend.stop()
+    await async_engine.dispose()
+
+
+def create_app() -> FastAPI:
+    # Routers pull in SQLAlchemy models, fsrs and NumPy, so they load with the app
+    # rather than with this module
+    from app import pages
+    from app.api import courses, lessons, words, users, reviews, telegram_auth, i18n
+    from app.database import get_pool_stats
+
+    app = FastAPI(
+        title="Telegram Spaced Repetition Mini App",
+        description="A Telegram Mini App for learning words using spaced repetition",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Configure properly in production
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Include routers
+    app.include_router(courses.router, prefix="/api/v1")
+    app.include_router(lessons.router, prefix="/api/v1")
+    app.include_router(words.router, prefix="/api/v1")
+    app.include_router(users.router, prefix="/api/v1")
+    app.include_router(reviews.router, prefix="/api/v1")
+    app.include_router(telegram_auth.router, prefix="/api/v1")
+    app.include_router(i18n.router, prefix="/api/v1")
+    app.include_router(pages.router)
+
+    @app.get("/health")
+    async def health_check():
+        """Health check endpoint"""
+        return {"status": "ok", "version": "1.0.0"}
+
+    @app.get("/health/pool")
+    async def pool_stats():
+        """Database connection pool statistics"""
+        return get_pool_stats()
+
+    @app.exception_handler(404)
+    async def not_found_handler(request, exc):
+        return {"error": "Not found", "detail": "The requested resource was not found"}
+
+    @app.exception_handler(500)
+    async def internal_error_handler(request, exc):
+        return {"error": "Internal server error", "detail": "An internal error occurred"}
+
+    return app
+
+
+def __getattr__(name: str):
+    # Keeps `uvicorn app.main:app` working, the app is built on first access
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(create_app(), host="0.0.0.0", port=8000)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Text, Boolean, JSON, Float
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Date, ForeignKey, Text, Boolean, JSON, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -18,6 +18,11 @@ class User(Base):
     current_streak = Column(Integer, default=0)
     longest_streak = Column(Integer, default=0)
     last_active_date = Column(Date, nullable=True)
+    # Personal FSRS scheduling, defaults of the fsrs package when unset
+    fsrs_parameters = Column(JSON, nullable=True)
+    desired_retention = Column(Float, nullable=True)
+    fsrs_parameters_review_count = Column(Integer, nullable=True)  # Reviews the parameters were fitted on
+    fsrs_parameters_fitted_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -33,11 +38,19 @@ class Course(Base):
     description = Column(Text, nullable=True)
     language = Column(String, nullable=False)  # Target language to learn
     native_language = Column(String, nullable=False)  # User's native language
+    # Course-level FSRS scheduling, overrides the user's settings when set
+    fsrs_parameters = Column(JSON, nullable=True)
+    desired_retention = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     user = relationship("User", back_populates="courses")
-    lessons = relationship("Lesson", back_populates="course", cascade="all, delete-orphan")
+    lessons = relationship("Lesson", back_populates="course", cascade="all, delete-orphan",
+                           order_by="Lesson.order_index")
+
+    __table_args__ = (
+        Index("ix_courses_user_id_created_at", "user_id", "created_at"),
+    )
 
 
 class Lesson(Base):
@@ -45,6 +58,7 @@ class Lesson(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Owner of the course, for ownership checks
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     order_index = Column(Integer, nullable=False)  # Order of lessons in course
@@ -53,14 +67,20 @@ class Lesson(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     course = relationship("Course", back_populates="lessons")
-    words = relationship("Word", back_populates="lesson", cascade="all, delete-orphan")
+    words = relationship("Word", back_populates="lesson", cascade="all, delete-orphan", order_by="Word.id")
+
+    __table_args__ = (
+        Index("ix_lessons_course_id_order_index", "course_id", "order_index"),
+        Index("ix_lessons_user_id_course_id", "user_id", "course_id"),
+    )
 
 
 class Word(Base):
     __tablename__ = "words"
 
     id = Column(Integer, primary_key=True, index=True)
-    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Owner of the course, for ownership checks
     text = Column(String, nullable=False)  # The word/phrase to learn
     translation = Column(String, nullable=False)  # Translation in native language
     pronunciation = Column(String, nullable=True)  # IPA or pronunciation guide
@@ -71,6 +91,10 @@ class Word(Base):
     lesson = relationship("Lesson", back_populates="words")
     user_words = relationship("UserWord", back_populates="word", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_words_user_id_lesson_id", "user_id", "lesson_id"),
+    )
+
 
 class UserWord(Base):
     """Tracks user's progress with specific words using FSRS"""
@@ -78,8 +102,14 @@ class UserWord(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    word_id = Column(Integer, ForeignKey("words.id"), nullable=False)
-    fsrs_card_data = Column(JSON, nullable=False)
+    word_id = Column(Integer, ForeignKey("words.id"), nullable=False, index=True)
+    # FSRS card state
+    state = Column(Integer, nullable=False)  # 1=Learning, 2=Review, 3=Relearning
+    step = Column(Integer, nullable=True)  # Learning/relearning step
+    stability = Column(Float, nullable=True)
+    difficulty = Column(Float, nullable=True)
+    due = Column(DateTime(timezone=True), nullable=False)
+    last_review = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -87,6 +117,24 @@ class UserWord(Base):
     word = relationship("Word", back_populates="user_words")
     reviews = relationship("Review", back_populates="user_word", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        UniqueConstraint("user_id", "word_id", name="uq_user_words_user_id_word_id"),
+        Index("ix_user_words_user_id_due", "user_id", "due"),
+    )
+
+    @property
+    def fsrs_card_data(self) -> dict:
+        """Card in the fsrs package's Card.to_dict() format"""
+        return {
+            "card_id": self.id,
+            "state": self.state,
+            "step": self.step,
+            "stability": self.stability,
+            "difficulty": self.difficulty,
+            "due": self.due.isoformat() if self.due else None,
+            "last_review": self.last_review.isoformat() if self.last_review else None,
+        }
+
 
 class Review(Base):
     __tablename__ = "reviews"
@@ -112,6 +160,10 @@ class Review(Base):
     user_word = relationship("UserWord", back_populates="reviews")
     lesson = relationship("Lesson")
 
+    __table_args__ = (
+        Index("ix_reviews_user_word_id_review_datetime", "user_word_id", "review_datetime"),
+    )
+
 
 class LessonProgress(Base):
     """Tracks user's progress through lessons"""
@@ -137,3 +189,18 @@ class LessonProgress(Base):
 
     user = relationship("User")
     lesson = relationship("Lesson")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "lesson_id", name="uq_lesson_progress_user_id_lesson_id"),
+    )
+
+
+class UserSession(Base):
+    """Sign-in sessions of the postgres session backend"""
+    __tablename__ = "user_sessions"
+    # Sessions are disposable, UNLOGGED skips the WAL and empties the table after a crash
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    id = Column(String, primary_key=True)
+    telegram_id = Column(BigInteger, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)  # Unix time
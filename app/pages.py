@@ -0,0 +1,131 @@
+from functools import lru_cache
+
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import HTMLResponse
+from fastapi.templating import Jinja2Templates
+
+from app.api.i18n import load_i18n
+from app.utils.session_store import get_current_user_record
+
+TEMPLATES_DIR = "app/templates"
+
+router = APIRouter(tags=["pages"])
+
+
+@lru_cache(maxsize=None)
+def get_templates() -> Jinja2Templates:
+    return Jinja2Templates(directory=TEMPLATES_DIR)
+
+
+def warm_templates() -> None:
+    """Compile every page template ahead of the first request"""
+    templates = get_templates()
+    for name in templates.env.list_templates(extensions=["html"]):
+        templates.get_template(name)
+
+
+async def template_context(
+        request: Request,
+        user=Depends(get_current_user_record)
+):
+    lang = user.language_code or "en"
+    i18n = load_i18n(lang)
+
+    return {
+        "request": request,
+        "user": user,
+        "lang": lang,
+        "i18n": i18n,
+    }
+
+
+@router.get("/", response_class=HTMLResponse)
+async def root(request: Request):
+    return get_templates().TemplateResponse("start.html", {
+        "request": request
+    })
+
+@router.get("/home", response_class=HTMLResponse)
+async def home(context=Depends(template_context)):
+    return get_templates().TemplateResponse("index.html", context)
+
+
+@router.get("/courses", response_class=HTMLResponse)
+async def courses(context=Depends(template_context)):
+    return get_templates().TemplateResponse("course_list.html", context)
+
+
+@router.get("/courses/create", response_class=HTMLResponse)
+async def create_course_page(context=Depends(template_context)):
+    return get_templates().TemplateResponse("course_create.html", context)
+
+
+@router.get("/courses/{course_id}", response_class=HTMLResponse)
+async def course_detail_page(
+        course_id: int,
+        context=Depends(template_context)
+):
+    context["course_id"] = course_id
+    return get_templates().TemplateResponse("course_details.html", context)
+
+
+@router.get("/courses/{course_id}/lessons/create", response_class=HTMLResponse)
+async def create_lesson_page(
+    course_id: int,
+    context=Depends(template_context)
+):
+    context["course_id"] = course_id
+    return get_templates().TemplateResponse("lesson_create.html", context)
+
+
+@router.get("/lessons/{lesson_id}", response_class=HTMLResponse)
+async def lesson_detail_page(
+        lesson_id: int,
+        context=Depends(template_context)
+):
+    context["lesson_id"] = lesson_id
+    return get_templates().TemplateResponse("lesson_details.html", context)
+
+
+@router.get("/lessons/{lesson_id}/words/create", response_class=HTMLResponse)
+async def create_word_page(
+    lesson_id: int,
+    context=Depends(template_context)
+):
+    context["lesson_id"] = lesson_id
+    return get_templates().TemplateResponse("lesson_word_create.html", context)
+
+
+@router.get("/study/{lesson_id}", response_class=HTMLResponse)
+async def study_page(
+    lesson_id: int,
+    context=Depends(template_context)
+):
+    context["lesson_id"] = lesson_id
+    return get_templates().TemplateResponse("lesson_study.html", context)
+
+
+@router.get("/lessons/{lesson_id}/complete", response_class=HTMLResponse)
+async def completion_page(
+    lesson_id: int,
+    context=Depends(template_context)
+):
+    context["lesson_id"] = lesson_id if lesson_id != 0 else None
+    return get_templates().TemplateResponse("lesson_complete.html", context)
+
+
+@router.get("/review/due", response_class=HTMLResponse)
+async def review_due_page(context=Depends(template_context)):
+    # Special case for review lesson
+    context["lesson_id"] = None
+    return get_templates().TemplateResponse("lesson_study.html", context)
+
+
+@router.get("/stats", response_class=HTMLResponse)
+async def stats_page(context=Depends(template_context)):
+    return get_templates().TemplateResponse("stats.html", context)
+
+
+@router.get("/settings", response_class=HTMLResponse)
+async def settings_page(context=Depends(template_context)):
+    return get_templates().TemplateResponse("settings.html", context)
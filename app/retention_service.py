@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+from typing import Any, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select, func, cast, Float
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.fsrs_service import FSRSManager
+from app.models import User, Course, Lesson, Word, UserWord
+
+SECONDS_PER_DAY = 86400.0
+
+# Card columns DeckRetention is built from, see deck_columns
+DECK_COLUMNS = (
+    UserWord.id, UserWord.word_id, Word.lesson_id, Lesson.course_id,
+    UserWord.stability,
+    cast(func.extract("epoch", UserWord.last_review), Float),
+    cast(func.extract("epoch", UserWord.due), Float)
+)
+
+
+def deck_columns(rows: Sequence[Sequence[Any]]) -> list[np.ndarray]:
+    """DECK_COLUMNS rows as arrays: user word, word, lesson and course ids, then
+    stability, last review and due, with NaN for never-reviewed cards"""
+    columns = list(zip(*rows)) if rows else [()] * len(DECK_COLUMNS)
+    return [np.array(column, dtype=np.int64) for column in columns[:4]] + \
+        [np.array(column, dtype=np.float64) for column in columns[4:]]
+
+
+class DeckRetention:
+    """Vectorized FSRS retrievability and due state for a whole deck of cards.
+
+    Mirrors Scheduler.get_card_retrievability (whole elapsed days, power forgetting
+    curve) but evaluates every card of a user or course in one NumPy pass.
+    """
+    def __init__(self, user_word_ids: np.ndarray, word_ids: np.ndarray, lesson_ids: np.ndarray,
+                 stability: np.ndarray, last_review: np.ndarray, due: np.ndarray, decay: np.ndarray,
+                 now: Optional[datetime] = None):
+        self.user_word_ids = user_word_ids
+        self.word_ids = word_ids
+        self.lesson_ids = lesson_ids
+        self.stability = stability
+        self.last_review = last_review  # epoch seconds, NaN if never reviewed
+        self.due = due  # epoch seconds
+        self.decay = decay
+        self.now = (now or datetime.now(timezone.utc)).timestamp()
+
+        self.retrievability = self._compute_retrievability()
+        self.is_due = self.due <= self.now
+        self.days_overdue = np.maximum(0.0, (self.now - self.due) / SECONDS_PER_DAY)
+
+    def __len__(self) -> int:
+        return len(self.user_word_ids)
+
+    def _compute_retrievability(self) -> np.ndarray:
+        elapsed_days = np.floor(np.maximum(0.0, (self.now - self.last_review) / SECONDS_PER_DAY))
+        factor = 0.9 ** (1.0 / self.decay) - 1.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            retrievability = (1.0 + factor * elapsed_days / self.stability) ** self.decay
+        # Cards that were never reviewed have no memory to retrieve
+        return np.where(np.isnan(retrievability), 0.0, retrievability)
+
+    def lesson_average_retention(self) -> dict[int, float]:
+        """Average current retrievability of the reviewed cards per lesson"""
+        reviewed = ~np.isnan(self.last_review)
+        lesson_ids, inverse = np.unique(self.lesson_ids[reviewed], return_inverse=True)
+        totals = np.bincount(inverse, weights=self.retrievability[reviewed], minlength=len(lesson_ids))
+        counts = np.bincount(inverse, minlength=len(lesson_ids))
+        return {int(lesson_id): float(total / count) for lesson_id, total, count in zip(lesson_ids, totals, counts)}
+
+
+class RetentionService:
+    """Loads decks from the database into DeckRetention"""
+    def __init__(self, db: AsyncSession, user: User):
+        self.db = db
+        self.user = user
+
+    async def _course_decays(self, course_ids: np.ndarray) -> np.ndarray:
+        """FSRS decay per course, resolving course-level parameters over the user's"""
+        unique_course_ids, inverse = np.unique(course_ids, return_inverse=True)
+        course_parameters = dict((await self.db.execute(
+            select(Course.id, Course.fsrs_parameters).where(Course.id.in_(unique_course_ids.tolist()))
+        )).all())
+        decays = np.array([
+            -FSRSManager.for_settings(self.user, course_parameters.get(int(course_id))).scheduler.parameters[20]
+            for course_id in unique_course_ids
+        ], dtype=np.float64)
+        return decays[inverse] if len(decays) else np.empty(0, dtype=np.float64)
+
+    async def load(self, course_id: Optional[int] = None, now: Optional[datetime] = None) -> DeckRetention:
+        stmt = select(*DECK_COLUMNS).join(Word, Word.id == UserWord.word_id).join(Lesson, Lesson.id == Word.lesson_id) \
+            .where(UserWord.user_id == self.user.id)
+        if course_id is not None:
+            stmt = stmt.where(Lesson.course_id == course_id)
+        rows = (await self.db.execute(stmt)).all()
+
+        user_word_ids, word_ids, lesson_ids, course_ids, stability, last_review, due = deck_columns(rows)
+
+        return DeckRetention(
+            user_word_ids, word_ids, lesson_ids, stability, last_review, due,
+            await self._course_decays(course_ids), now
+        )
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
+import json
+
+from pydantic import BaseModel, Field, field_validator, ValidationInfo
 from typing import Optional, Dict, Any, List
 from datetime import datetime, date
-from enum import IntEnum
+from enum import IntEnum, Enum
 
 
 class RatingEnum(IntEnum):
@@ -17,6 +19,12 @@ class StateEnum(IntEnum):
     RELEARNING = 3
 
 
+class DueOrderEnum(str, Enum):
+    DUE = "due"  # Earliest due date first
+    RETRIEVABILITY = "retrievability"  # Lowest probability of recall first
+    OVERDUE_RATIO = "overdue_ratio"  # Most overdue relative to the scheduled interval first
+
+
 # Base schemas
 class UserBaseSchema(BaseModel):
     telegram_id: int
@@ -35,6 +43,7 @@ class UserSchema(UserBaseSchema):
     current_streak: int = 0
     longest_streak: int = 0
     last_active_date: Optional[date] = None
+    desired_retention: Optional[float] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -42,6 +51,17 @@ class UserSchema(UserBaseSchema):
         from_attributes = True
 
 
+class CurrentUserSchema(BaseModel):
+    """Signed-in user as cached per worker, enough for ownership checks"""
+    id: int
+    telegram_id: int
+    username: Optional[str] = None
+    language_code: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Telegram Mini App specific schemas
 class TelegramUserSchema(BaseModel):
     id: int
@@ -65,11 +85,13 @@ class CourseCreateSchema(CourseBaseSchema):
 class CourseUpdateSchema(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=200)
     description: Optional[str] = None
+    desired_retention: Optional[float] = Field(None, gt=0, lt=1)
 
 
 class CourseSchema(CourseBaseSchema):
     id: int
     user_id: int
+    desired_retention: Optional[float] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -139,6 +161,20 @@ class WordRatingSchema(BaseModel):
     lesson_id: Optional[int] = None
 
 
+class WordRatingBatchItemSchema(BaseModel):
+    """A single rating within a study session batch"""
+    word_id: int
+    rating: RatingEnum
+    lesson_id: Optional[int] = None
+    reviewed_at: Optional[datetime] = None  # Client time of the rating, defaults to server time
+    response_time_seconds: Optional[float] = Field(None, ge=0)
+
+
+class WordRatingBatchSchema(BaseModel):
+    """Ordered ratings of one study session"""
+    ratings: List[WordRatingBatchItemSchema] = Field(..., min_length=1, max_length=500)
+
+
 class UserWordBaseSchema(BaseModel):
     word_id: int
     fsrs_card_data: Dict[str, Any]
@@ -155,6 +191,12 @@ class UserWordUpdateSchema(BaseModel):
 class UserWordSchema(UserWordBaseSchema):
     id: int
     user_id: int
+    state: StateEnum
+    step: Optional[int] = None
+    stability: Optional[float] = None
+    difficulty: Optional[float] = None
+    due: datetime
+    last_review: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -217,6 +259,21 @@ class LessonProgressSchema(BaseModel):
 
 
 # Complex schemas for API responses
+class CardStateCountsSchema(BaseModel):
+    learning: int = 0
+    review: int = 0
+    relearning: int = 0
+
+
+class ProgressSummarySchema(BaseModel):
+    total_lessons: int
+    completed_lessons: int
+    total_words: int
+    words_due_for_review: int  # Due now
+    words_due_today: int
+    cards_by_state: CardStateCountsSchema
+
+
 class LessonWithWordsSchema(LessonSchema):
     words: List[WordSchema] = []
 
@@ -236,6 +293,31 @@ class WordWithProgressSchema(WordSchema):
     next_review_at: Optional[datetime] = None
 
 
+class RatingPreviewSchema(BaseModel):
+    """Next review time a card would get for each rating"""
+    again: datetime
+    hard: datetime
+    good: datetime
+    easy: datetime
+
+
+class DueWordSchema(WordSchema):
+    """A due word with its FSRS card state"""
+    user_word_id: int
+    state: StateEnum
+    step: Optional[int] = None
+    stability: Optional[float] = None
+    difficulty: Optional[float] = None
+    due: datetime
+    last_review: Optional[datetime] = None
+    next_review_at: RatingPreviewSchema
+
+
+class DueWordsSchema(BaseModel):
+    words: List[DueWordSchema]
+    next_cursor: Optional[str] = None
+
+
 class ReviewSessionSchema(BaseModel):
     """Represents a review session with words to review"""
     lesson_id: int
@@ -253,6 +335,55 @@ class ReviewResultSchema(BaseModel):
     review_log: Dict[str, Any] = {}
 
 
+class LessonRetentionSchema(BaseModel):
+    lesson_id: int
+    average_retention: float
+
+
+class WordCardExportSchema(BaseModel):
+    state: StateEnum
+    step: Optional[int] = None
+    stability: Optional[float] = None
+    difficulty: Optional[float] = None
+    due: datetime
+    last_review: Optional[datetime] = None
+
+
+class WordReviewExportSchema(BaseModel):
+    rating: RatingEnum
+    review_datetime: datetime
+    response_time_seconds: Optional[float] = None
+
+
+class WordExportSchema(WordCreateSchema):
+    """One word of a course export with its lesson, card state and review history"""
+    lesson: Optional[str] = None
+    lesson_order_index: Optional[int] = None
+    card: Optional[WordCardExportSchema] = None
+    reviews: List[WordReviewExportSchema] = []
+
+    @field_validator("card", "reviews", mode="before")
+    @classmethod
+    def parse_json_column(cls, value: Any, info: ValidationInfo) -> Any:
+        # CSV exports carry the card and reviews as JSON encoded columns
+        if value is None or value == "":
+            return [] if info.field_name == "reviews" else None
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+
+
+class WordImportErrorSchema(BaseModel):
+    row: int  # 1-based position of the record in the file
+    errors: List[str]
+
+
+class WordImportResultSchema(BaseModel):
+    imported: int
+    lessons_created: int
+    errors: List[WordImportErrorSchema] = []
+
+
 class TelegramWebhookDataSchema(BaseModel):
     user: TelegramUserSchema
     query_id: Optional[str] = None
@@ -0,0 +1,35 @@
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def _adapter(annotation: Any) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def copy_headers(response: Response, sub_response: Optional[Response]) -> Response:
+    """Carry the headers dependencies set on the injected `sub_response`, such as a
+    renewed session cookie, over to a Response the endpoint returns itself"""
+    if sub_response is not None:
+        response.headers.raw.extend(sub_response.headers.raw)
+    return response
+
+
+def schema_response(annotation: Any, value: Any, sub_response: Optional[Response] = None,
+                    status_code: int = 200) -> Response:
+    """Validate `value` into `annotation` and write it as JSON in one pass.
+
+    `value` may be ORM objects, SQL rows, dicts or instances of the schema, the
+    latter are not validated again. Endpoints keep `response_model` for the API
+    docs; returning a Response skips FastAPI's own validation and encoding, so
+    pass the endpoint's injected Response as `sub_response` to keep its headers.
+    """
+    adapter = _adapter(annotation)
+    return copy_headers(Response(
+        adapter.dump_json(adapter.validate_python(value, from_attributes=True)),
+        status_code=status_code,
+        media_type="application/json"
+    ), sub_response)
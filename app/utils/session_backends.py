@@ -0,0 +1,231 @@
+"""Server-side session storage.
+
+Sessions map an opaque id to the Telegram id of the signed-in user until they expire.
+Three backends implement SessionBackend:
+
+- memory: per-process dict with a timer wheel, for a single worker
+- sqlite: a WAL-mode SQLite file shared by the workers of one host
+- postgres: an UNLOGGED table shared by every node
+"""
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional, TypedDict
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+
+class SessionData(TypedDict):
+    user_id: int  # Telegram id of the signed-in user
+    expires_at: float  # Unix time
+
+
+class SessionBackend(ABC):
+    """Stores sessions and drops expired ones from a background sweeper"""
+    def __init__(self, sweep_interval: float = 30.0):
+        self.sweep_interval = sweep_interval
+        self._sweeper: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def create(self, session_id: str, user_id: int, expires_at: float) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[SessionData]:
+        """The session, or None if it does not exist or has expired"""
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def sweep(self, now: float) -> int:
+        """Drop expired sessions, returns how many were dropped"""
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep(time.time())
+            except Exception as e:
+                print(f"[session_store] Sweep failed: {e}")
+
+    async def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+
+class MemorySessionBackend(SessionBackend):
+    """Per-process sessions, expired ones are found through a hashed timer wheel.
+
+    Each session is filed in the wheel slot of its expiry tick, so a sweep only
+    visits the slots that came due since the previous one instead of every session.
+    """
+    def __init__(self, resolution: float = 1.0, slots: int = 4096):
+        super().__init__(sweep_interval=resolution)
+        self.resolution = resolution
+        self._sessions: dict[str, SessionData] = {}
+        self._wheel: list[set[str]] = [set() for _ in range(slots)]
+        self._swept_tick = int(time.time() // resolution)
+
+    def _slot(self, expires_at: float) -> set[str]:
+        return self._wheel[math.ceil(expires_at / self.resolution) % len(self._wheel)]
+
+    async def create(self, session_id: str, user_id: int, expires_at: float) -> None:
+        previous = self._sessions.get(session_id)
+        if previous is not None:
+            self._slot(previous["expires_at"]).discard(session_id)
+        self._sessions[session_id] = {"user_id": user_id, "expires_at": expires_at}
+        self._slot(expires_at).add(session_id)
+
+    async def get(self, session_id: str) -> Optional[SessionData]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if session["expires_at"] < time.time():
+            await self.delete(session_id)
+            return None
+        return session
+
+    async def delete(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._slot(session["expires_at"]).discard(session_id)
+
+    async def sweep(self, now: float) -> int:
+        current_tick = int(now // self.resolution)
+        # After a long stall every slot is due, visit each one once
+        ticks = range(max(self._swept_tick, current_tick - len(self._wheel) + 1), current_tick + 1)
+        dropped = 0
+        for tick in ticks:
+            slot = self._wheel[tick % len(self._wheel)]
+            # Sessions more than one wheel rotation away share the slot and stay
+            expired = [
+                session_id for session_id in slot
+                if session_id not in self._sessions or self._sessions[session_id]["expires_at"] <= now
+            ]
+            for session_id in expired:
+                slot.discard(session_id)
+                if self._sessions.pop(session_id, None) is not None:
+                    dropped += 1
+        # The current tick can still receive sessions expiring later in it
+        self._swept_tick = current_tick
+        return dropped
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sessions in a SQLite file, shared by the worker processes of one host"""
+    def __init__(self, path: str, sweep_interval: float = 30.0):
+        super().__init__(sweep_interval=sweep_interval)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sessions "
+            "(id TEXT PRIMARY KEY, telegram_id INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)")
+
+    def _execute(self, sql: str, parameters: tuple) -> sqlite3.Cursor:
+        with self._lock:
+            return self._connection.execute(sql, parameters)
+
+    def _get(self, session_id: str, now: float) -> Optional[tuple]:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT telegram_id, expires_at FROM sessions WHERE id = ? AND expires_at >= ?",
+                (session_id, now)
+            ).fetchone()
+
+    async def create(self, session_id: str, user_id: int, expires_at: float) -> None:
+        await asyncio.to_thread(
+            self._execute, "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (session_id, user_id, expires_at)
+        )
+
+    async def get(self, session_id: str) -> Optional[SessionData]:
+        row = await asyncio.to_thread(self._get, session_id, time.time())
+        if row is None:
+            return None
+        return {"user_id": row[0], "expires_at": row[1]}
+
+    async def delete(self, session_id: str) -> None:
+        await asyncio.to_thread(self._execute, "DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    async def sweep(self, now: float) -> int:
+        cursor = await asyncio.to_thread(self._execute, "DELETE FROM sessions WHERE expires_at < ?", (now,))
+        return cursor.rowcount
+
+    async def stop(self) -> None:
+        await super().stop()
+        self._connection.close()
+
+
+class PostgresSessionBackend(SessionBackend):
+    """Sessions in the UNLOGGED user_sessions table, shared by every node.
+
+    UNLOGGED skips the WAL, so writes are cheap and sessions are lost on a crash,
+    which only means signing in again.
+    """
+    async def create(self, session_id: str, user_id: int, expires_at: float) -> None:
+        from app.database import AsyncSessionLocal
+        from app.models import UserSession
+
+        async with AsyncSessionLocal() as db:
+            upsert = pg_insert(UserSession).values(id=session_id, telegram_id=user_id, expires_at=expires_at)
+            await db.execute(upsert.on_conflict_do_update(
+                index_elements=[UserSession.id],
+                set_={"telegram_id": upsert.excluded.telegram_id, "expires_at": upsert.excluded.expires_at}
+            ))
+            await db.commit()
+
+    async def get(self, session_id: str) -> Optional[SessionData]:
+        from app.database import AsyncSessionLocal
+        from app.models import UserSession
+
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(UserSession.telegram_id, UserSession.expires_at)
+                .where(UserSession.id == session_id, UserSession.expires_at >= time.time())
+            )).first()
+        if row is None:
+            return None
+        return {"user_id": row.telegram_id, "expires_at": row.expires_at}
+
+    async def delete(self, session_id: str) -> None:
+        from app.database import AsyncSessionLocal
+        from app.models import UserSession
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(UserSession).where(UserSession.id == session_id))
+            await db.commit()
+
+    async def sweep(self, now: float) -> int:
+        from app.database import AsyncSessionLocal
+        from app.models import UserSession
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(delete(UserSession).where(UserSession.expires_at < now))
+            await db.commit()
+        return result.rowcount
+
+
+def create_session_backend(name: str, sqlite_path: Optional[str] = None,
+                           sweep_interval: float = 30.0) -> SessionBackend:
+    if name == "memory":
+        return MemorySessionBackend()
+    if name == "sqlite":
+        return SQLiteSessionBackend(sqlite_path, sweep_interval)
+    if name == "postgres":
+        return PostgresSessionBackend(sweep_interval)
+    raise ValueError(f"Unsupported session backend {name!r}, expected memory, sqlite or postgres")
@@ -1,52 +1,132 @@
+import secrets
 import time
-import uuid
+from typing import Optional
 
-from fastapi import Cookie, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import Cookie, HTTPException, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.crud import UserCRUD
 from app.database import get_db
+from app.schemas import CurrentUserSchema
+from app.utils.session_backends import SessionBackend, SessionData, create_session_backend
+from app.utils.session_tokens import SessionTokenSigner
 
-SESSION_TTL = 15 * 60
+SESSION_TTL = settings.session_ttl_seconds
+SESSION_COOKIE = "session_id"
+# Signed tokens are reissued once less than this much of their lifetime is left
+SESSION_RENEW_BELOW = SESSION_TTL / 2
 
-_sessions: dict[str, dict] = {}
+_backend: Optional[SessionBackend] = None
+_signer: Optional[SessionTokenSigner] = None
 
 
-def create_session(user_id: int) -> str:
-    session_id = str(uuid.uuid4())
-    _sessions[session_id] = {
-        "user_id": user_id,
-        "expires_at": time.time() + SESSION_TTL
-    }
+def signed_sessions() -> bool:
+    return settings.session_backend == "signed"
+
+
+def get_session_backend() -> SessionBackend:
+    """The session store, or with signed sessions the store of revoked token ids"""
+    global _backend
+    if _backend is None:
+        name = settings.session_revocation_backend if signed_sessions() else settings.session_backend
+        _backend = create_session_backend(
+            name, settings.session_sqlite_path, settings.session_sweep_interval_seconds
+        )
+    return _backend
+
+
+def get_session_signer() -> SessionTokenSigner:
+    global _signer
+    if _signer is None:
+        _signer = SessionTokenSigner(
+            settings.telegram_bot_token, settings.session_key_version, settings.session_previous_key_versions
+        )
+    return _signer
+
+
+async def create_session(user_id: int, db_user_id: int) -> str:
+    if signed_sessions():
+        return get_session_signer().sign(user_id, db_user_id, time.time() + SESSION_TTL)
+    session_id = secrets.token_urlsafe(32)
+    await get_session_backend().create(session_id, user_id, time.time() + SESSION_TTL)
     return session_id
 
 
-def get_session(session_id: str):
-    session = _sessions.get(session_id)
-    if not session:
-        return None
+async def get_session(session_id: str) -> Optional[SessionData]:
+    if not signed_sessions():
+        return await get_session_backend().get(session_id)
 
-    if session["expires_at"] < time.time():
-        _sessions.pop(session_id, None)
+    session = get_session_signer().verify(session_id)
+    # Only logged-out tokens are on the revocation list
+    if session is None or await get_session_backend().get(session["jti"]) is not None:
         return None
-
     return session
 
 
-def delete_session(session_id: str):
-    _sessions.pop(session_id, None)
+async def delete_session(session_id: str):
+    if not signed_sessions():
+        await get_session_backend().delete(session_id)
+        return
 
+    session = get_session_signer().verify(session_id)
+    if session is not None:
+        # Renewals keep the jti and expire at most SESSION_TTL from now
+        await get_session_backend().create(session["jti"], session["user_id"], time.time() + SESSION_TTL)
 
-def get_current_user(
-        session_id: str | None = Cookie(default=None),
-        db: Session = Depends(get_db)
-):
+
+def renew_session(session: SessionData) -> Optional[str]:
+    """A fresh signed token for a session close to expiry, None if it needs none"""
+    if not signed_sessions() or session["expires_at"] - time.time() > SESSION_RENEW_BELOW:
+        return None
+    return get_session_signer().sign(
+        session["user_id"], session["db_user_id"], time.time() + SESSION_TTL, session["jti"]
+    )
+
+
+def set_session_cookie(response: Response, session_id: str):
+    response.set_cookie(
+        key=SESSION_COOKIE,
+        value=session_id,
+        httponly=True,
+        secure=True,
+        samesite="strict",
+        max_age=SESSION_TTL
+    )
+
+
+async def get_current_session(
+        response: Response,
+        session_id: str | None = Cookie(default=None)
+) -> SessionData:
     if not session_id:
         raise HTTPException(status_code=401)
-    session = get_session(session_id)
+    session = await get_session(session_id)
     if not session:
         raise HTTPException(status_code=401)
 
-    existing_user = UserCRUD.get_user_by_telegram_id(db, session.get("user_id"))
+    # Sliding expiry for signed sessions, nothing is written server-side
+    renewed = renew_session(session)
+    if renewed:
+        set_session_cookie(response, renewed)
+    return session
+
+
+async def get_current_user(
+        session: SessionData = Depends(get_current_session),
+        db: AsyncSession = Depends(get_db)
+):
+    existing_user = await UserCRUD.get_user_by_telegram_id(db, session.get("user_id"))
 
     return existing_user
+
+
+async def get_current_user_record(
+        session: SessionData = Depends(get_current_session),
+        db: AsyncSession = Depends(get_db)
+) -> CurrentUserSchema:
+    """The signed-in user from the per-worker cache, for endpoints that need no more than its id"""
+    record = await UserCRUD.get_current_user_record(db, session["user_id"])
+    if record is None:
+        raise HTTPException(status_code=401)
+    return record
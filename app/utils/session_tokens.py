@@ -0,0 +1,75 @@
+"""Stateless signed session tokens.
+
+A token carries the Telegram id, the internal user id, the expiry and a random
+token id (jti), signed with HMAC-SHA256 under a key derived from the bot token
+and a key version:
+
+    <key version>.<base64url(payload + signature)>
+
+Verifying one needs no store lookup, so every worker and node accepts the tokens
+of the others. Keys rotate by bumping the version; tokens signed under a version
+still listed as previous keep verifying until they expire.
+"""
+import base64
+import hashlib
+import hmac
+import secrets
+import struct
+import time
+from typing import Iterable, Optional
+
+from app.utils.session_backends import SessionData
+
+JTI_SIZE = 12
+# telegram id, user id, expiry (unix seconds), jti
+PAYLOAD = struct.Struct(f">qqI{JTI_SIZE}s")
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+
+class SignedSessionData(SessionData):
+    db_user_id: int  # users.id of the signed-in user
+    jti: str  # Token id, shared by the renewals of one sign-in
+
+
+def derive_session_key(bot_token: str, version: int) -> bytes:
+    return hmac.new(bot_token.encode(), f"session-token:v{version}".encode(), hashlib.sha256).digest()
+
+
+class SessionTokenSigner:
+    """Signs tokens with the current key version, verifies any known version"""
+    def __init__(self, bot_token: str, key_version: int, previous_versions: Iterable[int] = ()):
+        self.key_version = key_version
+        self._keys = {
+            version: derive_session_key(bot_token, version)
+            for version in (key_version, *previous_versions)
+        }
+
+    def sign(self, telegram_id: int, db_user_id: int, expires_at: float, jti: Optional[str] = None) -> str:
+        jti_bytes = bytes.fromhex(jti) if jti else secrets.token_bytes(JTI_SIZE)
+        payload = PAYLOAD.pack(telegram_id, db_user_id, int(expires_at), jti_bytes)
+        signature = hmac.new(self._keys[self.key_version], payload, hashlib.sha256).digest()
+        return f"{self.key_version}.{base64.urlsafe_b64encode(payload + signature).rstrip(b'=').decode()}"
+
+    def verify(self, token: str, now: Optional[float] = None) -> Optional[SignedSessionData]:
+        """The token's session, or None if it is malformed, forged or expired"""
+        version, _, body = token.partition(".")
+        # isdigit alone accepts "²", which int() rejects, and "١", which int() reads as 1
+        key = self._keys.get(int(version)) if version.isascii() and version.isdigit() else None
+        if key is None:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(body + "=" * (-len(body) % 4))
+        except ValueError:
+            return None
+        if len(raw) != PAYLOAD.size + SIGNATURE_SIZE:
+            return None
+
+        payload, signature = raw[:PAYLOAD.size], raw[PAYLOAD.size:]
+        if not hmac.compare_digest(hmac.new(key, payload, hashlib.sha256).digest(), signature):
+            return None
+        telegram_id, db_user_id, expires_at, jti = PAYLOAD.unpack(payload)
+        if expires_at <= (time.time() if now is None else now):
+            return None
+        return SignedSessionData(
+            user_id=telegram_id, expires_at=float(expires_at), db_user_id=db_user_id, jti=jti.hex()
+        )
@@ -0,0 +1,23 @@
+from typing import AsyncIterator, Optional, Type
+
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+
+from app.crud import stream_scalars
+from app.database import AsyncSessionLocal
+from app.utils.responses import copy_headers
+
+
+def ndjson_response(schema: Type[BaseModel], stmt: Select,
+                    sub_response: Optional[Response] = None) -> StreamingResponse:
+    """Stream the rows of `stmt` as newline-delimited JSON over a server-side cursor.
+
+    The request's session is closed before the body is sent, so the stream opens its own.
+    """
+    async def lines() -> AsyncIterator[str]:
+        async with AsyncSessionLocal() as db:
+            async for obj in stream_scalars(db, stmt):
+                yield schema.model_validate(obj).model_dump_json() + "\n"
+
+    return copy_headers(StreamingResponse(lines(), media_type="application/x-ndjson"), sub_response)
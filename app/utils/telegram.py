@@ -2,10 +2,17 @@ import hashlib
 import hmac
 import json
 import time
-from urllib.parse import parse_qs, unquote
+from functools import lru_cache
+from urllib.parse import unquote_plus
 from fastapi import HTTPException, status, Header
 from typing import Optional
 
+from app.config import settings
+from app.utils.cache import TTLCache
+
+# Verified initData by its hash, as (init data, user, auth_date)
+init_data_cache = TTLCache(settings.telegram_init_data_cache_size, settings.telegram_init_data_cache_ttl_seconds)
+
 
 def extract_telegram_init_data(authorization: Optional[str] = Header(None)):
     """
@@ -25,54 +32,107 @@ def extract_telegram_init_data(authorization: Optional[str] = Header(None)):
 
     return init_data
 
-def verify_telegram_webapp_data(init_data: str, bot_token: str) -> Optional[dict]:
+
+@lru_cache(maxsize=16)
+def webapp_secret_key(bot_token: str) -> bytes:
+    """HMAC key of the initData signatures of one bot"""
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+def parse_init_data(init_data: str) -> tuple[Optional[str], list[str], dict[str, str]]:
+    """
+    Split init data into the received hash, the sorted key=value lines of the
+    data-check string and the fields by name.
+    """
+    received_hash = None
+    lines = []
+    fields = {}
+    for pair in init_data.split("&"):
+        key, separator, value = pair.partition("=")
+        if not separator:
+            continue
+        # Most values need no unquoting, skip it for them
+        if "%" in value or "+" in value:
+            value = unquote_plus(value)
+        if key == "hash":
+            received_hash = value
+            continue
+        lines.append(f"{key}={value}")
+        fields[key] = value
+    lines.sort()
+    return received_hash, lines, fields
+
+
+def find_init_data_hash(init_data: str) -> Optional[str]:
+    """The hash field of init data without parsing the rest"""
+    if init_data.startswith("hash="):
+        start = 5
+    else:
+        start = init_data.find("&hash=")
+        if start < 0:
+            return None
+        start += 6
+    end = init_data.find("&", start)
+    return init_data[start:] if end < 0 else init_data[start:end]
+
+
+def verify_telegram_webapp_data(init_data: str, bot_token: str, single_use: bool = False) -> Optional[dict]:
     """
     Verify Telegram WebApp init data signature using HMAC-SHA256.
     Returns parsed user data if valid, otherwise None.
+
+    Verified init data is cached by its hash for a short while, repeats skip the HMAC.
+    With `single_use` a repeat is rejected instead, and init data older than the cache
+    TTL is too, so no accepted init data can be replayed to this worker.
     """
-    try:
-        parsed_data = parse_qs(init_data)
-        received_hash = parsed_data.get("hash", [None])[0]
-        if not received_hash:
-            return None
-        # Build the data check string
-        data_check_string_parts = [
-            f"{key}={value}"
-            for key, values in parsed_data.items()
-            if key != "hash"
-            for value in values
-        ]
-        data_check_string_parts.sort()
-        data_check_string = "\n".join(data_check_string_parts)
-
-        # Create secret key
-        secret_key = hmac.new(
-            b"WebAppData",
-            bot_token.encode(),
-            hashlib.sha256
-        ).digest()
-
-        # Calculate hash
-        calculated_hash = hmac.new(
-            secret_key,
-            data_check_string.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        if not hmac.compare_digest(calculated_hash, received_hash):
-            return None
+    if not init_data:
+        return None
 
-        # Check auth_date freshness (24 hours)
-        auth_date = int(parsed_data.get("auth_date", [0])[0])
-        if int(time.time()) - auth_date > 86400:
-            return None
+    max_age = settings.telegram_init_data_max_age_seconds
+    if single_use:
+        max_age = min(max_age, init_data_cache.ttl)
+    now = time.time()
 
-        # Extract user data
-        user_data_str = parsed_data.get("user", [None])[0]
-        if not user_data_str:
+    cached = init_data_cache.get(find_init_data_hash(init_data))
+    if cached is not None:
+        # With single_use any repeat of the signature is a replay, whatever the field order
+        if single_use:
             return None
+        cached_init_data, user, auth_date = cached
+        if cached_init_data == init_data:
+            return user if now - auth_date <= max_age else None
+
+    received_hash, lines, fields = parse_init_data(init_data)
+    # compare_digest raises on non-ASCII strings
+    if not received_hash or not received_hash.isascii():
+        return None
+
+    calculated_hash = hmac.new(
+        webapp_secret_key(bot_token),
+        "\n".join(lines).encode(),
+        hashlib.sha256
+    ).hexdigest()
+    if not hmac.compare_digest(calculated_hash, received_hash):
+        return None
 
-        return json.loads(unquote(user_data_str))
+    # Check auth_date freshness
+    auth_date_str = fields.get("auth_date", "")
+    if not (auth_date_str.isascii() and auth_date_str.isdigit()):
+        return None
+    auth_date = int(auth_date_str)
+    if now - auth_date > max_age:
+        return None
 
-    except Exception as e:
-        print(f"[verify_telegram_webapp_data] Error: {e}")
+    # Extract user data
+    user_data_str = fields.get("user")
+    if not user_data_str:
+        return None
+
+    try:
+        user = json.loads(user_data_str)
+    except ValueError:
+        return None
+    if not isinstance(user, dict):
         return None
+    init_data_cache.set(received_hash, (init_data, user, auth_date))
+    return user
@@ -0,0 +1,330 @@
+"""Bulk word import from CSV, JSON, NDJSON and Anki (.apkg) files, optionally gzipped.
+
+Records are validated with WordExportSchema (WordCreateSchema plus lesson, card and
+reviews) in chunks and written with COPY on the asyncpg driver, or multi-row INSERTs
+otherwise. Each record may name its lesson by title in a `lesson` field, unknown
+lessons are created on the fly when asked to. Records exported with a card state and
+review history get them restored. Run as
+
+    python -m app.word_import PATH --user-id ID --course-id ID [--lesson-id ID] [--create-lessons]
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import html
+import io
+import itertools
+import json
+import re
+import sqlite3
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Optional, Iterable, Iterator, Any, BinaryIO
+
+from pydantic import ValidationError
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import LessonProgressCRUD
+from app.models import Course, Lesson, Word, UserWord, Review
+from app.schemas import WordExportSchema, WordImportErrorSchema, WordImportResultSchema
+
+IMPORT_FORMATS = ("csv", "json", "ndjson", "apkg")
+CHUNK_SIZE = 5000
+
+# Column order of the rows handed to COPY
+WORD_COLUMNS = ("lesson_id", "user_id", "text", "translation", "pronunciation", "example_sentence")
+WORD_FIELDS = tuple(WordExportSchema.model_fields)
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class ImportFormatError(ValueError):
+    """The uploaded file cannot be read in the requested format"""
+
+
+def detect_format(filename: Optional[str], format: Optional[str] = None) -> str:
+    if format is None and filename:
+        suffixes = [suffix.lower() for suffix in Path(filename).suffixes]
+        if suffixes and suffixes[-1] == ".gz":
+            suffixes.pop()
+        format = suffixes[-1].lstrip(".") if suffixes else None
+        if format == "jsonl":
+            format = "ndjson"
+    if format not in IMPORT_FORMATS:
+        raise ImportFormatError(f"Unsupported import format {format!r}, expected one of {', '.join(IMPORT_FORMATS)}")
+    return format
+
+
+def iter_csv(fileobj: BinaryIO) -> Iterator[dict[str, Any]]:
+    yield from csv.DictReader(io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline=""))
+
+
+def iter_json(fileobj: BinaryIO) -> Iterator[dict[str, Any]]:
+    data = json.load(fileobj)
+    if isinstance(data, dict):
+        data = data.get("words")
+    if not isinstance(data, list):
+        raise ImportFormatError("JSON import expects a list of words or an object with a 'words' list")
+    yield from data
+
+
+def iter_ndjson(fileobj: BinaryIO) -> Iterator[dict[str, Any]]:
+    for line in io.TextIOWrapper(fileobj, encoding="utf-8"):
+        if line.strip():
+            yield json.loads(line)
+
+
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+def _anki_field(value: str) -> str:
+    return html.unescape(_HTML_TAG.sub("", value.replace("<br>", " "))).strip()
+
+
+def iter_apkg(fileobj: BinaryIO) -> Iterator[dict[str, Any]]:
+    """Notes of an Anki package: front field as text, back as translation, deck as lesson"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            with zipfile.ZipFile(fileobj) as package:
+                names = set(package.namelist())
+                if "collection.anki21" not in names and "collection.anki21b" in names:
+                    # Current exports keep the notes zstd-compressed in anki21b, their anki2 is
+                    # a stub with one "please update Anki" note
+                    raise ImportFormatError(
+                        "Anki package in the current format is not supported, "
+                        "export it with 'Support older Anki versions' enabled"
+                    )
+                collection = next((name for name in ("collection.anki21", "collection.anki2") if name in names), None)
+                if collection is None:
+                    raise ImportFormatError(
+                        "Unsupported Anki package, export it with 'Support older Anki versions' enabled"
+                    )
+                collection_path = package.extract(collection, tmp_dir)
+        except zipfile.BadZipFile as e:
+            raise ImportFormatError(f"Invalid Anki package: {e}")
+
+        # Importers read the records from worker threads, one chunk at a time
+        connection = sqlite3.connect(collection_path, check_same_thread=False)
+        try:
+            try:
+                decks = dict(connection.execute("SELECT id, name FROM decks"))
+            except sqlite3.OperationalError:
+                # Collections before Anki 2.1.28 keep their decks as JSON on the col row
+                decks_json = connection.execute("SELECT decks FROM col").fetchone()[0]
+                decks = {int(deck_id): deck["name"] for deck_id, deck in json.loads(decks_json).items()}
+
+            notes = connection.execute(
+                "SELECT notes.flds, MIN(cards.did) FROM notes JOIN cards ON cards.nid = notes.id "
+                "GROUP BY notes.id ORDER BY notes.id"
+            )
+            for fields, deck_id in notes:
+                fields = [_anki_field(field) for field in fields.split("\x1f")]
+                deck_name = decks.get(deck_id)
+                yield {
+                    "text": fields[0],
+                    "translation": fields[1] if len(fields) > 1 else "",
+                    "lesson": deck_name.split("::")[-1] if deck_name else None,
+                }
+        finally:
+            connection.close()
+
+
+def iter_records(fileobj: BinaryIO, format: str) -> Iterator[dict[str, Any]]:
+    readers = {"csv": iter_csv, "json": iter_json, "ndjson": iter_ndjson, "apkg": iter_apkg}
+    magic = fileobj.read(len(GZIP_MAGIC))
+    fileobj.seek(0)
+    if magic == GZIP_MAGIC:
+        fileobj = gzip.GzipFile(fileobj=fileobj)
+    try:
+        yield from readers[format](fileobj)
+    except (UnicodeDecodeError, json.JSONDecodeError, csv.Error, gzip.BadGzipFile) as e:
+        raise ImportFormatError(f"Invalid {format} file: {e}")
+
+
+class WordImporter:
+    """Validates records in chunks and bulk-writes them into the lessons of one course"""
+    def __init__(self, db: AsyncSession, user_id: int, course_id: int, lesson_id: Optional[int] = None,
+                 create_lessons: bool = False, chunk_size: int = CHUNK_SIZE):
+        self.db = db
+        self.user_id = user_id
+        self.course_id = course_id
+        self.lesson_id = lesson_id
+        self.create_lessons = create_lessons
+        self.chunk_size = chunk_size
+        self.lessons_by_title: dict[str, int] = {}
+        self.next_order_index = 1
+        self.lessons_created = 0
+
+    async def _load_lessons(self) -> bool:
+        """Resolve the course's lessons, False if the course or lesson is not the user's"""
+        course_id = await self.db.scalar(
+            select(Course.id).where(Course.id == self.course_id, Course.user_id == self.user_id)
+        )
+        if course_id is None:
+            return False
+
+        lessons = (await self.db.execute(
+            select(Lesson.id, Lesson.title, Lesson.order_index)
+            .where(Lesson.user_id == self.user_id, Lesson.course_id == self.course_id)
+            .order_by(Lesson.order_index, Lesson.id)
+        )).all()
+        for lesson_id, title, _ in lessons:
+            self.lessons_by_title.setdefault(title, lesson_id)
+        self.next_order_index = max((order_index for _, _, order_index in lessons), default=0) + 1
+        return self.lesson_id is None or self.lesson_id in {lesson_id for lesson_id, _, _ in lessons}
+
+    async def _resolve_lesson(self, word: WordExportSchema) -> int:
+        title = (word.lesson or "").strip()
+        if not title:
+            if self.lesson_id is None:
+                raise ValueError("No lesson given, set a lesson column or import into a lesson")
+            return self.lesson_id
+
+        lesson_id = self.lessons_by_title.get(title)
+        if lesson_id is not None:
+            return lesson_id
+        if not self.create_lessons:
+            raise ValueError(f"Unknown lesson {title!r}")
+
+        order_index = word.lesson_order_index or self.next_order_index
+        lesson_id = await self.db.scalar(insert(Lesson).values(
+            course_id=self.course_id,
+            user_id=self.user_id,
+            title=title,
+            order_index=order_index
+        ).returning(Lesson.id))
+        self.lessons_by_title[title] = lesson_id
+        self.next_order_index = max(self.next_order_index, order_index + 1)
+        self.lessons_created += 1
+        return lesson_id
+
+    async def _write_words(self, rows: list[tuple]) -> None:
+        connection = await self.db.connection()
+        if connection.dialect.driver == "asyncpg":
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                Word.__tablename__, records=rows, columns=WORD_COLUMNS
+            )
+        else:
+            await self.db.execute(insert(Word), [dict(zip(WORD_COLUMNS, row)) for row in rows])
+
+    async def _write_words_with_history(self, words: list[tuple[tuple, WordExportSchema]]) -> None:
+        """Insert words that carry a card state, then their cards and review history"""
+        word_ids = (await self.db.scalars(
+            insert(Word).returning(Word.id, sort_by_parameter_order=True),
+            [dict(zip(WORD_COLUMNS, row)) for row, _ in words]
+        )).all()
+        user_word_ids = (await self.db.scalars(
+            insert(UserWord).returning(UserWord.id, sort_by_parameter_order=True),
+            [
+                {"user_id": self.user_id, "word_id": word_id, **word.card.model_dump()}
+                for word_id, (_, word) in zip(word_ids, words)
+            ]
+        )).all()
+        review_rows = [
+            {"user_word_id": user_word_id, **review.model_dump()}
+            for user_word_id, (_, word) in zip(user_word_ids, words)
+            for review in word.reviews
+        ]
+        if review_rows:
+            await self.db.execute(insert(Review), review_rows)
+
+    async def run(self, records: Iterable[dict[str, Any]]) -> Optional[WordImportResultSchema]:
+        """Import all valid records in one transaction.
+
+        Records are read chunk by chunk in a worker thread, so reading and parsing
+        the file does not block the event loop. Returns None if the course, or the
+        target lesson, does not belong to the user.
+        """
+        if not await self._load_lessons():
+            return None
+
+        records = iter(records)
+        try:
+            return await self._import_chunks(enumerate(records, start=1))
+        finally:
+            # Readers clean up their temporary files and connections on close
+            if hasattr(records, "close"):
+                await asyncio.to_thread(records.close)
+
+    async def _import_chunks(self, numbered: Iterator[tuple[int, Any]]) -> WordImportResultSchema:
+        imported = 0
+        errors = []
+        while chunk := await asyncio.to_thread(list, itertools.islice(numbered, self.chunk_size)):
+            rows = []
+            history_rows = []
+            for row_number, record in chunk:
+                if not isinstance(record, dict):
+                    errors.append(WordImportErrorSchema(row=row_number, errors=["Expected an object"]))
+                    continue
+                try:
+                    word = WordExportSchema.model_validate({
+                        field: record.get(field) or None for field in WORD_FIELDS
+                    })
+                    if word.reviews and word.card is None:
+                        raise ValueError("Reviews given without a card state")
+                    lesson_id = await self._resolve_lesson(word)
+                except ValidationError as e:
+                    errors.append(WordImportErrorSchema(
+                        row=row_number,
+                        errors=[f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()]
+                    ))
+                    continue
+                except ValueError as e:
+                    errors.append(WordImportErrorSchema(row=row_number, errors=[str(e)]))
+                    continue
+                row = (lesson_id, self.user_id, word.text, word.translation,
+                       word.pronunciation, word.example_sentence)
+                if word.card is None:
+                    rows.append(row)
+                else:
+                    history_rows.append((row, word))
+
+            if rows:
+                await self._write_words(rows)
+            if history_rows:
+                await self._write_words_with_history(history_rows)
+            imported += len(rows) + len(history_rows)
+
+        await LessonProgressCRUD.invalidate_progress_summary(self.db, self.user_id)
+        await self.db.commit()
+        return WordImportResultSchema(imported=imported, lessons_created=self.lessons_created, errors=errors)
+
+
+async def import_file(path: str, user_id: int, course_id: int, lesson_id: Optional[int] = None,
+                      create_lessons: bool = False, format: Optional[str] = None) -> Optional[WordImportResultSchema]:
+    from app.database import AsyncSessionLocal
+
+    format = detect_format(path, format)
+    with open(path, "rb") as fileobj:
+        async with AsyncSessionLocal() as db:
+            importer = WordImporter(db, user_id, course_id, lesson_id, create_lessons)
+            return await importer.run(iter_records(fileobj, format))
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk import words into a course")
+    parser.add_argument("path", help="CSV, JSON, NDJSON or Anki .apkg file, optionally gzipped")
+    parser.add_argument("--user-id", type=int, required=True, help="owner of the course")
+    parser.add_argument("--course-id", type=int, required=True, help="course to import into")
+    parser.add_argument("--lesson-id", type=int, default=None, help="lesson for records without a lesson field")
+    parser.add_argument("--create-lessons", action="store_true", help="create lessons named in the file")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default=None,
+                        help="file format, detected from the extension by default")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(import_file(
+        args.path, args.user_id, args.course_id, args.lesson_id, args.create_lessons, args.format
+    ))
+    if result is None:
+        parser.exit(1, "Course or lesson not found for this user\n")
+    for error in result.errors:
+        print(f"[word_import] Row {error.row}: {'; '.join(error.errors)}")
+    print(f"[word_import] Imported {result.imported} words, created {result.lessons_created} lessons, "
+          f"{len(result.errors)} rows rejected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Latency under concurrent clients, synchronous session on the event loop against AsyncSession.
+
+Serves the words of a lesson from one uvicorn worker the way the routers did before the
+async port (a SessionLocal query inside an async def handler) and the way they do now, and
+drives each with keep-alive clients. `--delay` adds a pg_sleep before the query, standing in
+for a database that is further away or busier than a local one. Needs httpx, like the tests.
+DATABASE_URL must point at a scratch database at the Alembic head, see scripts.dataset.
+
+    python -m scripts.benchmark_async_db --clients 200 --requests 25 --delay 0.005
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import WordCRUD
+from app.database import SessionLocal, get_db
+from app.schemas import WordSchema
+from scripts.dataset import seed_course
+
+app = FastAPI()
+DELAY = float(os.environ.get("BENCHMARK_QUERY_DELAY", "0"))
+
+
+@app.get("/sync/{lesson_id}")
+async def sync_lesson_words(lesson_id: int, user_id: int):
+    with SessionLocal() as db:
+        if DELAY:
+            db.execute(select(func.pg_sleep(DELAY)))
+        words = db.scalars(WordCRUD.lesson_words_query(lesson_id, user_id)).all()
+        return [WordSchema.model_validate(word) for word in words]
+
+
+@app.get("/async/{lesson_id}")
+async def async_lesson_words(lesson_id: int, user_id: int, db: AsyncSession = Depends(get_db)):
+    if DELAY:
+        await db.execute(select(func.pg_sleep(DELAY)))
+    words = await WordCRUD.get_lesson_words(db, lesson_id, user_id)
+    return [WordSchema.model_validate(word) for word in words]
+
+
+async def drive(base_url: str, path: str, clients: int, requests: int, dataset: dict) -> tuple[list[float], float]:
+    """Latency of every request and the wall time of `clients` clients sending `requests` each"""
+    latencies = []
+    lesson_ids = dataset["lesson_ids"]
+
+    async def client_loop(client: httpx.AsyncClient, index: int):
+        for request in range(requests):
+            lesson_id = lesson_ids[(index + request) % len(lesson_ids)]
+            started = time.perf_counter()
+            response = await client.get(f"{path}/{lesson_id}", params={"user_id": dataset["user_id"]})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        # Open the connections and fill the pools before timing
+        await asyncio.gather(*(client.get(f"{path}/{lesson_ids[0]}", params={"user_id": dataset["user_id"]})
+                               for _ in range(clients)))
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, index) for index in range(clients)))
+        return latencies, time.perf_counter() - started
+
+
+async def wait_until_serving(base_url: str, server: subprocess.Popen):
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while server.poll() is None:
+            try:
+                await client.get("/docs")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("uvicorn exited before serving")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=25, help="requests per client")
+    parser.add_argument("--lessons", type=int, default=50)
+    parser.add_argument("--words", type=int, default=50, help="words per lesson")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds of pg_sleep per request")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    dataset = seed_course(args.lessons, args.words)
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "scripts.benchmark_async_db:app",
+         "--port", str(args.port), "--log-level", "warning", "--no-access-log", "--timeout-keep-alive", "600"],
+        env={**os.environ, "BENCHMARK_QUERY_DELAY": str(args.delay)}
+    )
+    try:
+        asyncio.run(wait_until_serving(base_url, server))
+        for name, path in [("sync session", "/sync"), ("AsyncSession", "/async")]:
+            latencies, elapsed = asyncio.run(drive(base_url, path, args.clients, args.requests, dataset))
+            percentiles = statistics.quantiles(latencies, n=100)
+            print(f"{name:>13}: p50 {percentiles[49] * 1000:7.1f} ms  p99 {percentiles[98] * 1000:7.1f} ms  "
+                  f"max {max(latencies) * 1000:7.1f} ms  {len(latencies) / elapsed:7.0f} req/s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
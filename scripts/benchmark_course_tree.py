@@ -0,0 +1,70 @@
+"""Course tree load time, per-lesson word queries against CourseCRUD.get_course_tree.
+
+Seeds a 114-lesson course per size and times loading it and rendering the response JSON.
+DATABASE_URL must point at a scratch database at the Alembic head, see scripts.dataset.
+
+    python -m scripts.benchmark_course_tree --words 1000 10000 100000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import and_, select
+
+from app.crud import CourseCRUD
+from app.database import AsyncSessionLocal, async_engine
+from app.models import Course, Lesson, Word
+from app.schemas import CourseWithLessonsAndWordsSchema, LessonWithWordsSchema
+from scripts.dataset import seed_course
+
+LESSONS = 114
+
+
+async def per_lesson_tree(db, course_id: int, user_id: int) -> CourseWithLessonsAndWordsSchema:
+    """GET /courses/{id} before get_course_tree: a join per lesson and ORM __dict__ copies"""
+    course = (await db.execute(select(Course).where(
+        and_(Course.id == course_id, Course.user_id == user_id)
+    ))).scalars().first()
+    lessons = (await db.execute(select(Lesson).join(Course).where(
+        and_(Lesson.course_id == course_id, Course.user_id == user_id)
+    ).order_by(Lesson.order_index))).scalars().all()
+    lessons_with_words = []
+    for lesson in lessons:
+        words = (await db.execute(select(Word).join(Lesson).join(Course).where(
+            and_(Word.lesson_id == lesson.id, Course.user_id == user_id)
+        ))).scalars().all()
+        lessons_with_words.append(LessonWithWordsSchema(**lesson.__dict__, words=words))
+    return CourseWithLessonsAndWordsSchema(**course.__dict__, lessons=lessons_with_words)
+
+
+async def best_of(repeat: int, load, dataset: dict) -> float:
+    timings = []
+    for _ in range(repeat):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            tree = await load(db, dataset["course_id"], dataset["user_id"])
+            tree.model_dump_json()
+            timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+async def run(sizes: list[int], repeat: int):
+    print(f"{'words':>8} {'per lesson':>12} {'tree':>10} {'speedup':>8}")
+    for size in sizes:
+        dataset = seed_course(LESSONS, max(1, size // LESSONS))
+        before = await best_of(repeat, per_lesson_tree, dataset)
+        after = await best_of(repeat, CourseCRUD.get_course_tree, dataset)
+        print(f"{size:>8} {before * 1000:9.1f} ms {after * 1000:7.1f} ms {before / after:7.1f}x")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, nargs="+", default=[1000, 10000, 100000], help="course sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.words, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
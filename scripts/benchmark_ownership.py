@@ -0,0 +1,101 @@
+"""Lesson and word fetch latency, ownership through the course join against the denormalized user_id.
+
+Seeds many small courses so the joins run over realistically sized tables, then times
+each lookup on random lessons and words of one user in the middle of the dataset.
+DATABASE_URL must point at a scratch database at the Alembic head, see scripts.dataset.
+
+    python -m scripts.benchmark_ownership --users 500 --lookups 2000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import and_, select, text
+
+from app.crud import WordCRUD
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.models import Course, Lesson, Word
+from scripts.dataset import seed_course
+
+
+def joined_lesson(lesson_id: int, user_id: int):
+    return select(Lesson).join(Course).where(and_(Lesson.id == lesson_id, Course.user_id == user_id))
+
+
+def owned_lesson(lesson_id: int, user_id: int):
+    return select(Lesson).where(and_(Lesson.id == lesson_id, Lesson.user_id == user_id))
+
+
+def joined_word(word_id: int, user_id: int):
+    return select(Word).join(Lesson).join(Course).where(and_(Word.id == word_id, Course.user_id == user_id))
+
+
+def owned_word(word_id: int, user_id: int):
+    return select(Word).where(and_(Word.id == word_id, Word.user_id == user_id))
+
+
+def joined_lesson_words(lesson_id: int, user_id: int):
+    return select(Word).join(Lesson).join(Course).where(
+        and_(Word.lesson_id == lesson_id, Course.user_id == user_id)
+    ).order_by(Word.id)
+
+
+CASES = [
+    ("lesson", joined_lesson, owned_lesson),
+    ("word", joined_word, owned_word),
+    ("lesson words", joined_lesson_words, WordCRUD.lesson_words_query),
+]
+
+
+async def latencies(queries: list, ids: list[int], user_id: int) -> list[list[float]]:
+    """Latency of each query on every id, the queries interleaved so drift hits them alike"""
+    timings = [[] for _ in queries]
+    async with AsyncSessionLocal() as db:
+        for row_id in ids:
+            for query, query_timings in zip(queries, timings):
+                started = time.perf_counter()
+                (await db.execute(query(row_id, user_id))).scalars().all()
+                query_timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summary(timings: list[float]) -> str:
+    return f"{statistics.mean(timings) * 1e6:7.0f} us {statistics.quantiles(timings, n=100)[98] * 1e6:6.0f} us"
+
+
+async def run(dataset: dict, word_ids: list[int], lookups: int):
+    rng = random.Random(0)
+    ids = {
+        "lesson": [rng.choice(dataset["lesson_ids"]) for _ in range(lookups)],
+        "word": [rng.choice(word_ids) for _ in range(lookups)],
+        "lesson words": [rng.choice(dataset["lesson_ids"]) for _ in range(lookups)],
+    }
+    print(f"{'fetch':>13} {'join mean':>10} {'p99':>9} {'user_id mean':>13} {'p99':>9}")
+    for name, joined, owned in CASES:
+        # Warm the pool, the prepared statement caches and the buffers
+        await latencies([joined, owned], ids[name][:100], dataset["user_id"])
+        before, after = await latencies([joined, owned], ids[name], dataset["user_id"])
+        print(f"{name:>13} {summary(before)} {summary(after):>23}")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--lessons", type=int, default=10, help="lessons per user")
+    parser.add_argument("--words", type=int, default=20, help="words per lesson")
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    datasets = [seed_course(args.lessons, args.words, analyze=False) for _ in range(args.users)]
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+        dataset = datasets[len(datasets) // 2]
+        word_ids = connection.scalars(select(Word.id).where(Word.user_id == dataset["user_id"])).all()
+    asyncio.run(run(dataset, word_ids, args.lookups))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Session lookup latency and storage per million sessions, for each session backend.
+
+Fills every backend with --sessions live sessions, then times --lookups random gets
+through its SessionBackend.get. The postgres backend uses the user_sessions table of
+the database at DATABASE_URL and deletes the sessions it added; skip it with
+--backends memory sqlite signed.
+
+    python -m scripts.benchmark_sessions --sessions 1000000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import secrets
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import text
+
+from app.utils.session_backends import MemorySessionBackend, PostgresSessionBackend, SQLiteSessionBackend
+from app.utils.session_tokens import SessionTokenSigner
+
+BENCHMARK_PREFIX = "benchmark-"
+
+
+async def lookup_latencies(get, session_ids: list[str], lookups: int) -> list[float]:
+    rng = random.Random(0)
+    timings = []
+    for session_id in (rng.choice(session_ids) for _ in range(lookups)):
+        started = time.perf_counter()
+        session = await get(session_id)
+        timings.append(time.perf_counter() - started)
+        assert session is not None
+    return timings
+
+
+async def memory(sessions: int, lookups: int) -> tuple[list[float], int]:
+    """Python heap taken by the sessions and their timer wheel entries"""
+    session_ids = [secrets.token_urlsafe(32) for _ in range(sessions)]
+    expires_at = time.time() + 3600
+    gc.collect()
+    tracemalloc.start()
+    backend = MemorySessionBackend()
+    for index, session_id in enumerate(session_ids):
+        await backend.create(session_id, index, expires_at + index % 3600)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return await lookup_latencies(backend.get, session_ids, lookups), size
+
+
+async def sqlite(sessions: int, lookups: int) -> tuple[list[float], int]:
+    """Size of the SQLite file and its WAL"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sessions.sqlite3")
+        backend = SQLiteSessionBackend(path)
+        session_ids = [secrets.token_urlsafe(32) for _ in range(sessions)]
+        expires_at = time.time() + 3600
+        # Bulk load, one create per session would time the writes rather than the lookups
+        backend._connection.execute("BEGIN")
+        backend._connection.executemany(
+            "INSERT INTO sessions VALUES (?, ?, ?)",
+            ((session_id, index, expires_at) for index, session_id in enumerate(session_ids))
+        )
+        backend._connection.execute("COMMIT")
+        backend._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size = sum(os.path.getsize(f"{path}{suffix}") for suffix in ("", "-wal") if os.path.exists(f"{path}{suffix}"))
+        try:
+            return await lookup_latencies(backend.get, session_ids, lookups), size
+        finally:
+            await backend.stop()
+
+
+async def postgres(sessions: int, lookups: int) -> tuple[list[float], int]:
+    """Size of the user_sessions table with its indexes, less what it held before"""
+    from app.database import async_engine
+
+    async with async_engine.begin() as connection:
+        before = await connection.scalar(text("SELECT pg_total_relation_size('user_sessions')"))
+        await connection.execute(text(
+            "INSERT INTO user_sessions (id, telegram_id, expires_at) "
+            "SELECT :prefix || substr(md5(g::text) || md5((-g)::text), 1, 33), g, :expires_at "
+            "FROM generate_series(1, :sessions) g"
+        ), {"prefix": BENCHMARK_PREFIX, "sessions": sessions, "expires_at": time.time() + 3600})
+        await connection.execute(text("ANALYZE user_sessions"))
+        size = await connection.scalar(text("SELECT pg_total_relation_size('user_sessions')")) - before
+        session_ids = (await connection.scalars(text(
+            "SELECT id FROM user_sessions WHERE id LIKE :prefix || '%' ORDER BY random() LIMIT 10000"
+        ), {"prefix": BENCHMARK_PREFIX})).all()
+    try:
+        backend = PostgresSessionBackend()
+        return await lookup_latencies(backend.get, session_ids, lookups), size
+    finally:
+        async with async_engine.begin() as connection:
+            await connection.execute(text("DELETE FROM user_sessions WHERE id LIKE :prefix || '%'"),
+                                     {"prefix": BENCHMARK_PREFIX})
+        await async_engine.dispose()
+
+
+async def signed(sessions: int, lookups: int) -> tuple[list[float], int]:
+    """Nothing is stored, a lookup verifies the token"""
+    signer = SessionTokenSigner("123456:benchmark", 1)
+    expires_at = time.time() + 3600
+    tokens = [signer.sign(index, index, expires_at) for index in range(min(sessions, 10000))]
+
+    async def get(token):
+        return signer.verify(token)
+    return await lookup_latencies(get, tokens, lookups), 0
+
+
+BACKENDS = {"memory": memory, "sqlite": sqlite, "postgres": postgres, "signed": signed}
+
+
+async def run(backends: list[str], sessions: int, lookups: int):
+    print(f"{'backend':>8} {'lookup mean':>12} {'p99':>9} {'per 1M sessions':>16}")
+    for name in backends:
+        timings, size = await BACKENDS[name](sessions, lookups)
+        print(f"{name:>8} {statistics.mean(timings) * 1e6:9.1f} us {statistics.quantiles(timings, n=100)[98] * 1e6:6.1f} us"
+              f" {size * 1_000_000 / sessions / 2 ** 20:12.0f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    args = parser.parse_args()
+    asyncio.run(run(args.backends, args.sessions, args.lookups))
+
+
+if __name__ == "__main__":
+    main()
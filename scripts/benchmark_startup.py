@@ -0,0 +1,86 @@
+"""Worker startup time, phase by phase and until uvicorn answers /health.
+
+Each sample runs in a fresh interpreter. `create_all` times the Base.metadata.create_all
+the module used to run at import, on the same database, for comparison. DATABASE_URL must
+point at a database at the Alembic head.
+
+    python -m scripts.benchmark_startup --samples 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+PHASES = r"""
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+application = app.main.create_app()
+created = time.perf_counter()
+
+async def lifespan():
+    async with application.router.lifespan_context(application):
+        ready = time.perf_counter()
+    return ready
+
+ready = asyncio.run(lifespan())
+
+from app.database import Base, engine
+import app.models
+before_create_all = time.perf_counter()
+Base.metadata.create_all(bind=engine)
+create_all = time.perf_counter() - before_create_all
+print(json.dumps({
+    "import app.main": imported - started, "create_app()": created - imported,
+    "lifespan startup": ready - created, "create_all": create_all,
+}))
+"""
+
+
+def phases() -> dict[str, float]:
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", PHASES], capture_output=True, text=True, check=True).stdout
+    return {**json.loads(output.splitlines()[-1]), "interpreter total": time.perf_counter() - started}
+
+
+def until_healthy(port: int) -> float:
+    """Seconds from spawning uvicorn to the first 200 from /health"""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:create_app", "--factory", "--port", str(port),
+         "--log-level", "warning"]
+    )
+    try:
+        while server.poll() is None:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health") as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("uvicorn exited before serving")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    samples = [phases() for _ in range(args.samples)]
+    for name in samples[0]:
+        print(f"{name:>18}: {statistics.median(sample[name] for sample in samples) * 1000:7.0f} ms")
+    healthy = statistics.median(until_healthy(args.port) for _ in range(args.samples))
+    print(f"{'uvicorn to /health':>18}: {healthy * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Verifications per second of Telegram initData, cold and cached.
+
+    python -m scripts.benchmark_telegram --count 100000
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import time
+from urllib.parse import parse_qs, quote, unquote
+
+from app.config import settings
+from app.utils.telegram import init_data_cache, verify_telegram_webapp_data, webapp_secret_key
+
+USER = {
+    "id": 279058397, "first_name": "Vladislav", "last_name": "Kibenko", "username": "vdkfrost",
+    "language_code": "ru", "is_premium": True, "allows_write_to_pm": True,
+    "photo_url": "https://t.me/i/userpic/320/4FPEE4tmP3ATHa57u6MqTDih13LTOiMoKoLDRG4PnSA.svg",
+}
+
+
+def sign(query_id: str, bot_token: str) -> str:
+    fields = {
+        "query_id": query_id, "user": json.dumps(USER, separators=(",", ":")),
+        "auth_date": str(int(time.time())), "chat_instance": "-3788475317572404878", "chat_type": "private",
+    }
+    check_string = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    signature = hmac.new(webapp_secret_key(bot_token), check_string.encode(), hashlib.sha256).hexdigest()
+    return "&".join(f"{key}={quote(value)}" for key, value in {**fields, "hash": signature}.items())
+
+
+def parse_qs_verify(init_data: str, bot_token: str):
+    """The verification before the secret was memoised and the parser rewritten"""
+    parsed_data = parse_qs(init_data)
+    received_hash = parsed_data.get("hash", [None])[0]
+    data_check_string = "\n".join(sorted(
+        f"{key}={value}" for key, values in parsed_data.items() if key != "hash" for value in values
+    ))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(calculated_hash, received_hash):
+        return None
+    if int(time.time()) - int(parsed_data["auth_date"][0]) > 86400:
+        return None
+    return json.loads(unquote(parsed_data["user"][0]))
+
+
+def per_second(samples: list[str], verify, repeat: int, before=None) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        for init_data in samples:
+            verify(init_data)
+        best = min(best, time.perf_counter() - started)
+    return len(samples) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000, help="verifications per case")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bot_token = settings.telegram_bot_token or "123456:benchmark"
+    distinct = [sign(f"AAH{index:08d}", bot_token) for index in range(args.count)]
+    repeated = [distinct[0]] * args.count
+
+    def verify(init_data):
+        assert verify_telegram_webapp_data(init_data, bot_token) is not None
+
+    def cache_one():
+        init_data_cache.clear()
+        verify(repeated[0])
+
+    cases = {
+        "parse_qs, key per call": per_second(distinct, lambda data: parse_qs_verify(data, bot_token), args.repeat),
+        "cold (HMAC)": per_second(distinct, verify, args.repeat, before=init_data_cache.clear),
+        "cached": per_second(repeated, verify, args.repeat, before=cache_one),
+        "single_use replay": per_second(
+            repeated, lambda data: verify_telegram_webapp_data(data, bot_token, single_use=True), args.repeat,
+            before=cache_one
+        ),
+    }
+    for name, rate in cases.items():
+        print(f"{name:>22}: {rate:12,.0f} /s  {1e6 / rate:6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Benchmark data in the database at DATABASE_URL.
+
+Every call adds a new user and nothing is ever deleted, so point DATABASE_URL at a
+scratch database at the Alembic head.
+"""
+from sqlalchemy import text
+
+from app.database import engine
+
+
+def seed_course(lessons: int, words_per_lesson: int, cards: bool = False, analyze: bool = True) -> dict:
+    """A new user owning one course of `lessons` lessons with `words_per_lesson` words each,
+    and a review card per word with `cards`. Returns the user, course and lesson ids.
+
+    Pass analyze=False when seeding many users in a row and ANALYZE once at the end.
+    """
+    with engine.begin() as connection:
+        user_id = connection.scalar(text(
+            "INSERT INTO users (telegram_id, username) "
+            "SELECT least(coalesce(min(telegram_id), 0), 0) - 1, 'benchmark' FROM users RETURNING id"
+        ))
+        course_id = connection.scalar(text(
+            "INSERT INTO courses (user_id, title, language, native_language) "
+            "VALUES (:user_id, 'Benchmark', 'ar', 'en') RETURNING id"
+        ), {"user_id": user_id})
+        connection.execute(text(
+            "INSERT INTO lessons (course_id, user_id, title, order_index, is_completed) "
+            "SELECT :course_id, :user_id, 'Lesson ' || l, l, false FROM generate_series(1, :lessons) l"
+        ), {"course_id": course_id, "user_id": user_id, "lessons": lessons})
+        connection.execute(text(
+            "INSERT INTO words (lesson_id, user_id, text, translation, pronunciation, example_sentence) "
+            "SELECT le.id, le.user_id, 'word ' || w, 'translation ' || w, 'pronunciation', 'An example sentence' "
+            "FROM lessons le, generate_series(1, :words) w WHERE le.course_id = :course_id"
+        ), {"course_id": course_id, "words": words_per_lesson})
+        if cards:
+            connection.execute(text(
+                "INSERT INTO user_words (user_id, word_id, state, stability, difficulty, due, last_review) "
+                "SELECT user_id, id, 2, 10.0, 5.0, now() - (id % 20 - 10) * interval '1 day', "
+                "now() - interval '20 days' FROM words WHERE user_id = :user_id"
+            ), {"user_id": user_id})
+        lesson_ids = connection.scalars(text(
+            "SELECT id FROM lessons WHERE course_id = :course_id ORDER BY order_index"
+        ), {"course_id": course_id}).all()
+        if analyze:
+            connection.execute(text("ANALYZE"))
+    return {"user_id": user_id, "course_id": course_id, "lesson_ids": lesson_ids}
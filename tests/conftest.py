@@ -0,0 +1,182 @@
+"""Shared fixtures.
+
+Tests that need PostgreSQL run against a scratch database created on the server
+named by TEST_DATABASE_URL (any database there the user may CREATE DATABASE from),
+and are skipped when it is unset:
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost/postgres python -m pytest
+"""
+import os
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.engine import make_url
+
+ROOT = Path(__file__).resolve().parent.parent
+ADMIN_URL = os.environ.get("TEST_DATABASE_URL")
+
+if ADMIN_URL:
+    # app.config reads DATABASE_URL on import, point the app at the scratch database first
+    os.environ["DATABASE_URL"] = make_url(ADMIN_URL).set(
+        database=f"quran_web_app_test_{uuid.uuid4().hex[:8]}"
+    ).render_as_string(hide_password=False)
+    os.environ.setdefault("CHECK_MIGRATIONS", "false")
+
+
+def create_database(url: str) -> None:
+    admin = create_engine(ADMIN_URL, isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        connection.execute(text(f'CREATE DATABASE "{make_url(url).database}"'))
+    admin.dispose()
+
+
+def drop_database(url: str) -> None:
+    admin = create_engine(ADMIN_URL, isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS "{make_url(url).database}" WITH (FORCE)'))
+    admin.dispose()
+
+
+def alembic_config():
+    from alembic.config import Config
+
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    return config
+
+
+@pytest.fixture
+def empty_database_url():
+    if not ADMIN_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    url = make_url(ADMIN_URL).set(
+        database=f"quran_web_app_empty_{uuid.uuid4().hex[:8]}"
+    ).render_as_string(hide_password=False)
+    create_database(url)
+    yield url
+    drop_database(url)
+
+
+@pytest.fixture(scope="session")
+def database_url():
+    """Scratch database at the Alembic head, shared by the tests of one run"""
+    if not ADMIN_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from alembic import command
+
+    url = os.environ["DATABASE_URL"]
+    create_database(url)
+    command.upgrade(alembic_config(), "head")
+    yield url
+
+    from app.database import engine, async_engine
+
+    engine.dispose()
+    async_engine.sync_engine.dispose()
+    drop_database(url)
+
+
+@pytest.fixture
+def run(database_url):
+    """Run a coroutine on a fresh event loop, the async pool is emptied afterwards"""
+    import asyncio
+
+    from app.database import async_engine
+
+    async def main(coro):
+        try:
+            return await coro
+        finally:
+            await async_engine.dispose()
+
+    return lambda coro: asyncio.run(main(coro))
+
+
+@pytest.fixture
+def seed(database_url):
+    """Create a user owning one course with one lesson of `words` words, returns their ids"""
+    import itertools
+
+    from app.database import AsyncSessionLocal
+    from app.models import User, Course, Lesson, Word
+
+    telegram_ids = itertools.count(uuid.uuid4().int % 10 ** 8)
+
+    async def create(words: int = 3):
+        async with AsyncSessionLocal() as db:
+            user = User(telegram_id=next(telegram_ids), username="tester")
+            db.add(user)
+            await db.flush()
+            course = Course(user_id=user.id, title="Course", language="ar", native_language="en")
+            db.add(course)
+            await db.flush()
+            lesson = Lesson(course_id=course.id, user_id=user.id, title="Lesson", order_index=1)
+            db.add(lesson)
+            await db.flush()
+            db.add_all(
+                Word(lesson_id=lesson.id, user_id=user.id, text=f"word {i}", translation=f"translation {i}")
+                for i in range(words)
+            )
+            await db.flush()
+            word_ids = list(await db.scalars(select(Word.id).where(Word.lesson_id == lesson.id).order_by(Word.id)))
+            await db.commit()
+            return {
+                "user_id": user.id, "telegram_id": user.telegram_id, "course_id": course.id,
+                "lesson_id": lesson.id, "word_ids": word_ids
+            }
+
+    return create
+
+
+class StatementCounter:
+    """Counts the SQL statements an engine sends while active"""
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements: list[str] = []
+        self.parameters: list = []  # DBAPI parameters of each statement
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+@pytest.fixture
+def count_statements():
+    from app.database import async_engine
+
+    return lambda: StatementCounter(async_engine.sync_engine)
+
+
+@pytest.fixture
+def signed_client(database_url, monkeypatch):
+    """Test client of the app with signed sessions, see `session_token` for a cookie"""
+    from fastapi.testclient import TestClient
+
+    from app.config import settings
+    from app.database import async_engine
+    from app.main import create_app
+    from app.utils import session_store
+
+    monkeypatch.setattr(settings, "session_backend", "signed")
+    monkeypatch.setattr(session_store, "_backend", None)
+    monkeypatch.setattr(session_store, "_signer", None)
+    # No lifespan, the session store needs no start for these requests
+    yield TestClient(create_app())
+    async_engine.sync_engine.dispose()
+
+
+def session_token(user: dict, expires_in: float = 15 * 60) -> str:
+    """Signed session token of a `seed` user"""
+    from app.utils import session_store
+
+    return session_store.get_session_signer().sign(user["telegram_id"], user["user_id"], time.time() + expires_in)
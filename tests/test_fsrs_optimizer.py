@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+from fsrs import Card, Scheduler
+
+from app.fsrs_optimizer import fit_user_parameters, to_review_logs
+
+
+def review_rows(tzinfo, cards: int = 20, reviews_per_card: int = 5) -> list:
+    """Daily reviews of `cards` cards, with aware datetimes in `tzinfo`"""
+    start = datetime(2026, 1, 1, 9, tzinfo=tzinfo)
+    return [
+        (card_id, 3 if day % 3 else 2, start + timedelta(days=day * (card_id % 4 + 1)), 2.5)
+        for card_id in range(1, cards + 1)
+        for day in range(reviews_per_card)
+    ]
+
+
+@pytest.mark.parametrize("tzinfo", [ZoneInfo("Etc/UTC"), ZoneInfo("Asia/Riyadh")])
+def test_review_logs_are_converted_to_utc(tzinfo):
+    rows = review_rows(tzinfo)
+
+    logs = to_review_logs(rows)
+
+    assert all(log.review_datetime.tzinfo is timezone.utc for log in logs)
+    assert [log.review_datetime for log in logs] == [row[2] for row in rows]
+    # The optimizer replays the logs through the scheduler, which rejects other tzinfos
+    card = Card(card_id=1)
+    for log in logs[:5]:
+        card, _ = Scheduler().review_card(card, log.rating, log.review_datetime)
+
+
+def test_fit_accepts_non_utc_review_times():
+    pytest.importorskip("torch")
+
+    user_id, parameters, review_count = fit_user_parameters(7, review_rows(ZoneInfo("Asia/Riyadh")))
+
+    assert (user_id, review_count) == (7, 100)
+    assert len(parameters) == 21
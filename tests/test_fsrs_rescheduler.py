@@ -0,0 +1,48 @@
+import asyncio
+import sys
+
+from app.crud import PROGRESS_CACHE_CHANNEL, LessonProgressCRUD, progress_cache
+from app.database import listen
+from app.fsrs_rescheduler import CardRescheduler
+from app.schemas import RatingEnum
+from tests.test_fsrs_service import rate
+from tests.test_word_import import progress_summary
+
+
+def test_reschedule_rewrites_reviewed_cards(run, seed):
+    user = run(seed(words=1))
+    run(rate(user["user_id"], user["word_ids"][0], user["lesson_id"], RatingEnum.GOOD))
+
+    assert CardRescheduler(user_ids=[user["user_id"]], workers=1).run() == 1
+
+
+async def reschedule_in_another_process(user_id: int) -> list[str]:
+    """Run the rescheduler CLI for `user_id` while this process listens, returns the payloads heard"""
+    payloads = []
+
+    def on_notify(payload: str):
+        payloads.append(payload)
+        LessonProgressCRUD.on_progress_invalidated(payload)
+
+    async with listen(PROGRESS_CACHE_CHANNEL, on_notify) as listening:
+        assert listening
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "app.fsrs_rescheduler", "--user-id", str(user_id), "--workers", "1",
+            stdout=asyncio.subprocess.DEVNULL
+        )
+        assert await process.wait() == 0
+        for _ in range(50):
+            if payloads:
+                break
+            await asyncio.sleep(0.1)
+    return payloads
+
+
+def test_reschedule_drops_progress_summaries_cached_by_other_processes(run, seed):
+    user = run(seed(words=1))
+    run(rate(user["user_id"], user["word_ids"][0], user["lesson_id"], RatingEnum.GOOD))
+    run(progress_summary(user["user_id"]))
+    assert progress_cache.get(user["user_id"]) is not None
+
+    assert run(reschedule_in_another_process(user["user_id"])) == [str(user["user_id"])]
+    assert progress_cache.get(user["user_id"]) is None
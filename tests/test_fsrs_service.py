@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fsrs import Card
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.fsrs_service import CardRecord, FSRSManager, WordLearningService
+from app.models import LessonProgress
+from app.schemas import DueOrderEnum, RatingEnum, WordRatingBatchItemSchema
+
+
+async def rate(user_id: int, word_id: int, lesson_id: int, rating: RatingEnum = RatingEnum.GOOD):
+    async with AsyncSessionLocal() as db:
+        return await WordLearningService(db).rate_word(user_id, word_id, rating, lesson_id=lesson_id)
+
+
+async def lesson_progress(user_id: int, lesson_id: int):
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(LessonProgress).where(
+            LessonProgress.user_id == user_id, LessonProgress.lesson_id == lesson_id
+        ))
+
+
+def test_rate_word_counts_own_lesson_words(run, seed):
+    owner = run(seed(words=3))
+
+    result = run(rate(owner["user_id"], owner["word_ids"][0], owner["lesson_id"]))
+
+    assert result is not None
+    progress = run(lesson_progress(owner["user_id"], owner["lesson_id"]))
+    assert progress.total_words == 3
+    assert progress.words_learned == 1
+
+
+def test_rate_word_with_foreign_lesson_writes_no_progress(run, seed):
+    owner = run(seed(words=5))
+    other = run(seed(words=1))
+
+    # The word is the rater's own, the lesson context belongs to someone else
+    run(rate(other["user_id"], other["word_ids"][0], owner["lesson_id"]))
+
+    assert run(lesson_progress(other["user_id"], owner["lesson_id"])) is None
+
+
+def test_rate_word_statement_count(run, seed, count_statements):
+    owner = run(seed(words=2))
+
+    with count_statements() as counter:
+        run(rate(owner["user_id"], owner["word_ids"][0], owner["lesson_id"]))
+
+    # Card lookup, card upsert, review insert, lesson progress upsert, progress cache NOTIFY
+    assert len(counter.statements) == 5, counter.statements
+
+
+def test_review_card_converts_aware_times_to_utc():
+    reviewed_at = datetime.now(timezone(timedelta(hours=3))) - timedelta(minutes=1)
+
+    card, review_log = FSRSManager().review_card(CardRecord.new(), RatingEnum.GOOD, review_datetime=reviewed_at)
+
+    assert review_log.review_datetime.utcoffset() == timedelta(0)
+    assert review_log.review_datetime == reviewed_at
+    assert card.last_review == reviewed_at
+
+
+def test_review_card_rejects_future_and_out_of_order_times():
+    manager = FSRSManager()
+    now = datetime.now(timezone.utc)
+    card, _ = manager.review_card(CardRecord.new(), RatingEnum.GOOD, review_datetime=now - timedelta(hours=1))
+
+    with pytest.raises(ValueError, match="future"):
+        manager.review_card(card, RatingEnum.GOOD, review_datetime=now + timedelta(hours=1))
+    with pytest.raises(ValueError, match="last review"):
+        manager.review_card(card, RatingEnum.GOOD, review_datetime=now - timedelta(hours=2))
+
+
+def test_new_card_record_matches_fsrs_defaults():
+    expected = CardRecord.from_card(Card())
+    record = CardRecord.new()
+
+    assert record.to_columns().keys() == expected.to_columns().keys()
+    assert (record.state, record.step, record.stability, record.difficulty, record.last_review) == \
+        (expected.state, expected.step, expected.stability, expected.difficulty, expected.last_review)
+    assert abs(record.due - expected.due) < timedelta(seconds=1)
+    assert record.to_card().card_id == 0
+
+
+async def review_days_ago(user_id: int, word_ids: list[int]):
+    """Rate each word once, its first a day ago, the next two days ago and so on"""
+    now = datetime.now(timezone.utc)
+    ratings = [
+        WordRatingBatchItemSchema(word_id=word_id, rating=RatingEnum.GOOD, reviewed_at=now - timedelta(days=days))
+        for days, word_id in enumerate(word_ids, start=1)
+    ]
+    async with AsyncSessionLocal() as db:
+        await WordLearningService(db).review_words_batch(user_id, ratings)
+
+
+async def due_words(user_id: int, order: DueOrderEnum, limit: int, cursor=None):
+    async with AsyncSessionLocal() as db:
+        return await WordLearningService(db).get_words_due_for_review(user_id, limit, order, cursor)
+
+
+def test_due_words_by_retrievability_match_fsrs(run, seed):
+    owner = run(seed(words=5))
+    run(review_days_ago(owner["user_id"], owner["word_ids"]))
+
+    first, cursor = run(due_words(owner["user_id"], DueOrderEnum.RETRIEVABILITY, 3))
+    rest, _ = run(due_words(owner["user_id"], DueOrderEnum.RETRIEVABILITY, 3, cursor))
+
+    manager = FSRSManager()
+    now = datetime.now(timezone.utc)
+    retrievability = [
+        manager.scheduler.get_card_retrievability(Card(
+            card_id=0, state=word.state, step=word.step, stability=word.stability, difficulty=word.difficulty,
+            due=word.due, last_review=word.last_review
+        ), now)
+        for word in first + rest
+    ]
+    assert len(retrievability) == 5
+    assert retrievability == sorted(retrievability)
+    # Reviewed longest ago, least likely recalled
+    assert [word.id for word in first + rest] == owner["word_ids"][::-1]
+
+
+def test_due_words_by_overdue_ratio_page_through_all(run, seed):
+    owner = run(seed(words=5))
+    run(review_days_ago(owner["user_id"], owner["word_ids"]))
+
+    first, cursor = run(due_words(owner["user_id"], DueOrderEnum.OVERDUE_RATIO, 3))
+    rest, next_cursor = run(due_words(owner["user_id"], DueOrderEnum.OVERDUE_RATIO, 3, cursor))
+
+    assert sorted(word.id for word in first + rest) == owner["word_ids"]
+    assert next_cursor is None
+
+
+@pytest.mark.parametrize("order", list(DueOrderEnum))
+def test_due_words_statement_count_is_independent_of_limit(run, seed, count_statements, order):
+    owner = run(seed(words=6))
+    run(review_days_ago(owner["user_id"], owner["word_ids"]))
+
+    counts = []
+    for limit in (1, 6):
+        with count_statements() as counter:
+            words, _ = run(due_words(owner["user_id"], order, limit))
+        assert len(words) == limit
+        counts.append(len(counter.statements))
+
+    # DUE reads one keyset page, the other orders read the course settings, stream
+    # the keys and load the page
+    expected = 1 if order == DueOrderEnum.DUE else 3
+    assert counts == [expected, expected]
@@ -0,0 +1,65 @@
+import json
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+from app.config import settings
+from app.models import Base
+from tests.conftest import alembic_config
+
+
+def test_upgrade_head_on_empty_database(empty_database_url, monkeypatch):
+    monkeypatch.setattr(settings, "database_url", empty_database_url)
+    config = alembic_config()
+
+    command.upgrade(config, "head")
+
+    engine = create_engine(empty_database_url)
+    try:
+        with engine.connect() as connection:
+            context = MigrationContext.configure(connection)
+            assert set(context.get_current_heads()) == set(ScriptDirectory.from_config(config).get_heads())
+            assert set(Base.metadata.tables) <= set(inspect(connection).get_table_names())
+            # The migrated schema is the one the models describe
+            assert compare_metadata(context, Base.metadata) == []
+    finally:
+        engine.dispose()
+
+    command.downgrade(config, "base")
+
+
+def test_duplicate_user_words_merge_into_the_latest_reviewed(empty_database_url, monkeypatch):
+    monkeypatch.setattr(settings, "database_url", empty_database_url)
+    config = alembic_config()
+    command.upgrade(config, "7b6a713bc72a")
+
+    engine = create_engine(empty_database_url)
+    try:
+        with engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO users (id, telegram_id) VALUES (1, 1);"
+                "INSERT INTO courses (id, user_id, title, language, native_language) VALUES (1, 1, 'c', 'ar', 'en');"
+                "INSERT INTO lessons (id, course_id, title, order_index) VALUES (1, 1, 'l', 1);"
+                "INSERT INTO words (id, lesson_id, text, translation) VALUES (1, 1, 'w', 't')"
+            ))
+            # The same card three times: reviewed in January, in March, and never
+            for user_word_id, last_review in [(1, "2026-01-10T00:00:00+00:00"), (2, "2026-03-01T00:00:00+00:00"),
+                                              (3, None)]:
+                connection.execute(text(
+                    "INSERT INTO user_words (id, user_id, word_id, fsrs_card_data, due, state) "
+                    "VALUES (:id, 1, 1, CAST(:card AS json), now(), 2)"
+                ), {"id": user_word_id, "card": json.dumps({"last_review": last_review})})
+            connection.execute(text(
+                "INSERT INTO reviews (user_word_id, rating) VALUES (1, 3), (2, 3), (2, 4), (3, 1)"
+            ))
+
+        command.upgrade(config, "4ac16a40c42e")
+
+        with engine.connect() as connection:
+            assert connection.scalars(text("SELECT id FROM user_words")).all() == [2]
+            assert connection.scalars(text("SELECT user_word_id FROM reviews")).all() == [2, 2, 2, 2]
+    finally:
+        engine.dispose()
@@ -0,0 +1,126 @@
+"""EXPLAIN checks for the keyset-paginated queries.
+
+A module-scoped dataset of 1000 users, 100k words and cards is loaded and analyzed
+so the planner picks between index and sequential scans as it would in production.
+The statements the app sends are captured and explained on the same driver.
+"""
+import pytest
+from sqlalchemy import text
+
+from app.crud import CourseCRUD, LessonCRUD, WordCRUD
+from app.database import AsyncSessionLocal
+from app.fsrs_service import WordLearningService
+from app.schemas import DueOrderEnum
+
+USERS = 1000
+COURSES_PER_USER = 2
+LESSONS_PER_COURSE = 5
+WORDS_PER_LESSON = 10
+INDEXED_TABLES = {"courses", "lessons", "words", "user_words"}
+
+
+@pytest.fixture(scope="module")
+def dataset(database_url):
+    """Ids of one user in the middle of the dataset, with a course and a lesson of theirs"""
+    from app.database import engine
+
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (telegram_id, username) SELECT -g, 'planner' FROM generate_series(1, :users) g"
+        ), {"users": USERS})
+        connection.execute(text(
+            "INSERT INTO courses (user_id, title, language, native_language) "
+            "SELECT u.id, 'Course ' || c, 'ar', 'en' FROM users u, generate_series(1, :courses) c "
+            "WHERE u.telegram_id < 0"
+        ), {"courses": COURSES_PER_USER})
+        connection.execute(text(
+            "INSERT INTO lessons (course_id, user_id, title, order_index) "
+            "SELECT co.id, co.user_id, 'Lesson ' || l, l FROM courses co "
+            "JOIN users u ON u.id = co.user_id, generate_series(1, :lessons) l WHERE u.telegram_id < 0"
+        ), {"lessons": LESSONS_PER_COURSE})
+        connection.execute(text(
+            "INSERT INTO words (lesson_id, user_id, text, translation) "
+            "SELECT le.id, le.user_id, 'word ' || w, 'translation ' || w FROM lessons le "
+            "JOIN users u ON u.id = le.user_id, generate_series(1, :words) w WHERE u.telegram_id < 0"
+        ), {"words": WORDS_PER_LESSON})
+        # Half of the cards are due, spread over the last and the next ten days
+        connection.execute(text(
+            "INSERT INTO user_words (user_id, word_id, state, stability, difficulty, due, last_review) "
+            "SELECT w.user_id, w.id, 2, 10.0, 5.0, now() - (w.id % 20 - 10) * interval '1 day', "
+            "now() - interval '20 days' FROM words w JOIN users u ON u.id = w.user_id WHERE u.telegram_id < 0"
+        ))
+        connection.execute(text("ANALYZE"))
+
+        user_id = connection.scalar(text("SELECT id FROM users WHERE telegram_id = :telegram_id"),
+                                    {"telegram_id": -USERS // 2})
+        course_id = connection.scalar(text("SELECT min(id) FROM courses WHERE user_id = :user_id"),
+                                      {"user_id": user_id})
+        lesson_id = connection.scalar(text("SELECT min(id) FROM lessons WHERE course_id = :course_id"),
+                                      {"course_id": course_id})
+    return {"user_id": user_id, "course_id": course_id, "lesson_id": lesson_id}
+
+
+def seq_scans(plan: dict) -> set[str]:
+    """Relations read with a sequential scan anywhere in an EXPLAIN (FORMAT JSON) plan"""
+    scans = {plan["Relation Name"]} if plan["Node Type"] == "Seq Scan" else set()
+    for child in plan.get("Plans", []):
+        scans |= seq_scans(child)
+    return scans
+
+
+async def explain_captured(count_statements, page):
+    """Run `page` and EXPLAIN each statement it sent, with the parameters it was sent with"""
+    from app.database import async_engine
+
+    with count_statements() as counter:
+        async with AsyncSessionLocal() as db:
+            await page(db)
+
+    plans = []
+    async with async_engine.connect() as connection:
+        for statement, parameters in zip(counter.statements, counter.parameters):
+            result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plans.append((statement, result.scalar()[0]["Plan"]))
+    return plans
+
+
+def assert_index_scans(run, count_statements, page):
+    plans = run(explain_captured(count_statements, page))
+    assert plans
+    for statement, plan in plans:
+        assert not seq_scans(plan) & INDEXED_TABLES, statement
+
+
+def test_course_pages_use_indexes(run, count_statements, dataset):
+    async def page(db):
+        first = await CourseCRUD.get_user_courses(db, dataset["user_id"], limit=1)
+        await CourseCRUD.get_user_courses(db, dataset["user_id"], after_id=first[0].id, limit=1)
+
+    assert_index_scans(run, count_statements, page)
+
+
+def test_lesson_pages_use_indexes(run, count_statements, dataset):
+    async def page(db):
+        first = await LessonCRUD.get_course_lessons(db, dataset["course_id"], dataset["user_id"], limit=2)
+        await LessonCRUD.get_course_lessons(
+            db, dataset["course_id"], dataset["user_id"], first[-1].order_index, first[-1].id, limit=2
+        )
+
+    assert_index_scans(run, count_statements, page)
+
+
+def test_word_pages_use_indexes(run, count_statements, dataset):
+    async def page(db):
+        first = await WordCRUD.get_lesson_words(db, dataset["lesson_id"], dataset["user_id"], limit=3)
+        await WordCRUD.get_lesson_words(db, dataset["lesson_id"], dataset["user_id"], first[-1].id, limit=3)
+
+    assert_index_scans(run, count_statements, page)
+
+
+def test_due_word_pages_use_indexes(run, count_statements, dataset):
+    async def page(db):
+        service = WordLearningService(db)
+        _, cursor = await service.get_words_due_for_review(dataset["user_id"], 5, DueOrderEnum.DUE)
+        await service.get_words_due_for_review(dataset["user_id"], 5, DueOrderEnum.DUE, cursor)
+
+    assert_index_scans(run, count_statements, page)
@@ -0,0 +1,36 @@
+import warnings
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.utils import session_store
+from tests.conftest import session_token
+
+
+def expiring_token(user: dict) -> str:
+    return session_token(user, session_store.SESSION_RENEW_BELOW / 2)
+
+
+@pytest.mark.parametrize("path", [
+    "/api/v1/words/{word_id}",
+    "/api/v1/words/lesson/{lesson_id}",
+    "/api/v1/words/lesson/{lesson_id}?stream=true",
+])
+def test_schema_responses_keep_renewed_session_cookie(signed_client, run, seed, path):
+    user = run(seed(words=1))
+    url = path.format(word_id=user["word_ids"][0], lesson_id=user["lesson_id"])
+
+    response = signed_client.get(url, cookies={session_store.SESSION_COOKIE: expiring_token(user)})
+
+    assert response.status_code == 200
+    assert response.cookies.get(session_store.SESSION_COOKIE)
+
+
+def test_plain_dict_endpoints_raise_no_deprecation_warnings():
+    from app.main import create_app
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        response = TestClient(create_app()).get("/health")
+
+    assert response.json() == {"status": "ok", "version": "1.0.0"}
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from fsrs import Card, Scheduler, State
+
+from app.retention_service import DeckRetention
+
+
+def random_deck(size: int, now: datetime, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    stability = rng.uniform(0.1, 365.0, size)
+    last_review = now.timestamp() - rng.uniform(0, 400 * 86400, size)
+    # Every tenth card was never reviewed
+    last_review[::10] = np.nan
+    due = now.timestamp() + rng.uniform(-30 * 86400, 30 * 86400, size)
+    lesson_ids = rng.integers(1, 6, size)
+    return stability, last_review, due, lesson_ids
+
+
+def test_deck_retention_matches_fsrs():
+    now = datetime.now(timezone.utc)
+    scheduler = Scheduler()
+    stability, last_review, due, lesson_ids = random_deck(2000, now)
+    ids = np.arange(len(stability))
+
+    deck = DeckRetention(
+        ids, ids, lesson_ids, stability, last_review, due,
+        np.full(len(ids), -scheduler.parameters[20]), now
+    )
+
+    expected = [
+        scheduler.get_card_retrievability(Card(
+            card_id=0, state=State.Review, stability=float(card_stability),
+            due=datetime.fromtimestamp(card_due, timezone.utc),
+            last_review=None if np.isnan(reviewed) else datetime.fromtimestamp(reviewed, timezone.utc)
+        ), now)
+        for card_stability, reviewed, card_due in zip(stability, last_review, due)
+    ]
+    np.testing.assert_allclose(deck.retrievability, expected, rtol=1e-12)
+    np.testing.assert_array_equal(deck.is_due, due <= now.timestamp())
+    np.testing.assert_allclose(deck.days_overdue, np.maximum(0.0, (now.timestamp() - due) / 86400))
+
+
+def test_lesson_average_retention_skips_unreviewed_cards():
+    now = datetime.now(timezone.utc)
+    reviewed = (now - timedelta(days=3)).timestamp()
+    ids = np.arange(3)
+
+    deck = DeckRetention(
+        ids, ids, np.array([1, 1, 2]), np.array([5.0, 5.0, np.nan]),
+        np.array([reviewed, reviewed, np.nan]), np.full(3, now.timestamp()),
+        np.full(3, -Scheduler().parameters[20]), now
+    )
+
+    assert deck.lesson_average_retention() == {1: deck.retrievability[0]}
@@ -0,0 +1,23 @@
+import pytest
+
+from app.utils.session_store import SESSION_COOKIE
+from tests.conftest import session_token
+
+
+@pytest.mark.parametrize("path, payload", [
+    # Not a rating
+    ("/api/v1/reviews/rate", lambda word_id: {"word_id": word_id, "rating": 9}),
+    # Reviewed in the future
+    ("/api/v1/reviews/rate/batch", lambda word_id: {
+        "ratings": [{"word_id": word_id, "rating": 3, "reviewed_at": "2100-01-01T00:00:00Z"}]
+    }),
+])
+def test_invalid_ratings_are_bad_requests(signed_client, run, seed, capsys, path, payload):
+    user = run(seed(words=1))
+
+    response = signed_client.post(
+        path, json=payload(user["word_ids"][0]), cookies={SESSION_COOKIE: session_token(user)}
+    )
+
+    assert response.status_code == 400
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from app.utils.session_backends import MemorySessionBackend, PostgresSessionBackend, SQLiteSessionBackend
+
+
+def test_memory_backend_sweeps_expired_sessions():
+    async def main():
+        backend = MemorySessionBackend()
+        now = time.time()
+        await backend.create("expired", 1, now - 1)
+        await backend.create("live", 2, now + 60)
+        assert await backend.sweep(now) == 1
+        assert await backend.get("expired") is None
+        assert (await backend.get("live"))["user_id"] == 2
+
+    asyncio.run(main())
+
+
+def test_memory_backend_recreated_session_is_swept_once():
+    async def main():
+        backend = MemorySessionBackend()
+        now = time.time()
+        for session_id in range(1000):
+            await backend.create(str(session_id), 1, now + 5)
+            # Created again with another expiry, moves to another wheel slot
+            await backend.create(str(session_id), 1, now + 10)
+
+        assert await backend.sweep(now + 6) == 0
+        assert await backend.sweep(now + 11) == 1000
+        assert backend._sessions == {}
+        assert not any(backend._wheel)
+
+    asyncio.run(main())
+
+
+def test_sqlite_backend_round_trip(tmp_path):
+    async def main():
+        backend = SQLiteSessionBackend(str(tmp_path / "sessions.sqlite3"))
+        now = time.time()
+        await backend.create("a", 7, now + 60)
+        await backend.create("a", 8, now + 60)
+        await backend.create("b", 9, now - 1)
+        assert (await backend.get("a"))["user_id"] == 8
+        assert await backend.get("b") is None
+        assert await backend.sweep(now) == 1
+        await backend.delete("a")
+        assert await backend.get("a") is None
+        await backend.stop()
+
+    asyncio.run(main())
+
+
+def test_postgres_backend_create_is_idempotent(run):
+    async def main():
+        backend = PostgresSessionBackend()
+        expires_at = time.time() + 60
+        await backend.create("jti-0123", 5, expires_at)
+        # Logging out twice revokes the same token id twice
+        await backend.create("jti-0123", 5, expires_at + 10)
+        session = await backend.get("jti-0123")
+        assert session == {"user_id": 5, "expires_at": expires_at + 10}
+        await backend.delete("jti-0123")
+        assert await backend.get("jti-0123") is None
+
+    run(main())
@@ -0,0 +1,22 @@
+import time
+
+import pytest
+
+from app.utils.session_tokens import SessionTokenSigner
+
+
+def test_signed_token_round_trip():
+    signer = SessionTokenSigner("bot_token", 2, previous_versions=[1])
+    token = signer.sign(42, 7, time.time() + 60)
+
+    session = signer.verify(token)
+
+    assert (session["user_id"], session["db_user_id"]) == (42, 7)
+
+
+@pytest.mark.parametrize("version", ["²", "١", "-1", "", "3"])
+def test_unknown_key_versions_are_rejected(version):
+    signer = SessionTokenSigner("bot_token", 1)
+    body = signer.sign(42, 7, time.time() + 60).partition(".")[2]
+
+    assert signer.verify(f"{version}.{body}") is None
@@ -0,0 +1,61 @@
+import hashlib
+import hmac
+import json
+import time
+from urllib.parse import quote
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.utils.telegram import init_data_cache, verify_telegram_webapp_data, webapp_secret_key
+
+USER = {"id": 42, "username": "tester"}
+
+
+def sign(fields: dict, bot_token: str = settings.telegram_bot_token) -> str:
+    """initData as Telegram builds it, fields plus the hash of their data-check string"""
+    check_string = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    signature = hmac.new(webapp_secret_key(bot_token), check_string.encode(), hashlib.sha256).hexdigest()
+    return "&".join(f"{key}={quote(str(value))}" for key, value in {**fields, "hash": signature}.items())
+
+
+def fields(**overrides) -> dict:
+    return {"auth_date": str(int(time.time())), "query_id": "AAH", "user": json.dumps(USER), **overrides}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    init_data_cache.clear()
+    yield
+    init_data_cache.clear()
+
+
+def test_valid_init_data_is_verified():
+    assert verify_telegram_webapp_data(sign(fields()), settings.telegram_bot_token) == USER
+
+
+@pytest.mark.parametrize("init_data", [
+    None,
+    "",
+    "auth_date=1&user=%7B%7D",  # No hash
+    "auth_date=1&hash=%C3%A9",  # Non-ASCII hash
+    sign(fields(auth_date="soon")),
+    sign(fields(auth_date="١٢٣")),
+    sign(fields(user="{not json")),
+    sign(fields(user="[42]")),
+    sign(fields(), bot_token="another bot"),
+])
+def test_malformed_init_data_is_rejected_quietly(init_data, capsys):
+    assert verify_telegram_webapp_data(init_data, settings.telegram_bot_token) is None
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize("authorization", [None, "tma auth_date=1&hash=%C3%A9", f"tma {sign(fields(user='{'))}"])
+def test_auth_endpoint_rejects_malformed_init_data(authorization):
+    from app.main import create_app
+
+    headers = {"Authorization": authorization} if authorization else {}
+    response = TestClient(create_app()).post("/api/v1/telegram/mini-app/auth", headers=headers)
+
+    assert response.status_code == 401
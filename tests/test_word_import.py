@@ -0,0 +1,103 @@
+import io
+import sqlite3
+import threading
+import zipfile
+
+import pytest
+
+from app.crud import LessonProgressCRUD, progress_cache
+from app.database import AsyncSessionLocal
+from app.word_import import ImportFormatError, WordImporter, iter_records
+
+
+async def progress_summary(user_id: int):
+    async with AsyncSessionLocal() as db:
+        return await LessonProgressCRUD.get_user_progress_summary(db, user_id)
+
+
+async def import_words(user: dict, records: list[dict]):
+    async with AsyncSessionLocal() as db:
+        return await WordImporter(db, user["user_id"], user["course_id"], user["lesson_id"]).run(records)
+
+
+def test_import_drops_cached_progress_summary(run, seed):
+    user = run(seed(words=2))
+    run(progress_summary(user["user_id"]))
+    assert progress_cache.get(user["user_id"]) is not None
+
+    result = run(import_words(user, [{"text": "kitab", "translation": "book"}, {"text": "qalam"}]))
+
+    assert result.imported == 1 and len(result.errors) == 1
+    assert progress_cache.get(user["user_id"]) is None
+
+
+def anki_collection(tmp_path, notes: list[tuple[str, str]]) -> bytes:
+    """A minimal Anki collection database with `notes` as (front, back) in one deck"""
+    path = tmp_path / "collection.sqlite"
+    with sqlite3.connect(path) as connection:
+        connection.executescript(
+            "CREATE TABLE notes (id INTEGER PRIMARY KEY, flds TEXT);"
+            "CREATE TABLE cards (id INTEGER PRIMARY KEY, nid INTEGER, did INTEGER);"
+            "CREATE TABLE decks (id INTEGER PRIMARY KEY, name TEXT);"
+            "INSERT INTO decks VALUES (1, 'Arabic::Lesson 1');"
+        )
+        for note_id, (front, back) in enumerate(notes, start=1):
+            connection.execute("INSERT INTO notes VALUES (?, ?)", (note_id, f"{front}\x1f{back}"))
+            connection.execute("INSERT INTO cards (nid, did) VALUES (?, 1)", (note_id,))
+    connection.close()
+    return path.read_bytes()
+
+
+def anki_package(files: dict[str, bytes]) -> io.BytesIO:
+    package = io.BytesIO()
+    with zipfile.ZipFile(package, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    package.seek(0)
+    return package
+
+
+def test_legacy_anki_package_is_read(tmp_path):
+    package = anki_package({"collection.anki21": anki_collection(tmp_path, [("kitab", "<b>book</b>")])})
+
+    assert list(iter_records(package, "apkg")) == [{"text": "kitab", "translation": "book", "lesson": "Lesson 1"}]
+
+
+def test_current_anki_package_is_rejected(tmp_path):
+    # The anki2 stub of a current export holds only an "update Anki" note
+    package = anki_package({
+        "collection.anki21b": b"\x28\xb5\x2f\xfd zstd data",
+        "collection.anki2": anki_collection(tmp_path, [("Please update to the latest Anki version", "")]),
+    })
+
+    with pytest.raises(ImportFormatError, match="Support older Anki versions"):
+        list(iter_records(package, "apkg"))
+
+
+def test_records_are_read_off_the_event_loop(run, seed):
+    user = run(seed(words=0))
+    reader_threads = set()
+
+    def records():
+        for i in range(3):
+            reader_threads.add(threading.current_thread())
+            yield {"text": f"word {i}", "translation": "translation"}
+
+    result = run(import_words(user, records()))
+
+    assert result.imported == 3
+    assert threading.main_thread() not in reader_threads
+
+
+def test_anki_package_import_reads_across_threads(run, seed, tmp_path):
+    user = run(seed(words=0))
+    package = anki_package({"collection.anki21": anki_collection(tmp_path, [("kitab", "book"), ("qalam", "pen")])})
+
+    async def main():
+        async with AsyncSessionLocal() as db:
+            importer = WordImporter(db, user["user_id"], user["course_id"], create_lessons=True, chunk_size=1)
+            return await importer.run(iter_records(package, "apkg"))
+
+    result = run(main())
+
+    assert (result.imported, result.lessons_created, result.errors) == (2, 1, [])